@@ -83,6 +83,18 @@ const CameraStreamApp = () => {
         setStats((prev) => ({ ...prev, isConnected: false }));
       };
 
+      ws.onmessage = (event) => {
+        if (typeof event.data !== "string") return;
+        try {
+          const msg = JSON.parse(event.data);
+          if (msg.type === "rate_hint") {
+            applySendRate(msg.fps);
+          }
+        } catch {
+          // Ignore malformed messages
+        }
+      };
+
       ws.onerror = (err) => {
         setError("WebSocket connection failed");
         console.error("WebSocket error:", err);
@@ -127,6 +139,19 @@ const CameraStreamApp = () => {
     );
   };
 
+  // Follow the server's send rate hint, never exceeding the chosen fps
+  const applySendRate = (hintFps: number) => {
+    if (!intervalRef.current || !(hintFps > 0)) return;
+
+    const fps = Math.min(settings.fps, hintFps);
+    clearInterval(intervalRef.current);
+    intervalRef.current = setInterval(() => {
+      captureAndSendFrame();
+    }, 1000 / fps);
+
+    setStats((prev) => ({ ...prev, fps }));
+  };
+
   // Start Streaming
   const startStreaming = () => {
     if (!isCameraOn) {
@@ -1,8 +1,18 @@
 """REST API endpoints"""
-from fastapi import APIRouter, Request
-from typing import Dict
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Literal, Optional
+
+from app.config import settings
+from app.services.metrics import STAGE_SECONDS, Sample, registry
+from app.websocket import manager
 
 router = APIRouter(prefix="/api", tags=["api"])
+metrics_router = APIRouter(tags=["metrics"])
+
+STAGES = ("receive", "decode", "queue", "preprocess", "inference", "music", "send")
 
 @router.get("/health")
 async def health_check() -> Dict:
@@ -17,10 +27,54 @@ async def get_stats(request: Request) -> Dict:
     """Get server statistics"""
     # Access mood detector from app state
     mood_detector = request.app.state.mood_detector
+    inference_scheduler = request.app.state.inference_scheduler
+    
+    if mood_detector is None:
+        # Gateway: the model lives in the inference replicas
+        model = {
+            "total_detections": inference_scheduler.total_detections,
+            "model_type": "remote",
+            "startup": {
+                "time_to_ready_s": round(request.app.state.time_to_ready, 3),
+            },
+        }
+    else:
+        model = {
+            "total_detections": mood_detector.total_detections,
+            "model_type": mood_detector.model_type,
+            "startup": {
+                "time_to_ready_s": round(request.app.state.time_to_ready, 3),
+                "model_load_s": round(mood_detector.load_seconds, 3),
+                "model_source": mood_detector.model_source,
+            },
+            "cascade": mood_detector.cascade_stats(),
+        }
     
     return {
-        "total_detections": mood_detector.total_detections,
-        "model_type": mood_detector.model_type,
+        **model,
+        "batching": inference_scheduler.get_stats(),
+        "connections": manager.get_stats(),
+        "music": request.app.state.music_service.get_stats(),
+        "archive": (
+            request.app.state.frame_archiver.get_stats()
+            if request.app.state.frame_archiver else None
+        ),
+        "history": (
+            request.app.state.mood_history.get_stats()
+            if request.app.state.mood_history else None
+        ),
+        "change_detection": {
+            "threshold": settings.CHANGE_THRESHOLD,
+            "max_reuse_ms": settings.CHANGE_MAX_REUSE_MS,
+        },
+        "stages": {
+            stage: {
+                "count": snapshot["count"],
+                "mean_ms": round(snapshot["mean"] * 1000, 3),
+            }
+            for stage in STAGES
+            for snapshot in [STAGE_SECONDS.snapshot(stage)]
+        },
     }
 
 @router.get("/moods")
@@ -31,4 +85,89 @@ async def get_available_moods() -> Dict:
             "happy", "sad", "angry", "surprise", 
             "fear", "disgust", "neutral"
         ]
-    }
\ No newline at end of file
+    }
+
+@router.get("/history")
+async def list_history(request: Request) -> Dict:
+    """Clients with a recorded mood history"""
+    mood_history = request.app.state.mood_history
+    if mood_history is None:
+        raise HTTPException(status_code=404, detail="Mood history is disabled (HISTORY_ENABLED)")
+    return {"clients": mood_history.list_clients()}
+
+@router.get("/history/{client_id}")
+async def get_history(
+    request: Request,
+    client_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    last: Optional[float] = None,
+    resolution: Literal["auto", "raw", "second", "minute"] = "auto",
+    aggregate: bool = False
+) -> Dict:
+    """
+    A client's emotions over time, or their aggregate
+    
+    The range is ``start``..``end`` (unix seconds; default: everything up
+    to now) or the ``last`` N seconds. ``resolution=auto`` uses the finest
+    rollup that still covers the range.
+    """
+    mood_history = request.app.state.mood_history
+    if mood_history is None:
+        raise HTTPException(status_code=404, detail="Mood history is disabled (HISTORY_ENABLED)")
+    if last is not None:
+        end = time.time() if end is None else end
+        start = end - last
+    
+    history = mood_history.query(client_id, start, end, resolution, aggregate)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No history for client {client_id}")
+    return history
+
+def _scrape_samples(request: Request) -> List[Sample]:
+    """Gauges and counters read from the live objects at scrape time"""
+    connections = manager.get_stats()
+    scheduler_stats = request.app.state.inference_scheduler.get_stats()
+    mood_detector = request.app.state.mood_detector
+    
+    samples: List[Sample] = [
+        ("mood_active_connections", "gauge", "Open /stream connections", {},
+         connections["active_connections"]),
+    ]
+    for kind in ("received", "dropped", "detected", "inferred", "skipped_unchanged", "without_face"):
+        samples.append(("mood_frames_total", "counter", "Frames by what happened to them",
+                        {"kind": kind}, connections.get(f"frames_{kind}", 0)))
+    samples += [
+        ("mood_changes_total", "counter", "Reported mood changes", {},
+         connections.get("mood_changes", 0)),
+        ("mood_messages_sent_total", "counter", "Messages sent to clients", {},
+         connections.get("messages_sent", 0)),
+        ("mood_bytes_sent_total", "counter", "Bytes sent to clients", {},
+         connections.get("bytes_sent", 0)),
+        ("mood_detections_total", "counter", "Successful detections", {},
+         mood_detector.total_detections if mood_detector else scheduler_stats["total_detections"]),
+    ]
+    
+    if "replicas" in scheduler_stats:
+        for replica in scheduler_stats["replicas"]:
+            labels = {"address": replica["address"]}
+            samples.append(("mood_replica_healthy", "gauge", "Inference replica passes health checks",
+                            labels, int(replica["healthy"])))
+            samples.append(("mood_replica_inflight", "gauge", "Requests in flight per replica",
+                            labels, replica["inflight"]))
+    else:
+        samples += [
+            ("mood_inference_queue_depth", "gauge", "Frames waiting for a batch", {},
+             scheduler_stats["pending"]),
+            ("mood_inference_inflight_batches", "gauge", "Batches running on workers", {},
+             scheduler_stats["inflight_batches"]),
+        ]
+    return samples
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus text exposition of hot-path metrics"""
+    return PlainTextResponse(
+        registry.render(_scrape_samples(request)),
+        media_type="text/plain; version=0.0.4"
+    )
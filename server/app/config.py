@@ -26,22 +26,136 @@ class Settings:
     DATA_DIR: Path = BASE_DIR / "data"
     
     # Model settings
+    # custom[-fp32|-int8|-torchscript|-compile|-onnx], deepface or mock
     MODEL_TYPE: str = os.getenv("MODEL_TYPE", "deepface")
+    ONNX_MODEL_PATH: str = os.getenv("ONNX_MODEL_PATH", "best_model.onnx")
+    # Baked artifact from `python -m scripts.bake_model`; used when present
+    BAKED_MODEL_PATH: str = os.getenv("BAKED_MODEL_PATH", "best_model.safetensors")
     CONFIDENCE_THRESHOLD: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.6"))
     DETECTION_INTERVAL: int = int(os.getenv("DETECTION_INTERVAL", "30"))
     
+    # Custom model cascade: a distilled student (scripts/train_student.py)
+    # classifies first; crops it is less sure of than the threshold go to the ViT
+    CASCADE: bool = os.getenv("CASCADE", "false").lower() == "true"
+    CASCADE_STUDENT_PATH: str = os.getenv("CASCADE_STUDENT_PATH", "student_model.pt")
+    CASCADE_THRESHOLD: float = float(os.getenv("CASCADE_THRESHOLD", str(CONFIDENCE_THRESHOLD)))
+    
+    # MODEL_TYPE=deepface face detection: server (the custom model's OpenCV
+    # detector and face cache), skip (frames are face crops) or a DeepFace
+    # detector backend (opencv, ssd, mtcnn, retinaface, yunet, ...)
+    DEEPFACE_DETECTOR: str = os.getenv("DEEPFACE_DETECTOR", "server")
+    
+    # Reuse the last result while frames stay (nearly) the same
+    CHANGE_THRESHOLD: float = float(os.getenv("CHANGE_THRESHOLD", "0.02"))
+    CHANGE_MAX_REUSE_MS: float = float(os.getenv("CHANGE_MAX_REUSE_MS", "2000"))
+    
+    # Mood smoothing: only report a mood once it has held for a few frames
+    MOOD_SMOOTHING: bool = os.getenv("MOOD_SMOOTHING", "true").lower() == "true"
+    MOOD_HISTORY_SIZE: int = int(os.getenv("MOOD_HISTORY_SIZE", "8"))
+    MOOD_SMOOTHING_ALPHA: float = float(os.getenv("MOOD_SMOOTHING_ALPHA", "0.3"))
+    MOOD_HYSTERESIS: float = float(os.getenv("MOOD_HYSTERESIS", "0.1"))
+    MOOD_MIN_DWELL: int = int(os.getenv("MOOD_MIN_DWELL", "2"))
+    
+    # Client send rate hints
+    ADAPTIVE_RATE: bool = os.getenv("ADAPTIVE_RATE", "true").lower() == "true"
+    MIN_CLIENT_FPS: float = float(os.getenv("MIN_CLIENT_FPS", "1"))
+    MAX_CLIENT_FPS: float = float(os.getenv("MAX_CLIENT_FPS", "30"))
+    RATE_HEADROOM: float = float(os.getenv("RATE_HEADROOM", "1.5"))
+    
+    # Result protocol version 2: default frames per cumulative ack
+    PROTOCOL_ACK_EVERY: int = int(os.getenv("PROTOCOL_ACK_EVERY", "10"))
+    
+    # Smallest side to decode JPEG frames at (0 = full resolution). When the
+    # model classifies face crops, frames are decoded large enough that a face
+    # this fraction of the frame's smaller side still spans DECODE_TARGET_SIZE
+    # pixels (0 = decode at DECODE_TARGET_SIZE anyway)
+    DECODE_TARGET_SIZE: int = int(os.getenv("DECODE_TARGET_SIZE", "224"))
+    DECODE_FACE_FRACTION: float = float(os.getenv("DECODE_FACE_FRACTION", "0.4"))
+    
+    # Batched inference
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "16"))
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+    
+    # Inference workers
+    INFERENCE_EXECUTOR: str = os.getenv("INFERENCE_EXECUTOR", "thread")
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "1"))
+    TORCH_THREADS_PER_WORKER: int = int(os.getenv("TORCH_THREADS_PER_WORKER", "0"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+    SHM_MAX_FRAME_SIZE: str = os.getenv("SHM_MAX_FRAME_SIZE", "1280x720")
+    SHM_MAX_RESTARTS: int = int(os.getenv("SHM_MAX_RESTARTS", "3"))
+    
+    # Split deployment: "local" runs the model in this process, "remote"
+    # makes this a gateway that sends frames to inference servers
+    # (python -m app.inference_server) at host:port or unix:/path addresses
+    INFERENCE_MODE: str = os.getenv("INFERENCE_MODE", "local")
+    INFERENCE_REPLICAS: str = os.getenv("INFERENCE_REPLICAS", "127.0.0.1:9001")
+    INFERENCE_RPC_TIMEOUT_S: float = float(os.getenv("INFERENCE_RPC_TIMEOUT_S", "5"))
+    INFERENCE_HEALTH_INTERVAL_S: float = float(os.getenv("INFERENCE_HEALTH_INTERVAL_S", "2"))
+    INFERENCE_HEALTH_TIMEOUT_S: float = float(os.getenv("INFERENCE_HEALTH_TIMEOUT_S", "1"))
+    
     # Music settings
+    # Binary catalog, or JSON/CSV tracks, to recommend from (default: data/songs.json)
+    MUSIC_CATALOG_PATH: str = os.getenv("MUSIC_CATALOG_PATH", "")
+    MUSIC_CATALOG_RELOAD_S: float = float(os.getenv("MUSIC_CATALOG_RELOAD_S", "5"))
+    MUSIC_TOP_K: int = int(os.getenv("MUSIC_TOP_K", "5"))
+    MUSIC_NO_REPEAT: int = int(os.getenv("MUSIC_NO_REPEAT", "20"))
     USE_SPOTIFY: bool = os.getenv("USE_SPOTIFY", "false").lower() == "true"
     SPOTIFY_CLIENT_ID: str = os.getenv("SPOTIFY_CLIENT_ID", "")
     SPOTIFY_CLIENT_SECRET: str = os.getenv("SPOTIFY_CLIENT_SECRET", "")
+    SPOTIFY_API_URL: str = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+    SPOTIFY_AUTH_URL: str = os.getenv("SPOTIFY_AUTH_URL", "https://accounts.spotify.com/api/token")
+    SPOTIFY_TIMEOUT_S: float = float(os.getenv("SPOTIFY_TIMEOUT_S", "2"))
+    SPOTIFY_MAX_CONNECTIONS: int = int(os.getenv("SPOTIFY_MAX_CONNECTIONS", "10"))
+    SPOTIFY_CACHE_SIZE: int = int(os.getenv("SPOTIFY_CACHE_SIZE", "4096"))
+    SPOTIFY_CACHE_TTL_S: float = float(os.getenv("SPOTIFY_CACHE_TTL_S", "3600"))
+    SPOTIFY_RATE_LIMIT: float = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+    SPOTIFY_BURST: int = int(os.getenv("SPOTIFY_BURST", "20"))
     
-    # Storage
+    # Logging: hot-path events are sampled to one per LOG_SAMPLE_INTERVAL_S
+    # per event name (0 logs every one); LOG_FORMAT is text or json
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_SAMPLE_INTERVAL_S: float = float(os.getenv("LOG_SAMPLE_INTERVAL_S", "1"))
+    
+    # Storage: archive received frames (as sent, in per-client hourly
+    # segments under STORAGE_DIR) from a background thread
     SAVE_FRAMES: bool = os.getenv("SAVE_FRAMES", "false").lower() == "true"
-
+    ARCHIVE_QUEUE_SIZE: int = int(os.getenv("ARCHIVE_QUEUE_SIZE", "512"))
+    ARCHIVE_FLUSH_INTERVAL_S: float = float(os.getenv("ARCHIVE_FLUSH_INTERVAL_S", "1"))
+    ARCHIVE_RETENTION_HOURS: float = float(os.getenv("ARCHIVE_RETENTION_HOURS", "24"))
+    ARCHIVE_MAX_MB: float = float(os.getenv("ARCHIVE_MAX_MB", "2048"))
+    
+    # Per-client mood history (GET /api/history): the last HISTORY_RAW_SIZE
+    # detections plus HISTORY_SECONDS per-second and HISTORY_MINUTES
+    # per-minute rollups in memory; HISTORY_SPILL also appends every
+    # finished rollup to HISTORY_DIR so queries can reach further back
+    HISTORY_ENABLED: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_RAW_SIZE: int = int(os.getenv("HISTORY_RAW_SIZE", "600"))
+    HISTORY_SECONDS: int = int(os.getenv("HISTORY_SECONDS", "3600"))
+    HISTORY_MINUTES: int = int(os.getenv("HISTORY_MINUTES", "1440"))
+    HISTORY_SPILL: bool = os.getenv("HISTORY_SPILL", "false").lower() == "true"
+    HISTORY_DIR: Path = Path(os.getenv("HISTORY_DIR", str(BASE_DIR / "storage" / "history")))
+    # Disconnected clients whose history stays queryable
+    HISTORY_MAX_CLOSED: int = int(os.getenv("HISTORY_MAX_CLOSED", "32"))
+    
     # Image Enhancement
     USE_CLAHE: bool = os.getenv("USE_CLAHE", "false").lower() == "true"
     USE_SHARPENING: bool = os.getenv("USE_SHARPENING", "false").lower() == "true"
     
+    # Face localization (custom and deepface models)
+    USE_FACE_DETECTION: bool = os.getenv("USE_FACE_DETECTION", "true").lower() == "true"
+    FACE_REDETECT_EVERY: int = int(os.getenv("FACE_REDETECT_EVERY", "5"))
+    FACE_MARGIN: float = float(os.getenv("FACE_MARGIN", "0.2"))
+    FACE_ALIGN: bool = os.getenv("FACE_ALIGN", "true").lower() == "true"
+    # Faces classified per frame (largest first; 1 = main face only), and
+    # how per-face IDs are kept across frames (box overlap, missed detections)
+    MAX_FACES: int = int(os.getenv("MAX_FACES", "4"))
+    FACE_TRACK_IOU: float = float(os.getenv("FACE_TRACK_IOU", "0.3"))
+    FACE_TRACK_MAX_MISSED: int = int(os.getenv("FACE_TRACK_MAX_MISSED", "3"))
+    
+    # Batched OpenCV preprocessing instead of PIL + ViTImageProcessor
+    FAST_PREPROCESSING: bool = os.getenv("FAST_PREPROCESSING", "true").lower() == "true"
+    
     def __init__(self):
         """Initialize settings and create directories"""
         self.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
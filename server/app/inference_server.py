@@ -0,0 +1,193 @@
+"""Standalone inference service for split gateway/inference deployments
+
+Usage:
+    python -m app.inference_server [--host 127.0.0.1] [--port 9001] [--unix PATH]
+
+Loads the model once and serves ``detect`` requests from any number of
+gateways (INFERENCE_MODE=remote) over the framed RPC in app/services/rpc.py.
+Frames from all gateways go through one BatchScheduler, so they share
+forward passes exactly like frames from local clients do.
+
+Operations:
+    detect  header {shape, face_hint}, payload = uint8 pixels -> {result}
+    health  -> {status, model_type, pending, ...}
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional, Set
+
+import numpy as np
+
+from app.config import settings
+from app.models.mood_detector import MoodDetector
+from app.services.event_log import setup_logging, shutdown_logging
+from app.services.inference_pool import InferencePool
+from app.services.inference_scheduler import BatchScheduler
+from app.services.rpc import read_message, write_message
+
+
+class InferenceServer:
+    """Serve batched mood detection over a local socket"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 9001, unix_path: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        
+        self.mood_detector: Optional[MoodDetector] = None
+        self.inference_pool: Optional[InferencePool] = None
+        self.scheduler: Optional[BatchScheduler] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        # Open gateway connections, closed on stop
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self.started = time.time()
+        
+        # Statistics
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+    
+    @property
+    def address(self) -> str:
+        return f"unix:{self.unix_path}" if self.unix_path else f"{self.host}:{self.port}"
+    
+    async def start(self):
+        """Load the model, start batching and listen"""
+        start = time.perf_counter()
+        print(f"📊 Loading {settings.MODEL_TYPE} model...")
+        self.mood_detector = MoodDetector(
+            load_model=settings.INFERENCE_EXECUTOR == "thread"
+        )
+        self.inference_pool = InferencePool(self.mood_detector)
+        self.inference_pool.start()
+        self.scheduler = BatchScheduler(self.inference_pool)
+        await self.scheduler.start()
+        
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            self.server = await asyncio.start_unix_server(self._handle_connection, self.unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"✅ Inference server on {self.address} ready in {time.perf_counter() - start:.2f}s")
+    
+    async def stop(self):
+        """Stop listening and release the workers"""
+        if self.server:
+            self.server.close()
+            # wait_closed() waits for every connection, and gateways stay
+            # connected (and reconnect), so hang up on them first
+            for writer in list(self._writers):
+                writer.close()
+            await self.server.wait_closed()
+        if self.scheduler:
+            await self.scheduler.stop()
+        if self.inference_pool:
+            self.inference_pool.shutdown()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests from one gateway until it disconnects"""
+        self.connections += 1
+        self._writers.add(writer)
+        tasks: Set[asyncio.Task] = set()
+        
+        try:
+            while True:
+                header, payload = await read_message(reader)
+                op = header.get("op")
+                
+                if op == "detect":
+                    # Requests run concurrently so they can share batches
+                    task = asyncio.create_task(self._detect(header, payload, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif op == "health":
+                    write_message(writer, {"id": header.get("id"), "result": self.health()})
+                else:
+                    write_message(writer, {"id": header.get("id"), "error": f"Unknown op: {op}"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+    
+    async def _detect(self, header: Dict, payload: bytes, writer: asyncio.StreamWriter):
+        """Run one frame through the batch scheduler and send its result"""
+        self.requests += 1
+        try:
+            image = np.frombuffer(payload, dtype=np.uint8).reshape(header["shape"])
+            result = await self.scheduler.submit(image, header.get("face_hint"))
+            response = {"id": header["id"], "result": result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            response = {"id": header["id"], "error": str(e)}
+        
+        if writer.is_closing():
+            return
+        write_message(writer, response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            # The gateway hung up; its connection handler cleans up
+            pass
+    
+    def health(self) -> Dict:
+        """Liveness plus load, used by gateways to pick a replica"""
+        stats = self.scheduler.get_stats()
+        return {
+            "status": "ok",
+            "model_type": self.mood_detector.model_type,
+            "model_load_s": round(self.mood_detector.load_seconds, 3),
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "connections": self.connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "total_detections": self.mood_detector.total_detections,
+            "pending": stats["pending"],
+            "inflight_batches": stats["inflight_batches"],
+            "avg_batch_size": stats["avg_batch_size"],
+            "cascade": self.mood_detector.cascade_stats(),
+        }
+
+
+async def serve(server: InferenceServer):
+    """Run until SIGINT/SIGTERM"""
+    setup_logging()
+    await server.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await stop.wait()
+    print("👋 Shutting down inference server...")
+    await server.stop()
+    shutdown_logging()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--unix", default=None, help="listen on a unix socket instead of TCP")
+    args = parser.parse_args()
+    
+    asyncio.run(serve(InferenceServer(args.host, args.port, args.unix)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
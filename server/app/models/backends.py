@@ -0,0 +1,131 @@
+"""Inference backends for the custom ViT
+
+Every backend takes a float32 NCHW numpy batch and returns numpy logits, so
+MoodDetector does not care whether the forward pass runs in eager PyTorch,
+a quantized or traced module, or ONNX Runtime.
+"""
+import copy
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+
+# MODEL_TYPE suffix -> backend, e.g. MODEL_TYPE=custom-int8
+BACKENDS = ("fp32", "int8", "torchscript", "compile", "onnx")
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap a HuggingFace classifier so it maps pixel_values -> logits"""
+    
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.model(pixel_values=pixel_values).logits
+
+
+class TorchBackend:
+    """Run a torch module (eager, quantized, traced or compiled)"""
+    
+    def __init__(self, module: torch.nn.Module, device: torch.device, name: str):
+        self.module = module
+        self.device = device
+        self.name = name
+    
+    def __call__(self, pixel_values: np.ndarray) -> np.ndarray:
+        inputs = torch.from_numpy(pixel_values).to(self.device)
+        with torch.inference_mode():
+            logits = self.module(inputs)
+        return logits.float().cpu().numpy()
+
+
+class OnnxBackend:
+    """Run an exported model under ONNX Runtime"""
+    
+    def __init__(self, session, name: str = "onnx"):
+        self.session = session
+        self.name = name
+        self.input_name = session.get_inputs()[0].name
+    
+    def __call__(self, pixel_values: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: pixel_values})[0]
+
+
+def _example_input(size: int, batch: int = 2) -> torch.Tensor:
+    return torch.zeros(batch, 3, size, size)
+
+
+def export_onnx(model: torch.nn.Module, path: Path, size: int = 224):
+    """Export the classifier to ONNX with a dynamic batch dimension"""
+    wrapper = _LogitsOnly(model).eval()
+    torch.onnx.export(
+        wrapper,
+        (_example_input(size),),
+        str(path),
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17
+    )
+
+
+def build_backend(
+    model: torch.nn.Module,
+    kind: str,
+    device: torch.device,
+    size: int = 224,
+    onnx_path: Optional[Path] = None,
+    num_threads: Optional[int] = None
+):
+    """Turn the loaded fp32 model into the requested backend"""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown backend '{kind}', expected one of {BACKENDS}")
+    
+    model = model.eval()
+    
+    if kind == "fp32":
+        return TorchBackend(_LogitsOnly(model), device, kind)
+    
+    if kind == "int8":
+        # Dynamic quantization: int8 weights for every Linear layer,
+        # activations quantized on the fly. CPU only.
+        quantized = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        ).cpu()
+        return TorchBackend(_LogitsOnly(quantized), torch.device("cpu"), kind)
+    
+    if kind == "torchscript":
+        example = _example_input(size).to(device)
+        with torch.inference_mode():
+            traced = torch.jit.trace(_LogitsOnly(model), example, strict=False)
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+        return TorchBackend(traced, device, kind)
+    
+    if kind == "compile":
+        compiled = torch.compile(_LogitsOnly(model), dynamic=True)
+        backend = TorchBackend(compiled, device, kind)
+        # Compile now rather than on the first client's frame
+        backend(_example_input(size).numpy())
+        return backend
+    
+    # ONNX Runtime
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise ImportError("onnxruntime not installed. Run: uv add onnx onnxruntime")
+    
+    onnx_path = Path(onnx_path or "best_model.onnx")
+    if not onnx_path.exists():
+        print(f"📦 Exporting ONNX model to {onnx_path}...")
+        export_onnx(copy.deepcopy(model).cpu(), onnx_path, size)
+    
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(
+        str(onnx_path), options, providers=["CPUExecutionProvider"]
+    )
+    return OnnxBackend(session, kind)
@@ -0,0 +1,76 @@
+"""Self-contained, memory-mappable model artifact
+
+A baked model is a single safetensors file holding the fine-tuned ViT
+weights, with the model config and the image processor's preprocessing
+constants stored as JSON in its header metadata. Loading it needs neither
+the HuggingFace hub nor the base checkpoint: the architecture is built on
+the meta device (no weight initialization) and the parameters are assigned
+straight from the memory-mapped file.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Tuple
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import load_file, save_file
+from transformers import ViTConfig, ViTForImageClassification, ViTImageProcessor
+
+FORMAT_VERSION = "1"
+
+
+def bake_model(
+    model: ViTForImageClassification,
+    processor: ViTImageProcessor,
+    path: Path,
+    source: str = ""
+):
+    """Write the model, its config and preprocessing constants to one file"""
+    state_dict = {
+        name: tensor.detach().cpu().contiguous()
+        for name, tensor in model.state_dict().items()
+    }
+    metadata = {
+        "format_version": FORMAT_VERSION,
+        "config": json.dumps(model.config.to_dict()),
+        "processor": json.dumps(processor.to_dict()),
+        "source": source,
+        "baked_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    
+    # Write next to the target and rename, so a running server never
+    # maps a half-written file
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    save_file(state_dict, str(tmp_path), metadata=metadata)
+    tmp_path.replace(path)
+
+
+def read_metadata(path: Path) -> dict:
+    """Header metadata of a baked model, without touching the weights"""
+    with safe_open(str(path), framework="pt") as f:
+        return f.metadata() or {}
+
+
+def load_baked_model(path: Path) -> Tuple[ViTForImageClassification, ViTImageProcessor]:
+    """Load a baked model on CPU with mmap'd weights and no network access"""
+    metadata = read_metadata(path)
+    if metadata.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a baked model (format {metadata.get('format_version')})")
+    
+    config = ViTConfig.from_dict(json.loads(metadata["config"]))
+    processor = ViTImageProcessor.from_dict(json.loads(metadata["processor"]))
+    
+    # Skip random initialization: build on the meta device, then assign
+    # the mmap-backed tensors as the parameters
+    with torch.device("meta"):
+        model = ViTForImageClassification(config)
+    model.load_state_dict(load_file(str(path)), assign=True)
+    
+    missing = [name for name, tensor in model.named_buffers() if tensor.is_meta]
+    missing += [name for name, tensor in model.named_parameters() if tensor.is_meta]
+    if missing:
+        raise ValueError(f"Baked model is missing tensors: {', '.join(missing)}")
+    
+    return model, processor
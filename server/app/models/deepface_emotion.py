@@ -0,0 +1,89 @@
+"""DeepFace's emotion model and face detectors, built once and run in batches
+
+``DeepFace.analyze`` looks its models up, detects faces on the full frame
+and preprocesses every face on its own for each call. Here the emotion CNN
+and the detector are built at startup and warmed up, and the server's face
+crops go through the CNN as one batch.
+"""
+import math
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.models.face_detector import FaceDetector
+
+# DeepFace's emotion CNN input: 48x48 grayscale in [0, 1]
+EMOTION_INPUT_SIZE = 48
+
+
+class DeepFaceEmotion:
+    """DeepFace's emotion CNN on batches of RGB face crops
+    
+    Returns class probabilities in DeepFace's label order, which is the
+    same as MoodDetector's.
+    """
+    
+    def __init__(self):
+        from deepface import DeepFace
+        self.model = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+    
+    def preprocess(self, crops: List[np.ndarray]) -> np.ndarray:
+        """Crops -> (n, 48, 48, 3) float32 BGR, the layout the model's predict takes"""
+        size = (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE)
+        batch = np.stack([cv2.resize(crop, size, interpolation=cv2.INTER_AREA) for crop in crops])
+        # predict converts BGR to grayscale; at 48x48 its own resize is a no-op
+        return batch[..., ::-1].astype(np.float32) / 255.0
+    
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        # A batch of one comes back as a single row
+        probs = np.asarray(self.model.predict(batch), dtype=np.float64).reshape(len(batch), -1)
+        return probs / probs.sum(axis=1, keepdims=True)
+    
+    def warm_up(self):
+        """Run the single-image and the batched path once (lazy graph building)"""
+        for count in (1, 2):
+            self(np.zeros((count, EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE, 3), np.float32))
+
+
+class DeepFaceDetector(FaceDetector):
+    """A DeepFace face detector backend behind the FaceDetector interface
+    
+    Cached faces, cropping and alignment work as in FaceDetector; only the
+    detection itself runs through DeepFace (opencv, ssd, mtcnn, retinaface,
+    yunet, ...), always on the full frame. The roll angle comes from the
+    detector's eye landmarks.
+    """
+    
+    def __init__(self, backend: str, **kwargs):
+        from deepface import DeepFace
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.detector = DeepFace.build_model(model_name=backend, task="face_detector")
+        # Several backends wrap models that aren't thread-safe
+        self._lock = threading.Lock()
+    
+    def locate_all(self, image: np.ndarray, hint: Optional[Dict] = None) -> List[Dict]:
+        if hint is not None and not hint.get("track"):
+            return super().locate_all(image, hint)
+        
+        with self._lock:
+            regions = self.detector.detect_faces(np.ascontiguousarray(image[..., ::-1]))
+        regions = sorted(regions, key=lambda r: r.w * r.h, reverse=True)[:self.max_faces]
+        return [
+            {"box": [int(r.x), int(r.y), int(r.w), int(r.h)], "angle": self._landmark_angle(r)}
+            for r in regions
+        ]
+    
+    def _landmark_angle(self, region) -> float:
+        """Roll angle from the eyes (DeepFace's left/right are the person's)"""
+        if not self.align or region.left_eye is None or region.right_eye is None:
+            return 0.0
+        # Image-left to image-right eye, as in FaceDetector._eye_angle
+        (x1, y1), (x2, y2) = region.right_eye, region.left_eye
+        return math.degrees(math.atan2(y2 - y1, x2 - x1))
+    
+    def warm_up(self):
+        """One detection on a blank frame (model download and lazy init)"""
+        self.locate_all(np.zeros((240, 320, 3), np.uint8))
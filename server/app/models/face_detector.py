@@ -0,0 +1,174 @@
+"""Face localization and cropping"""
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+class FaceDetector:
+    """Find, align and crop the faces in a frame with OpenCV Haar cascades
+    
+    A face is described by a small dict, ``{"box": [x, y, w, h], "angle": deg}``,
+    so it can be cached per client and sent back as a hint with the next frame.
+    With a hint the detector either trusts the cached box as-is, or
+    (``"track": True``) re-detects only in a window around it, and falls back
+    to a full-frame search when the face has moved out of that window.
+    
+    ``locate_all`` does the same for up to ``max_faces`` faces; with more
+    than one, a tracking re-detect searches the whole (downscaled) frame so
+    people who just walked in are found too.
+    """
+    
+    def __init__(
+        self,
+        margin: float = 0.2,
+        align: bool = True,
+        detect_size: int = 240,
+        max_faces: int = 1
+    ):
+        self.margin = margin
+        self.align = align
+        self.detect_size = detect_size
+        self.max_faces = max(1, max_faces)
+        self._local = threading.local()
+    
+    def _cascades(self) -> Tuple[cv2.CascadeClassifier, cv2.CascadeClassifier]:
+        """Per-thread classifiers (detectMultiScale isn't thread-safe)"""
+        local = self._local
+        if not hasattr(local, "face"):
+            local.face = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            )
+            local.eyes = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_eye.xml"
+            )
+        return local.face, local.eyes
+    
+    def _detect(self, gray: np.ndarray, offset: Tuple[int, int] = (0, 0)) -> Optional[Box]:
+        """Largest face in a grayscale image, in full-frame coordinates"""
+        boxes = self._detect_all(gray, offset, limit=1)
+        return boxes[0] if boxes else None
+    
+    def _detect_all(
+        self,
+        gray: np.ndarray,
+        offset: Tuple[int, int] = (0, 0),
+        limit: int = 1
+    ) -> List[Box]:
+        """Up to ``limit`` faces in a grayscale image, largest first"""
+        face_cascade, _ = self._cascades()
+        
+        # The cascade's cost grows with area; search a reduced copy
+        scale = min(1.0, self.detect_size / min(gray.shape[:2]))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale,
+                              interpolation=cv2.INTER_AREA)
+        
+        min_side = max(24, min(gray.shape[:2]) // 8)
+        faces = face_cascade.detectMultiScale(
+            gray, scaleFactor=1.15, minNeighbors=5, minSize=(min_side, min_side)
+        )
+        if len(faces) == 0:
+            return []
+        
+        boxes = []
+        for face in sorted(faces, key=lambda f: f[2] * f[3], reverse=True)[:limit]:
+            x, y, w, h = (v / scale for v in face)
+            boxes.append((int(x + offset[0]), int(y + offset[1]), int(w), int(h)))
+        return boxes
+    
+    def _eye_angle(self, gray: np.ndarray, box: Box) -> float:
+        """Roll angle of the face from its two eyes (0 if not found)"""
+        _, eye_cascade = self._cascades()
+        x, y, w, h = box
+        # Eyes sit in the upper half of the face box
+        upper = gray[y:y + h // 2, x:x + w]
+        eyes = eye_cascade.detectMultiScale(
+            upper, scaleFactor=1.1, minNeighbors=5, minSize=(w // 8, w // 8)
+        )
+        if len(eyes) < 2:
+            return 0.0
+        
+        # Two largest detections, left to right
+        eyes = sorted(sorted(eyes, key=lambda e: e[2] * e[3])[-2:], key=lambda e: e[0])
+        (x1, y1, w1, h1), (x2, y2, w2, h2) = eyes
+        dx = (x2 + w2 / 2) - (x1 + w1 / 2)
+        dy = (y2 + h2 / 2) - (y1 + h1 / 2)
+        angle = math.degrees(math.atan2(dy, dx))
+        # Ignore implausible pairs (e.g. eye + eyebrow)
+        return angle if abs(angle) <= 30 else 0.0
+    
+    def locate(self, image: np.ndarray, hint: Optional[Dict] = None) -> Optional[Dict]:
+        """Find the face in a frame, using a cached face as a hint"""
+        if hint is not None and not hint.get("track"):
+            return {"box": list(hint["box"]), "angle": hint.get("angle", 0.0)}
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        frame_h, frame_w = gray.shape[:2]
+        box = None
+        
+        if hint is not None:
+            # Search a window twice the size of the cached box first
+            x, y, w, h = hint["box"]
+            x0, y0 = max(0, x - w // 2), max(0, y - h // 2)
+            x1, y1 = min(frame_w, x + w + w // 2), min(frame_h, y + h + h // 2)
+            if x1 > x0 and y1 > y0:
+                box = self._detect(gray[y0:y1, x0:x1], offset=(x0, y0))
+        
+        if box is None:
+            # No hint, or tracking lost: search the whole frame
+            box = self._detect(gray)
+        if box is None:
+            return None
+        
+        angle = self._eye_angle(gray, box) if self.align else 0.0
+        return {"box": list(box), "angle": angle}
+    
+    def locate_all(self, image: np.ndarray, hint: Optional[Dict] = None) -> List[Dict]:
+        """Find up to ``max_faces`` faces, using the cached ones as a hint
+        
+        ``hint`` is ``{"faces": [face, ...], "track": bool}``.
+        """
+        if hint is not None and not hint.get("track"):
+            return [
+                {"box": list(face["box"]), "angle": face.get("angle", 0.0)}
+                for face in hint["faces"]
+            ]
+        
+        if self.max_faces == 1:
+            # Single face: keep the cheaper windowed re-detect
+            face_hint = {**hint["faces"][0], "track": True} if hint and hint["faces"] else None
+            face = self.locate(image, face_hint)
+            return [face] if face is not None else []
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return [
+            {"box": list(box), "angle": self._eye_angle(gray, box) if self.align else 0.0}
+            for box in self._detect_all(gray, limit=self.max_faces)
+        ]
+    
+    def crop(self, image: np.ndarray, face: Dict) -> np.ndarray:
+        """Cut out the face with a margin, rotated upright if needed"""
+        x, y, w, h = face["box"]
+        side = int(max(w, h) * (1 + 2 * self.margin))
+        cx, cy = x + w / 2, y + h / 2
+        angle = face.get("angle", 0.0)
+        
+        if abs(angle) < 1.0:
+            frame_h, frame_w = image.shape[:2]
+            x0, y0 = max(0, int(cx - side / 2)), max(0, int(cy - side / 2))
+            x1, y1 = min(frame_w, x0 + side), min(frame_h, y0 + side)
+            return image[y0:y1, x0:x1]
+        
+        # Rotate about the face centre and translate it to the crop centre,
+        # computing only the output pixels
+        matrix = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+        matrix[0, 2] += side / 2 - cx
+        matrix[1, 2] += side / 2 - cy
+        return cv2.warpAffine(image, matrix, (side, side),
+                              flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
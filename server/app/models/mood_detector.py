@@ -5,19 +5,19 @@
 
 # class MoodDetector:
 #     """Detect mood/emotion from facial images"""
-    
+
 #     def __init__(self):
 #         self.model_type = settings.MODEL_TYPE
 #         self.confidence_threshold = settings.CONFIDENCE_THRESHOLD
 #         self.total_detections = 0
-        
+
 #         print(f"🔧 Initializing {self.model_type} model...")
-        
+
 #         if self.model_type == "deepface":
 #             self._init_deepface()
 #         else:
 #             print("⚠️  Using mock detector - implement your custom model!")
-    
+
 #     def _init_deepface(self):
 #         """Initialize DeepFace model"""
 #         try:
@@ -27,14 +27,14 @@
 #         except ImportError:
 #             print("❌ DeepFace not installed. Run: uv add deepface")
 #             self.deepface = None
-    
+
 #     def detect_mood(self, image: np.ndarray) -> Optional[Dict]:
 #         """
 #         Detect mood from image
-        
+
 #         Args:
 #             image: numpy array of image (RGB)
-            
+
 #         Returns:
 #             Dict with mood detection results
 #         """
@@ -46,17 +46,17 @@
 #                     enforce_detection=False,
 #                     silent=True
 #                 )
-                
+
 #                 # DeepFace returns list, get first result
 #                 if isinstance(result, list):
 #                     result = result[0]
-                
+
 #                 emotions = result.get('emotion', {})
 #                 dominant_emotion = result.get('dominant_emotion', 'neutral')
 #                 confidence = emotions.get(dominant_emotion, 0) / 100.0
-                
+
 #                 self.total_detections += 1
-                
+
 #                 return {
 #                     "success": True,
 #                     "dominant_emotion": dominant_emotion,
@@ -68,16 +68,16 @@
 #                 import random
 #                 moods = ["happy", "sad", "neutral", "angry", "surprise"]
 #                 mood = random.choice(moods)
-                
+
 #                 self.total_detections += 1
-                
+
 #                 return {
 #                     "success": True,
 #                     "dominant_emotion": mood,
 #                     "confidence": random.uniform(0.7, 0.95),
 #                     "emotions": {m: random.uniform(0, 100) for m in moods}
 #                 }
-                
+
 #         except Exception as e:
 #             print(f"❌ Mood detection error: {e}")
 #             return {
@@ -86,92 +86,231 @@
 #             }
 
 """Mood/Emotion detection model"""
+import logging
+import time
 import numpy as np
-import torch
-import cv2
-from transformers import ViTForImageClassification, ViTImageProcessor
 from PIL import Image
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from app.config import settings
+from app.services.event_log import log_event
+
+# torch, cv2, transformers and deepface are imported lazily by the backend
+# that needs them, so mock and deepface servers don't pay for the ViT stack
 
 
 class MoodDetector:
     """Detect mood/emotion from facial images using Vision Transformer"""
     
-    def __init__(self):
+    def __init__(self, load_model: bool = True):
         self.model_type = settings.MODEL_TYPE
         self.confidence_threshold = settings.CONFIDENCE_THRESHOLD
         self.total_detections = 0
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        
+        # MODEL_TYPE=custom[-<backend>], e.g. custom-int8 or custom-onnx
+        self.is_custom = self.model_type.startswith("custom")
+        self.backend_name = self.model_type.partition("-")[2] or "fp32"
+        self.device = "cpu"
+        if self.is_custom:
+            import torch
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            if self.backend_name in ("int8", "onnx"):
+                # Quantized and ONNX Runtime backends run on CPU only
+                self.device = torch.device('cpu')
+        self.model = None
+        self.model_source = None
+        self.load_seconds = 0.0
+        self.preprocessor = None
+        self.face_detector = None
+        self.deepface = None
+        
+        # Cascade: a small student classifies first, the ViT only when it's unsure
+        self.student = None
+        self.student_preprocessor = None
+        self.student_temperature = 1.0
+        self.cascade_threshold = settings.CASCADE_THRESHOLD
+        self.cascade_crops = 0
+        self.cascade_escalated = 0
+        
+        # Mock detector: the "scene" keeps one mood for a while, like a face would
+        self._mock_mood = None
         
         # Emotion classes (matching your training)
         self.emotion_labels = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
         
+        if not load_model:
+            # Inference runs in worker processes that load their own copy
+            print(f"ℹ️ {self.model_type} model will be loaded by inference workers")
+            return
+        
         print(f"🔧 Initializing {self.model_type} model on {self.device}...")
+        start = time.perf_counter()
         
-        if self.model_type == "custom":
+        if self.is_custom:
             self._init_custom_model()
         elif self.model_type == "deepface":
             self._init_deepface()
         else:
             print("⚠️ Using mock detector")
+        
+        self.load_seconds = time.perf_counter() - start
+        print(f"⏱️ Model ready in {self.load_seconds:.2f}s")
     
     def _init_custom_model(self):
         """Initialize custom Vision Transformer model"""
+        from app.models.baked import load_baked_model
+        from app.models.face_detector import FaceDetector
+        from app.models.preprocessing import BatchPreprocessor
+        
         try:
-            model_path = Path("best_model.pth")
-            
-            if not model_path.exists():
-                raise FileNotFoundError(f"Model file not found: {model_path}")
-            
-            # Load checkpoint
-            checkpoint = torch.load(model_path, map_location=self.device)
-            print(f"📦 Loading checkpoint...")
-            
-            # Initialize ViT model architecture
-            self.model = ViTForImageClassification.from_pretrained(
-                'google/vit-base-patch16-224',
-                num_labels=7,
-                ignore_mismatched_sizes=True
-            )
+            baked_path = Path(settings.BAKED_MODEL_PATH)
             
-            # Load trained weights
-            if isinstance(checkpoint, dict):
-                if 'model_state_dict' in checkpoint:
-                    self.model.load_state_dict(checkpoint['model_state_dict'])
-                    print(f"📊 Epoch: {checkpoint.get('epoch', 'N/A')}")
-                    print(f"📊 Val Accuracy: {checkpoint.get('val_accuracy', 'N/A'):.2%}")
-                    print(f"📊 Val Loss: {checkpoint.get('val_loss', 'N/A'):.4f}")
-                elif 'state_dict' in checkpoint:
-                    self.model.load_state_dict(checkpoint['state_dict'])
-                else:
-                    self.model.load_state_dict(checkpoint)
+            if baked_path.exists():
+                # Self-contained artifact: mmap'd weights, no network access
+                self.model, self.processor = load_baked_model(baked_path)
+                self.model_source = "baked"
+                print(f"📦 Loaded baked model from {baked_path}")
             else:
-                self.model.load_state_dict(checkpoint)
+                self.model, self.processor = self._load_pretrained_model()
+                self.model_source = "pretrained"
+                print("💡 Run `python -m scripts.bake_model` for a faster, offline startup")
             
             self.model.to(self.device)
             self.model.eval()
             
-            # Initialize image processor (handles preprocessing automatically)
-            self.processor = ViTImageProcessor.from_pretrained('google/vit-base-patch16-224')
-            
             # Classical CV enhancement flags (from your config)
             self.use_clahe = getattr(settings, 'USE_CLAHE', True)
             self.use_sharpening = getattr(settings, 'USE_SHARPENING', True)
             
+            # Swap in the configured inference backend
+            self.model = self._build_backend(self.model)
+            
+            # Crop to the face before classification
+            if settings.USE_FACE_DETECTION:
+                self.face_detector = FaceDetector(
+                    margin=settings.FACE_MARGIN,
+                    align=settings.FACE_ALIGN,
+                    max_faces=settings.MAX_FACES
+                )
+            
+            # Fused batch preprocessing using the processor's constants
+            if settings.FAST_PREPROCESSING:
+                self.preprocessor = BatchPreprocessor.from_processor(
+                    self.processor,
+                    use_clahe=self.use_clahe,
+                    use_sharpening=self.use_sharpening
+                )
+            
+            if settings.CASCADE:
+                self._init_student()
+            
             print(f"✅ Vision Transformer loaded successfully")
             print(f"🎯 Emotions: {', '.join(self.emotion_labels)}")
             print(f"🔧 CLAHE: {self.use_clahe}, Sharpening: {self.use_sharpening}")
-            
+            print(f"🔧 Face detection: {self.face_detector is not None}")
+        
         except Exception as e:
             print(f"❌ Failed to load custom model: {e}")
             import traceback
             traceback.print_exc()
             self.model = None
     
+    def _init_student(self):
+        """Load the first-pass student model of the cascade"""
+        from app.models.backends import TorchBackend
+        from app.models.preprocessing import BatchPreprocessor
+        from app.models.student import load_student
+        
+        path = Path(settings.CASCADE_STUDENT_PATH)
+        if not path.exists():
+            print(f"❌ Student model not found: {path}; cascade disabled")
+            print("💡 Run `python -m scripts.train_student` to distill one from the ViT")
+            return
+        
+        module, meta = load_student(path, self.device)
+        if meta["labels"] != self.emotion_labels:
+            print(f"❌ Student labels {meta['labels']} don't match; cascade disabled")
+            return
+        
+        self.student = TorchBackend(module, self.device, "student")
+        self.student_temperature = meta["temperature"]
+        self.student_preprocessor = BatchPreprocessor(
+            size=meta["size"],
+            image_mean=meta["image_mean"],
+            image_std=meta["image_std"],
+            use_clahe=self.use_clahe,
+            use_sharpening=self.use_sharpening
+        )
+        print(f"🪜 Cascade: {meta['size']}px student first, ViT below "
+              f"{self.cascade_threshold:.2f} confidence")
+    
+    def _load_pretrained_model(self):
+        """Build the ViT from the HuggingFace base model plus best_model.pth"""
+        import torch
+        from transformers import ViTForImageClassification, ViTImageProcessor
+        
+        model_path = Path("best_model.pth")
+        
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        
+        # Load checkpoint
+        checkpoint = torch.load(model_path, map_location="cpu")
+        print(f"📦 Loading checkpoint...")
+        
+        # Initialize ViT model architecture
+        model = ViTForImageClassification.from_pretrained(
+            'google/vit-base-patch16-224',
+            num_labels=7,
+            ignore_mismatched_sizes=True
+        )
+        
+        # Load trained weights
+        if isinstance(checkpoint, dict):
+            if 'model_state_dict' in checkpoint:
+                model.load_state_dict(checkpoint['model_state_dict'])
+                print(f"📊 Epoch: {checkpoint.get('epoch', 'N/A')}")
+                print(f"📊 Val Accuracy: {checkpoint.get('val_accuracy', 'N/A'):.2%}")
+                print(f"📊 Val Loss: {checkpoint.get('val_loss', 'N/A'):.4f}")
+            elif 'state_dict' in checkpoint:
+                model.load_state_dict(checkpoint['state_dict'])
+            else:
+                model.load_state_dict(checkpoint)
+        else:
+            model.load_state_dict(checkpoint)
+        
+        # Initialize image processor (handles preprocessing automatically)
+        processor = ViTImageProcessor.from_pretrained('google/vit-base-patch16-224')
+        
+        return model, processor
+    
+    def _build_backend(self, vit_model):
+        """Wrap the fp32 model in the backend selected by MODEL_TYPE"""
+        import torch
+        from app.models.backends import build_backend
+        
+        size = self.processor.size["height"]
+        try:
+            backend = build_backend(
+                vit_model,
+                self.backend_name,
+                self.device,
+                size=size,
+                onnx_path=Path(settings.ONNX_MODEL_PATH),
+                num_threads=torch.get_num_threads()
+            )
+        except Exception as e:
+            print(f"❌ Failed to build {self.backend_name} backend: {e}")
+            print("⚠️ Falling back to fp32")
+            backend = build_backend(vit_model, "fp32", self.device)
+        
+        print(f"⚙️ Inference backend: {backend.name}")
+        return backend
+    
     def _apply_clahe(self, image: np.ndarray) -> np.ndarray:
         """Apply CLAHE for contrast enhancement (Lab 1-2)"""
+        import cv2
+        
         # Convert to LAB color space
         lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
         l, a, b = cv2.split(lab)
@@ -186,12 +325,14 @@ class MoodDetector:
     
     def _apply_sharpening(self, image: np.ndarray) -> np.ndarray:
         """Apply unsharp masking for feature enhancement (Lab 5)"""
+        import cv2
+        
         gaussian = cv2.GaussianBlur(image, (0, 0), 2.0)
         sharpened = cv2.addWeighted(image, 1.5, gaussian, -0.5, 0)
         return np.clip(sharpened, 0, 255).astype(np.uint8)
     
-    def _preprocess_image(self, image: np.ndarray) -> Dict:
-        """Preprocess image with classical CV techniques + ViT processor"""
+    def _enhance_image(self, image: np.ndarray) -> np.ndarray:
+        """Apply classical CV enhancements to a single image"""
         # Ensure uint8 format
         if image.dtype == np.float32 or image.dtype == np.float64:
             image = (image * 255).astype(np.uint8)
@@ -203,16 +344,223 @@ class MoodDetector:
         if self.use_sharpening:
             image = self._apply_sharpening(image)
         
+        return image
+    
+    def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
+        """Preprocess image with classical CV techniques + ViT processor"""
+        return self._preprocess_batch([image])
+    
+    def _preprocess_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """Preprocess a list of images into one batched ViT input"""
+        if self.preprocessor is not None:
+            # Resize + normalize straight into a reusable float32 buffer
+            return self.preprocessor(images)
+        
         # Convert to PIL for ViT processor
-        pil_image = Image.fromarray(image)
+        pil_images = [Image.fromarray(self._enhance_image(image)) for image in images]
         
         # Use ViT processor (handles resizing, normalization, etc.)
-        inputs = self.processor(images=pil_image, return_tensors="pt")
+        inputs = self.processor(images=pil_images, return_tensors="np")
         
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        return inputs["pixel_values"].astype(np.float32)
+    
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        """Row-wise softmax"""
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+    
+    def _build_custom_result(self, probs: np.ndarray) -> Dict:
+        """Build a result dict from one row of class probabilities"""
+        predicted = int(np.argmax(probs))
+        confidence_score = float(probs[predicted])
+        
+        # Get emotion probabilities for all classes
+        emotions = {label: float(prob * 100) 
+                   for label, prob in zip(self.emotion_labels, probs)}
+        
+        return {
+            "success": True,
+            "dominant_emotion": self.emotion_labels[predicted],
+            "confidence": confidence_score,
+            "emotions": emotions,
+            "model_type": "deepface" if self.deepface is not None else "ViT-base",
+            "backend": self.backend_name if self.is_custom else None,
+            "meets_threshold": confidence_score >= self.confidence_threshold
+        }
+    
+    def _classify(self, crops: List[np.ndarray]) -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+        """Class probabilities for a batch of crops
+        
+        Returns the probabilities, which crops went to the ViT (None
+        without a cascade) and the seconds spent in forward passes.
+        """
+        if self.deepface is not None:
+            batch = self.deepface.preprocess(crops)
+            start = time.perf_counter()
+            probs = self.deepface(batch)
+            return probs, None, time.perf_counter() - start
+        
+        if self.student is None:
+            pixel_values = self._preprocess_batch(crops)
+            start = time.perf_counter()
+            probs = self._softmax(self.model(pixel_values))
+            return probs, None, time.perf_counter() - start
+        
+        # The student sees every crop; temperature-scaled so its confidence
+        # is calibrated against the threshold
+        pixel_values = self.student_preprocessor(crops)
+        start = time.perf_counter()
+        probs = self._softmax(self.student(pixel_values) / self.student_temperature)
+        inference_seconds = time.perf_counter() - start
+        
+        escalated = probs.max(axis=1) < self.cascade_threshold
+        if escalated.any():
+            # Only the uncertain crops pay for the ViT, still in one batch
+            indices = np.flatnonzero(escalated)
+            pixel_values = self._preprocess_batch([crops[i] for i in indices])
+            start = time.perf_counter()
+            probs[indices] = self._softmax(self.model(pixel_values))
+            inference_seconds += time.perf_counter() - start
+        return probs, escalated, inference_seconds
+    
+    def record_cascade(self, results: List[Optional[Dict]]):
+        """Add the cascade decisions reported in batch results to the stats"""
+        for result in results:
+            cascade = result.get("cascade") if result else None
+            if cascade:
+                self.cascade_crops += cascade["crops"]
+                self.cascade_escalated += cascade["escalated"]
+    
+    def _build_faces_result(self, faces: List[Dict], probs: np.ndarray) -> Dict:
+        """Per-face results plus their aggregate for one frame
+        
+        The aggregate (the top-level emotions) is the confidence-weighted
+        mean of the faces' probabilities; for a single face it is simply
+        that face's result.
+        """
+        weights = probs.max(axis=1)
+        result = self._build_custom_result(weights @ probs / weights.sum())
+        result["face_found"] = True
+        result["faces"] = []
+        for face, row in zip(faces, probs):
+            face_result = self._build_custom_result(row)
+            result["faces"].append({
+                **face,
+                "dominant_emotion": face_result["dominant_emotion"],
+                "confidence": face_result["confidence"],
+                "emotions": face_result["emotions"],
+            })
+        return result
+    
+    def _locate_faces(
+        self,
+        images: List[np.ndarray],
+        face_hints: Optional[List[Optional[Dict]]]
+    ) -> List[List[Dict]]:
+        """Find the faces in each frame (empty where there are none)"""
+        hints = face_hints or [None] * len(images)
+        return [self.face_detector.locate_all(image, hint) for image, hint in zip(images, hints)]
+    
+    def detect_mood_batch(
+        self,
+        images: List[np.ndarray],
+        face_hints: Optional[List[Optional[Dict]]] = None
+    ) -> List[Dict]:
+        """
+        Detect mood for several images with a single forward pass
+        
+        Every face of every frame is cropped and classified in the same
+        forward pass; each frame's result carries its ``faces`` and their
+        aggregate.
         
-        return inputs
+        Args:
+            images: list of numpy arrays of images (RGB)
+            face_hints: optional cached faces per image (see FaceDetector.locate_all)
+        
+        Returns:
+            List of mood detection result dicts, in the same order as images
+        """
+        if not images:
+            return []
+        
+        if self.model is None and self.deepface is None:
+            # The mock detector has no batched path
+            start = time.perf_counter()
+            results = [self.detect_mood(image) for image in images]
+            return self._with_timings(results, inference=time.perf_counter() - start)
+        
+        try:
+            start = time.perf_counter()
+            preprocess_seconds = inference_seconds = 0.0
+            results: List[Optional[Dict]] = [None] * len(images)
+            crops = images
+            
+            if self.face_detector is not None:
+                frame_faces = self._locate_faces(images, face_hints)
+                # One crop per face; frames without a face skip inference entirely
+                crops = [
+                    self.face_detector.crop(images[i], face)
+                    for i, faces in enumerate(frame_faces) for face in faces
+                ]
+                for i, faces in enumerate(frame_faces):
+                    if not faces:
+                        results[i] = {
+                            "success": False,
+                            "face_found": False,
+                            "error": "No face detected"
+                        }
+            
+            if crops:
+                # Run inference for the whole batch (through the cascade if enabled)
+                probs, escalated, inference_seconds = self._classify(crops)
+                preprocess_seconds = time.perf_counter() - start - inference_seconds
+                self.total_detections += len(crops)
+                
+                # (frame, first crop row, end row) per frame that had crops
+                frame_rows = []
+                if self.face_detector is None:
+                    results = [self._build_custom_result(row) for row in probs]
+                    frame_rows = [(i, i, i + 1) for i in range(len(results))]
+                else:
+                    # Crops are grouped by frame, in frame order
+                    start_row = 0
+                    for i, faces in enumerate(frame_faces):
+                        if faces:
+                            end_row = start_row + len(faces)
+                            results[i] = self._build_faces_result(faces, probs[start_row:end_row])
+                            frame_rows.append((i, start_row, end_row))
+                            start_row = end_row
+                
+                if escalated is not None:
+                    # Which model decided, per frame (and per face)
+                    for i, first, end in frame_rows:
+                        results[i]["cascade"] = {
+                            "crops": end - first,
+                            "escalated": int(escalated[first:end].sum()),
+                        }
+                        for face, went_up in zip(results[i].get("faces", ()), escalated[first:end]):
+                            face["escalated"] = bool(went_up)
+                    self.record_cascade(results)
+            else:
+                preprocess_seconds = time.perf_counter() - start
+            
+            # Face location and crops count as preprocessing
+            return self._with_timings(
+                results, preprocess=preprocess_seconds, inference=inference_seconds
+            )
+        
+        except Exception as e:
+            log_event("batch_detection_error", logging.ERROR, exc_info=True, error=str(e))
+            return [{"success": False, "error": str(e)} for _ in images]
+    
+    @staticmethod
+    def _with_timings(results: List[Optional[Dict]], **timings: float) -> List[Optional[Dict]]:
+        """Attach this batch's stage timings (seconds) to every result"""
+        for result in results:
+            if result is not None:
+                result["timings"] = timings
+        return results
     
     def detect_mood(self, image: np.ndarray) -> Optional[Dict]:
         """
@@ -225,101 +573,109 @@ class MoodDetector:
             Dict with mood detection results
         """
         try:
-            if self.model_type == "custom" and self.model is not None:
-                # Preprocess image
-                inputs = self._preprocess_image(image)
-                
-                # Run inference
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    logits = outputs.logits
-                    probabilities = torch.nn.functional.softmax(logits, dim=-1)
-                    confidence, predicted = torch.max(probabilities, 1)
-                
-                # Get emotion probabilities for all classes
-                probs = probabilities[0].cpu().numpy()
-                emotions = {label: float(prob * 100) 
-                           for label, prob in zip(self.emotion_labels, probs)}
-                
-                dominant_emotion = self.emotion_labels[predicted.item()]
-                confidence_score = float(confidence.item())
-                
-                self.total_detections += 1
-                
-                return {
-                    "success": True,
-                    "dominant_emotion": dominant_emotion,
-                    "confidence": confidence_score,
-                    "emotions": emotions,
-                    "model_type": "ViT-base",
-                    "meets_threshold": confidence_score >= self.confidence_threshold
-                }
-            
-            elif self.model_type == "deepface" and self.deepface:
-                result = self.deepface.analyze(
-                    img_path=image,
-                    actions=['emotion'],
-                    enforce_detection=False,
-                    silent=True
-                )
-                
-                if isinstance(result, list):
-                    result = result[0]
-                
-                emotions = result.get('emotion', {})
-                dominant_emotion = result.get('dominant_emotion', 'neutral')
-                confidence = emotions.get(dominant_emotion, 0) / 100.0
-                
-                self.total_detections += 1
-                
-                return {
-                    "success": True,
-                    "dominant_emotion": dominant_emotion,
-                    "confidence": confidence,
-                    "emotions": emotions,
-                    "model_type": "deepface"
-                }
+            if self.model is not None or self.deepface is not None:
+                return self.detect_mood_batch([image])[0]
             
             else:
                 # Mock detection for testing
                 import random
-                mood = random.choice(self.emotion_labels)
+                if self._mock_mood is None or random.random() < 1 / 30:
+                    self._mock_mood = random.choice(self.emotion_labels)
+                mood = self._mock_mood
+                confidence = random.uniform(0.7, 0.95)
+                
+                # Peaked on the mood, the rest spread randomly over the others
+                others = [m for m in self.emotion_labels if m != mood]
+                weights = [random.random() for _ in others]
+                emotions = {
+                    m: (1 - confidence) * 100 * w / sum(weights) for m, w in zip(others, weights)
+                }
+                emotions[mood] = confidence * 100
                 
                 self.total_detections += 1
                 
                 return {
                     "success": True,
                     "dominant_emotion": mood,
-                    "confidence": random.uniform(0.7, 0.95),
-                    "emotions": {m: random.uniform(0, 100) for m in self.emotion_labels},
+                    "confidence": confidence,
+                    "emotions": emotions,
                     "model_type": "mock"
                 }
         
         except Exception as e:
-            print(f"❌ Mood detection error: {e}")
-            import traceback
-            traceback.print_exc()
+            log_event("detection_error", logging.ERROR, exc_info=True, error=str(e))
             return {
                 "success": False,
                 "error": str(e)
             }
     
     def _init_deepface(self):
-        """Initialize DeepFace model"""
+        """Build DeepFace's emotion model and face detector once and warm them up
+        
+        Faces are found by the server's FaceDetector (DEEPFACE_DETECTOR=server,
+        with the same face caching as the custom model), by one of DeepFace's
+        detector backends, or not at all (skip: frames are already faces).
+        """
         try:
-            from deepface import DeepFace
-            self.deepface = DeepFace
-            print("✅ DeepFace model loaded")
+            import deepface  # noqa: F401
         except ImportError:
             print("❌ DeepFace not installed. Run: uv add deepface")
+            return
+        
+        from app.models.deepface_emotion import DeepFaceDetector, DeepFaceEmotion
+        from app.models.face_detector import FaceDetector
+        
+        detector = settings.DEEPFACE_DETECTOR
+        try:
+            self.deepface = DeepFaceEmotion()
+            face_options = dict(
+                margin=settings.FACE_MARGIN,
+                align=settings.FACE_ALIGN,
+                max_faces=settings.MAX_FACES
+            )
+            if detector == "server":
+                if settings.USE_FACE_DETECTION:
+                    self.face_detector = FaceDetector(**face_options)
+            elif detector != "skip":
+                self.face_detector = DeepFaceDetector(detector, **face_options)
+            
+            # Build graphs and load weights now, not on the first client's frame
+            start = time.perf_counter()
+            self.deepface.warm_up()
+            if isinstance(self.face_detector, DeepFaceDetector):
+                self.face_detector.warm_up()
+            print(f"✅ DeepFace emotion model loaded (detector: {detector}, "
+                  f"warm-up {time.perf_counter() - start:.2f}s)")
+        
+        except Exception as e:
+            print(f"❌ Failed to load DeepFace: {e}")
             self.deepface = None
+            self.face_detector = None
+    
+    def cascade_stats(self) -> Optional[Dict]:
+        """How often the student was unsure and the ViT had to run"""
+        if not settings.CASCADE:
+            return None
+        return {
+            "threshold": self.cascade_threshold,
+            "student_loaded": self.student is not None,
+            "crops": self.cascade_crops,
+            "escalated": self.cascade_escalated,
+            "escalation_rate": (
+                self.cascade_escalated / self.cascade_crops if self.cascade_crops else 0.0
+            ),
+        }
     
     def get_stats(self) -> Dict:
         """Get detector statistics"""
         return {
+            "cascade": self.cascade_stats(),
             "total_detections": self.total_detections,
             "model_type": self.model_type,
+            "backend": self.backend_name if self.is_custom else None,
             "device": str(self.device),
+            "model_source": self.model_source,
+            "load_seconds": round(self.load_seconds, 3),
             "emotion_labels": self.emotion_labels,
             "num_classes": len(self.emotion_labels)
         }
\ No newline at end of file
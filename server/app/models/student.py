@@ -0,0 +1,83 @@
+"""Small first-pass classifier for the model cascade
+
+The student is a four-block CNN on small face crops, distilled from the
+fine-tuned ViT (``python -m scripts.train_student``). It is roughly two
+orders of magnitude cheaper than ViT-base. The checkpoint is one torch
+file holding the weights plus the input size, the normalization constants,
+the labels and a softmax temperature fitted on held-out frames, so that
+its confidences can be compared with CASCADE_THRESHOLD.
+"""
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import torch
+from torch import nn
+
+FORMAT_VERSION = 1
+
+
+class StudentCNN(nn.Module):
+    """conv-bn-relu x2 + max-pool, four times, then global average pooling"""
+    
+    def __init__(self, num_classes: int = 7, width: int = 32):
+        super().__init__()
+        layers = []
+        channels = 3
+        for out_channels in (width, width * 2, width * 4, width * 8):
+            layers += [
+                nn.Conv2d(channels, out_channels, 3, padding=1, bias=False),
+                nn.BatchNorm2d(out_channels),
+                nn.ReLU(inplace=True),
+                nn.Conv2d(out_channels, out_channels, 3, padding=1, bias=False),
+                nn.BatchNorm2d(out_channels),
+                nn.ReLU(inplace=True),
+                nn.MaxPool2d(2),
+            ]
+            channels = out_channels
+        self.features = nn.Sequential(*layers)
+        self.head = nn.Sequential(
+            nn.AdaptiveAvgPool2d(1),
+            nn.Flatten(),
+            nn.Dropout(0.2),
+            nn.Linear(channels, num_classes),
+        )
+    
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.head(self.features(pixel_values))
+
+
+def save_student(
+    model: StudentCNN,
+    path: Path,
+    size: int,
+    image_mean: Sequence[float],
+    image_std: Sequence[float],
+    labels: Sequence[str],
+    temperature: float = 1.0,
+    width: int = 32
+):
+    """Write the student and everything needed to run it to one file"""
+    torch.save({
+        "format_version": FORMAT_VERSION,
+        "state_dict": {name: tensor.cpu() for name, tensor in model.state_dict().items()},
+        "size": size,
+        "width": width,
+        "image_mean": list(image_mean),
+        "image_std": list(image_std),
+        "labels": list(labels),
+        "temperature": float(temperature),
+    }, path)
+
+
+def load_student(path: Path, device: torch.device) -> Tuple[StudentCNN, Dict]:
+    """Load a student checkpoint; returns the eval-mode model and its metadata"""
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    if checkpoint.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported format {checkpoint.get('format_version')}")
+    
+    model = StudentCNN(len(checkpoint["labels"]), checkpoint["width"])
+    model.load_state_dict(checkpoint["state_dict"])
+    model.to(device).eval()
+    
+    meta = {key: value for key, value in checkpoint.items() if key != "state_dict"}
+    return model, meta
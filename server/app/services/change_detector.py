@@ -0,0 +1,86 @@
+"""Skip inference on frames that barely changed"""
+import time
+from typing import Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+# Side of the downsampled grayscale signature
+SIGNATURE_SIZE = 16
+
+
+class FrameChangeDetector:
+    """Reuse the last emotion result while a client's frames look the same
+    
+    Each frame (or its face region, when a face is cached) is reduced to a
+    16x16 grayscale thumbnail. If it differs from the thumbnail of the last
+    inferred frame by less than ``threshold`` (mean absolute difference,
+    0-1 scale), the previous result is reused. A result is never reused for
+    longer than ``max_reuse_ms``, so slow drifts still get picked up.
+    """
+    
+    def __init__(self, threshold: Optional[float] = None, max_reuse_ms: Optional[float] = None):
+        self.threshold = settings.CHANGE_THRESHOLD if threshold is None else threshold
+        if max_reuse_ms is None:
+            max_reuse_ms = settings.CHANGE_MAX_REUSE_MS
+        self.max_reuse = max_reuse_ms / 1000.0
+        
+        self._signature: Optional[np.ndarray] = None
+        self._pending: Optional[np.ndarray] = None
+        # Whether the signatures came from a face region or the whole frame
+        self._signature_is_face = False
+        self._pending_is_face = False
+        self._result: Optional[Dict] = None
+        self._result_time = 0.0
+        
+        # Statistics
+        self.frames_checked = 0
+        self.frames_skipped = 0
+    
+    @staticmethod
+    def signature(image: np.ndarray, box: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Tiny grayscale thumbnail of a frame or a region of it"""
+        if box is not None:
+            x, y, w, h = box
+            region = image[max(0, y):y + h, max(0, x):x + w]
+            if region.size:
+                image = region
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        thumb = cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE),
+                           interpolation=cv2.INTER_AREA)
+        return thumb.astype(np.float32) / 255.0
+    
+    def check(self, image: np.ndarray, box: Optional[Sequence[int]] = None) -> Optional[Dict]:
+        """Return the cached result if the frame is unchanged, else None"""
+        self.frames_checked += 1
+        self._pending = self.signature(image, box)
+        self._pending_is_face = box is not None
+        
+        if self.threshold <= 0 or self._result is None or self._signature is None:
+            return None
+        if time.time() - self._result_time > self.max_reuse:
+            return None
+        if self._pending_is_face != self._signature_is_face:
+            return None
+        
+        difference = float(np.abs(self._pending - self._signature).mean())
+        if difference >= self.threshold:
+            return None
+        
+        self.frames_skipped += 1
+        return self._result
+    
+    def update(self, result: Dict):
+        """Remember the result inferred for the last checked frame"""
+        if not result.get("success"):
+            # Don't hold on to failures; check the next frame for real
+            self._result = None
+            return
+        
+        self._signature = self._pending
+        self._signature_is_face = self._pending_is_face
+        self._result = result
+        self._result_time = time.time()
@@ -0,0 +1,107 @@
+"""Structured, sampled, non-blocking logging for the hot path
+
+``log_event("mood_detected", client=..., mood=...)`` emits at most one
+record per event name every LOG_SAMPLE_INTERVAL_S seconds; the record
+carries how many were suppressed in between. Records go through a
+QueueHandler, so the event loop and inference threads only enqueue them;
+a listener thread formats and writes them (text or JSON lines).
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.metrics import LOG_SUPPRESSED
+
+logger = logging.getLogger("mood")
+
+_last_emitted: Dict[str, float] = {}
+_suppressed: Dict[str, int] = {}
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class EventFormatter(logging.Formatter):
+    """``event key=value ...`` text, or one JSON object per line"""
+    
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+    
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        if self.as_json:
+            entry = {
+                "ts": round(record.created, 3),
+                "level": record.levelname.lower(),
+                "event": record.getMessage(),
+                **fields,
+            }
+            return json.dumps(entry, default=str)
+        
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        exception = fields.get("exception")
+        text = " ".join([timestamp, record.levelname, record.getMessage()] +
+                        [f"{key}={value}" for key, value in fields.items() if key != "exception"])
+        if exception:
+            text += "\n" + exception.rstrip()
+        return text
+
+
+def setup_logging():
+    """Route the ``mood`` logger through a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+    
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(EventFormatter(as_json=settings.LOG_FORMAT == "json"))
+    
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+    
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+def log_event(event: str, level: int = logging.INFO, exc_info: bool = False, **fields):
+    """Log a sampled, structured event (cheap when sampled out)"""
+    if not logger.isEnabledFor(level):
+        return
+    
+    interval = settings.LOG_SAMPLE_INTERVAL_S
+    if interval > 0:
+        now = time.monotonic()
+        with _lock:
+            if now - _last_emitted.get(event, -interval) < interval:
+                _suppressed[event] = _suppressed.get(event, 0) + 1
+                LOG_SUPPRESSED.inc(1, event)
+                return
+            _last_emitted[event] = now
+            suppressed = _suppressed.pop(event, 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+    
+    if exc_info:
+        # Formatted here: the queue handler would fold it into the message
+        fields["exception"] = traceback.format_exc()
+    logger.log(level, event, extra={"fields": fields})
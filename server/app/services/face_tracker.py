@@ -0,0 +1,69 @@
+"""Stable per-person IDs for the faces of one client"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+
+def iou(a: Sequence[int], b: Sequence[int]) -> float:
+    """Intersection over union of two [x, y, w, h] boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_w = min(ax + aw, bx + bw) - max(ax, bx)
+    overlap_h = min(ay + ah, by + bh) - max(ay, by)
+    if overlap_w <= 0 or overlap_h <= 0:
+        return 0.0
+    overlap = overlap_w * overlap_h
+    return overlap / float(aw * ah + bw * bh - overlap)
+
+
+class FaceTracker:
+    """Give each face the ID of the face it overlaps most in earlier frames
+    
+    Boxes are matched to tracks greedily, best overlap first, as long as
+    the IoU is at least ``iou_threshold``; unmatched boxes start a new
+    track. A track that matches nothing is kept for ``max_missed`` more
+    updates, so a face that drops out of one detection keeps its ID.
+    """
+    
+    def __init__(self, iou_threshold: Optional[float] = None, max_missed: Optional[int] = None):
+        self.iou_threshold = settings.FACE_TRACK_IOU if iou_threshold is None else iou_threshold
+        self.max_missed = settings.FACE_TRACK_MAX_MISSED if max_missed is None else max_missed
+        
+        # id -> (last box, updates since it was last matched)
+        self._tracks: Dict[int, Tuple[Sequence[int], int]] = {}
+        self._next_id = 1
+    
+    def update(self, boxes: List[Sequence[int]]) -> List[int]:
+        """Track IDs for this frame's boxes, in the same order"""
+        candidates = sorted(
+            (
+                (overlap, track_id, index)
+                for track_id, (track_box, _) in self._tracks.items()
+                for index, box in enumerate(boxes)
+                for overlap in [iou(track_box, box)]
+                if overlap >= self.iou_threshold
+            ),
+            reverse=True
+        )
+        
+        ids: List[Optional[int]] = [None] * len(boxes)
+        matched = set()
+        for _, track_id, index in candidates:
+            if track_id in matched or ids[index] is not None:
+                continue
+            ids[index] = track_id
+            matched.add(track_id)
+        
+        for track_id, (box, missed) in list(self._tracks.items()):
+            if track_id not in matched:
+                if missed >= self.max_missed:
+                    del self._tracks[track_id]
+                else:
+                    self._tracks[track_id] = (box, missed + 1)
+        
+        for index, box in enumerate(boxes):
+            if ids[index] is None:
+                ids[index] = self._next_id
+                self._next_id += 1
+            self._tracks[ids[index]] = (list(box), 0)
+        return ids
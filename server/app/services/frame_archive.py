@@ -0,0 +1,259 @@
+"""Background archiving of received frames (SAVE_FRAMES)
+
+Frames are stored exactly as received (no JPEG re-encode) in append-only
+segment files, one per client per hour:
+
+    storage/frames/20250101-13/<client_id>-<pid>.seg   concatenated JPEG bytes
+    storage/frames/20250101-13/<client_id>-<pid>.idx   one INDEX_RECORD per frame
+
+An index record is (offset, length, frame number, received timestamp), so
+a reader can seek straight to any frame; ``read_segment`` does that.
+
+The receive path only does a non-blocking ``put`` on a bounded queue; if
+the writer thread falls behind, frames are dropped from the archive (and
+counted) rather than slowing the stream down. The writer drains the queue
+in batches, flushes every ARCHIVE_FLUSH_INTERVAL_S and periodically
+deletes hour directories older than ARCHIVE_RETENTION_HOURS, then the
+oldest segments while the archive is over ARCHIVE_MAX_MB.
+"""
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.event_log import log_event
+
+# offset, length, frame number, received at (unix seconds)
+INDEX_RECORD = struct.Struct("<QIId")
+
+HOUR_FORMAT = "%Y%m%d-%H"
+RETENTION_CHECK_INTERVAL_S = 60.0
+# Queue items handled per wake-up of the writer thread
+MAX_DRAIN = 256
+
+_CLOSE = object()
+
+
+class _Segment:
+    """Open segment and index file of one client in one hour"""
+    
+    def __init__(self, directory: Path, name: str):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.data: BinaryIO = open(directory / f"{name}.seg", "ab", buffering=1 << 20)
+        self.index: BinaryIO = open(directory / f"{name}.idx", "ab", buffering=1 << 16)
+        # Append mode: continue after whatever a previous run left
+        self.offset = self.data.seek(0, os.SEEK_END)
+    
+    def append(self, frame: bytes, seq: int, received_at: float) -> int:
+        self.data.write(frame)
+        self.index.write(INDEX_RECORD.pack(self.offset, len(frame), seq, received_at))
+        self.offset += len(frame)
+        return len(frame) + INDEX_RECORD.size
+    
+    def flush(self):
+        # Data before index, so an index entry never points past the data
+        self.data.flush()
+        self.index.flush()
+    
+    def close(self):
+        self.flush()
+        self.data.close()
+        self.index.close()
+
+
+class FrameArchiver:
+    """Write received frames to per-client, per-hour segments off the event loop"""
+    
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or settings.STORAGE_DIR)
+        self.queue: queue.Queue = queue.Queue(maxsize=settings.ARCHIVE_QUEUE_SIZE)
+        self.retention_s = settings.ARCHIVE_RETENTION_HOURS * 3600.0
+        self.max_bytes = int(settings.ARCHIVE_MAX_MB * 1024 * 1024)
+        self.flush_interval = settings.ARCHIVE_FLUSH_INTERVAL_S
+        self.pid = os.getpid()
+        
+        # Owned by the writer thread
+        self._segments: Dict[Tuple[str, str], _Segment] = {}
+        self._thread: Optional[threading.Thread] = None
+        
+        # Statistics
+        self.frames_archived = 0
+        self.frames_dropped = 0
+        self.bytes_written = 0
+        self.segments_evicted = 0
+        self.write_errors = 0
+    
+    def start(self):
+        """Start the writer thread"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="frame-archiver", daemon=True)
+        self._thread.start()
+        print(f"🗄️ Archiving frames to {self.root} "
+              f"(keep {settings.ARCHIVE_RETENTION_HOURS:g}h, max {settings.ARCHIVE_MAX_MB:g} MB)")
+    
+    def stop(self):
+        """Write out what is queued, close all segments and stop the thread"""
+        if self._thread is None:
+            return
+        # Blocking put: shutdown may wait for the writer, the stream may not
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+    
+    def archive(self, client_id: str, frame: bytes, seq: int, received_at: float):
+        """Queue a frame for writing; never blocks (drops if the queue is full)"""
+        try:
+            self.queue.put_nowait((client_id, frame, seq, received_at))
+        except queue.Full:
+            self.frames_dropped += 1
+    
+    def close_client(self, client_id: str):
+        """Close a disconnected client's open segment once its frames are written"""
+        try:
+            self.queue.put_nowait((client_id, _CLOSE, 0, 0.0))
+        except queue.Full:
+            # The segment is closed when its hour rolls over instead
+            pass
+    
+    def _run(self):
+        """Writer thread: drain the queue in batches, flush, apply retention"""
+        last_flush = time.monotonic()
+        last_retention = 0.0
+        stopping = False
+        
+        while not stopping:
+            try:
+                items = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                items = []
+            while items and len(items) < MAX_DRAIN:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            for item in items:
+                if item is None:
+                    stopping = True
+                    continue
+                try:
+                    self._write(*item)
+                except OSError as e:
+                    self.write_errors += 1
+                    log_event("archive_error", logging.ERROR, error=str(e))
+            
+            now = time.monotonic()
+            if stopping or now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+            if now - last_retention >= RETENTION_CHECK_INTERVAL_S:
+                try:
+                    self._apply_retention()
+                except OSError as e:
+                    log_event("archive_error", logging.ERROR, error=str(e))
+                last_retention = now
+        
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+    
+    def _write(self, client_id: str, frame, seq: int, received_at: float):
+        if frame is _CLOSE:
+            for key in [key for key in self._segments if key[1] == client_id]:
+                self._segments.pop(key).close()
+            return
+        
+        hour = time.strftime(HOUR_FORMAT, time.localtime(received_at))
+        key = (hour, client_id)
+        segment = self._segments.get(key)
+        if segment is None:
+            # New hour for this client: its previous segment is complete
+            for old in [old for old in self._segments if old[1] == client_id]:
+                self._segments.pop(old).close()
+            segment = self._segments[key] = _Segment(self.root / hour, f"{client_id}-{self.pid}")
+        
+        self.bytes_written += segment.append(frame, seq, received_at)
+        self.frames_archived += 1
+    
+    def _flush(self):
+        for segment in self._segments.values():
+            try:
+                segment.flush()
+            except OSError as e:
+                self.write_errors += 1
+                log_event("archive_error", logging.ERROR, error=str(e))
+    
+    def _apply_retention(self):
+        """Delete expired hours, then the oldest segments while over the size cap"""
+        open_hours = {hour for hour, _ in self._segments}
+        cutoff = time.time() - self.retention_s
+        
+        hours: List[Path] = []
+        for path in sorted(self.root.iterdir()):
+            try:
+                started = time.mktime(time.strptime(path.name, HOUR_FORMAT))
+            except ValueError:
+                continue
+            if self.retention_s > 0 and started + 3600 < cutoff and path.name not in open_hours:
+                shutil.rmtree(path, ignore_errors=True)
+                self.segments_evicted += 1
+            else:
+                hours.append(path)
+        
+        if self.max_bytes <= 0:
+            return
+        
+        # Whole segments (data + index), oldest hour first
+        segments = []
+        total = 0
+        for hour in hours:
+            for data in sorted(hour.glob("*.seg")):
+                index = data.with_suffix(".idx")
+                size = data.stat().st_size + (index.stat().st_size if index.exists() else 0)
+                segments.append((hour, data, index, size))
+                total += size
+        
+        for hour, data, index, size in segments:
+            if total <= self.max_bytes:
+                break
+            if (hour.name, data.stem.rsplit("-", 1)[0]) in self._segments:
+                # Still being written
+                continue
+            data.unlink(missing_ok=True)
+            index.unlink(missing_ok=True)
+            total -= size
+            self.segments_evicted += 1
+            if not any(hour.iterdir()):
+                hour.rmdir()
+    
+    def get_stats(self) -> Dict:
+        return {
+            "frames_archived": self.frames_archived,
+            "frames_dropped": self.frames_dropped,
+            "bytes_written": self.bytes_written,
+            "queued": self.queue.qsize(),
+            "open_segments": len(self._segments),
+            "segments_evicted": self.segments_evicted,
+            "write_errors": self.write_errors,
+        }
+
+
+def read_segment(segment: Path) -> Iterator[Tuple[int, float, bytes]]:
+    """Yield (frame number, received at, JPEG bytes) from a segment file"""
+    segment = Path(segment)
+    with open(segment.with_suffix(".idx"), "rb") as index, open(segment.with_suffix(".seg"), "rb") as data:
+        records = index.read()
+        # A trailing partial record means the writer was cut off mid-flush
+        usable = len(records) - len(records) % INDEX_RECORD.size
+        for offset, length, seq, received_at in INDEX_RECORD.iter_unpack(records[:usable]):
+            data.seek(offset)
+            frame = data.read(length)
+            if len(frame) < length:
+                break
+            yield seq, received_at, frame
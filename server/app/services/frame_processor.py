@@ -1,11 +1,36 @@
-from datetime import datetime
-from pathlib import Path
-from typing import Optional
+import io
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
 import numpy as np
 
 from app.config import settings
+from app.services.change_detector import FrameChangeDetector
+from app.services.face_tracker import FaceTracker
+from app.services.frame_slot import LatestFrameSlot
+from app.services.mood_smoother import MoodSmoother
+from app.services.protocol import ProtocolSession
+
+
+def crops_faces() -> bool:
+    """Whether the configured model classifies face crops rather than frames"""
+    if settings.MODEL_TYPE.startswith("custom"):
+        return settings.USE_FACE_DETECTION
+    if settings.MODEL_TYPE == "deepface":
+        detector = settings.DEEPFACE_DETECTOR
+        return detector != "skip" and (detector != "server" or settings.USE_FACE_DETECTION)
+    return False
+
+
+def decode_size() -> int:
+    """Smallest side JPEG frames are decoded at (0 = full resolution)"""
+    target = settings.DECODE_TARGET_SIZE
+    if target > 0 and crops_faces() and settings.DECODE_FACE_FRACTION > 0:
+        # The crop, not the frame, is resized to the model input
+        target = round(target / min(settings.DECODE_FACE_FRACTION, 1.0))
+    return target
+
 
 class FrameProcessor:
     """Process video frames"""
@@ -13,21 +38,127 @@ class FrameProcessor:
     def __init__(self, client_id: str):
         self.client_id = client_id
         self.frame_count = 0
+        self.detections = 0
+        self.frame_slot = LatestFrameSlot()
+        self.change_detector = FrameChangeDetector()
+        self.mood_smoother = MoodSmoother()
+        # Catalog rows recently recommended, not to be repeated
+        self.recent_tracks = deque(maxlen=settings.MUSIC_NO_REPEAT)
+        # Negotiated result encoding, acks and last song sent
+        self.protocol = ProtocolSession()
+        
+        # Smoothed time from taking a frame to having its result
+        self.avg_cycle_time = 0.0
+        self.last_rate_hint = 0.0
+        
+        # Cached face locations, re-checked every FACE_REDETECT_EVERY detections
+        self.faces: List[Dict] = []
+        self.face_shape: Optional[Tuple[int, ...]] = None
+        self.detections_since_face_check = 0
+        self.frames_without_face = 0
+        # Stable per-person IDs across frames
+        self.face_tracker = FaceTracker()
     
-    def save_frame(self, image: Image.Image) -> Optional[str]:
-        """Save frame to disk if enabled"""
-        if not settings.SAVE_FRAMES:
-            return None
+    def decode_frame(self, frame_data: bytes) -> np.ndarray:
+        """Decode a received frame to RGB, close to model resolution"""
+        image = Image.open(io.BytesIO(frame_data))
+        
+        # Let libjpeg downscale in the DCT domain (1/2, 1/4 or 1/8) so we
+        # never decode full resolution just to resize it to 224x224 later
+        target = decode_size()
+        if target > 0 and image.format == "JPEG":
+            image.draft("RGB", (target, target))
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        filename = f"{self.client_id}_{timestamp}.jpg"
-        filepath = settings.STORAGE_DIR / filename
+        if image.mode != "RGB":
+            image = image.convert("RGB")
         
-        image.save(filepath, 'JPEG', quality=90)
-        return filename
+        return np.asarray(image)
     
     def preprocess_frame(self, image: np.ndarray) -> np.ndarray:
         """Preprocess frame for model input"""
         # Add any preprocessing needed for your model
         # e.g., resize, normalize, etc.
-        return image
\ No newline at end of file
+        return image
+    
+    def record_detection(self, cycle_time: float):
+        """Track how long a detection round trip took"""
+        self.detections += 1
+        if self.avg_cycle_time == 0.0:
+            self.avg_cycle_time = cycle_time
+        else:
+            self.avg_cycle_time = 0.8 * self.avg_cycle_time + 0.2 * cycle_time
+    
+    def recommended_fps(self) -> float:
+        """Send rate at which this client's frames are still worth sending"""
+        # A detection can't start more often than the throttle interval, and
+        # not faster than results come back under the current load
+        cycle = max(settings.DETECTION_INTERVAL / 1000.0, self.avg_cycle_time)
+        fps = settings.RATE_HEADROOM / cycle if cycle > 0 else settings.MAX_CLIENT_FPS
+        fps = min(max(fps, settings.MIN_CLIENT_FPS), settings.MAX_CLIENT_FPS)
+        return round(fps * 2) / 2
+    
+    def rate_hint_due(self, fps: float) -> bool:
+        """Only announce a new rate when it moved noticeably"""
+        if not self.last_rate_hint:
+            return True
+        return abs(fps - self.last_rate_hint) / self.last_rate_hint >= 0.2
+    
+    def face_hint(self, image: np.ndarray) -> Optional[Dict]:
+        """Cached faces to send with the next frame, if still usable"""
+        if not self.faces or self.face_shape != image.shape:
+            return None
+        
+        # Trust the cached boxes for a few detections, then verify them
+        track = self.detections_since_face_check >= settings.FACE_REDETECT_EVERY
+        return {"faces": self.faces, "track": track}
+    
+    @staticmethod
+    def face_region(hint: Optional[Dict]) -> Optional[Sequence[int]]:
+        """Box around all hinted faces (for change detection)"""
+        if hint is None:
+            return None
+        boxes = [face["box"] for face in hint["faces"]]
+        x0 = min(x for x, _, _, _ in boxes)
+        y0 = min(y for _, y, _, _ in boxes)
+        x1 = max(x + w for x, _, w, _ in boxes)
+        y1 = max(y + h for _, y, _, h in boxes)
+        return [x0, y0, x1 - x0, y1 - y0]
+    
+    def update_face(self, result: Dict, hint: Optional[Dict], image: np.ndarray):
+        """Give the detected faces stable IDs and remember them for the next frame"""
+        if "faces" in result:
+            ids = self.face_tracker.update([face["box"] for face in result["faces"]])
+            for face, face_id in zip(result["faces"], ids):
+                face["id"] = face_id
+        
+        if "face_found" not in result:
+            return
+        
+        if not result["face_found"]:
+            self.faces = []
+            self.frames_without_face += 1
+            # Age the tracks so a returning face is matched, not renumbered
+            self.face_tracker.update([])
+            return
+        
+        if hint is None or hint["track"]:
+            self.detections_since_face_check = 0
+        else:
+            self.detections_since_face_check += 1
+        self.faces = [{"box": face["box"], "angle": face["angle"]} for face in result["faces"]]
+        self.face_shape = image.shape
+    
+    def get_counters(self) -> Dict[str, int]:
+        """Frame counters for this client"""
+        skipped = self.change_detector.frames_skipped
+        return {
+            "frames_received": self.frame_count,
+            "frames_dropped": self.frame_slot.dropped,
+            "frames_detected": self.detections,
+            "frames_inferred": self.detections - skipped,
+            "frames_skipped_unchanged": skipped,
+            "frames_without_face": self.frames_without_face,
+            "mood_changes": self.mood_smoother.transitions,
+            "messages_sent": self.protocol.messages_sent,
+            "bytes_sent": self.protocol.bytes_sent,
+        }
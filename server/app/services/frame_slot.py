@@ -0,0 +1,39 @@
+"""Latest-frame-wins slot for a single client"""
+import asyncio
+import time
+from typing import Optional, Tuple
+
+
+class LatestFrameSlot:
+    """Hold only the newest undecoded frame of a client
+    
+    The receive loop keeps putting raw JPEG bytes in; the detection loop
+    takes whatever is newest when it is ready for another detection. Frames
+    replaced before they were taken are never decoded.
+    """
+    
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._received_at = 0.0
+        self._seq = 0
+        self._event = asyncio.Event()
+        self.dropped = 0
+    
+    def put(self, frame: bytes, seq: int = 0):
+        """Store a frame (``seq``: its number on the connection), replacing any frame still waiting"""
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._received_at = time.time()
+        self._seq = seq
+        self._event.set()
+    
+    async def wait(self):
+        """Wait until a frame is available"""
+        await self._event.wait()
+    
+    def take(self) -> Tuple[bytes, float, int]:
+        """Remove and return the newest frame, its arrival time and number"""
+        frame, self._frame = self._frame, None
+        self._event.clear()
+        return frame, self._received_at, self._seq
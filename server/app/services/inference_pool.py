@@ -0,0 +1,388 @@
+"""Dedicated worker pool for model inference"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.shared_frames import SharedFrameRing
+
+# Per-process detector used by process-pool workers
+_worker_detector = None
+
+# Seconds between liveness checks of shared-memory workers
+SHM_LIVENESS_INTERVAL = 1.0
+
+
+def _set_torch_threads(num_threads: int):
+    """Limit torch intra-op parallelism for this worker"""
+    if not settings.MODEL_TYPE.startswith("custom"):
+        # Only the custom ViT runs on torch; don't import it for nothing
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def _init_process_worker(num_threads: int):
+    """Load a private model copy in each worker process"""
+    global _worker_detector
+    _set_torch_threads(num_threads)
+    
+    from app.models.mood_detector import MoodDetector
+    _worker_detector = MoodDetector()
+
+
+def _process_detect_batch(
+    images: List[np.ndarray],
+    face_hints: Optional[List[Optional[Dict]]] = None
+) -> List[Dict]:
+    """Run a batch on the worker process's detector"""
+    return _worker_detector.detect_mood_batch(images, face_hints)
+
+
+def _shm_worker_main(
+    index: int,
+    ring_name: str,
+    slots: int,
+    slot_bytes: int,
+    requests,
+    results,
+    num_threads: int
+):
+    """Entry point of a shared-memory inference worker process"""
+    _set_torch_threads(num_threads)
+    
+    from app.models.mood_detector import MoodDetector
+    detector = MoodDetector()
+    ring = SharedFrameRing.attach(ring_name, slots, slot_bytes)
+    
+    try:
+        while True:
+            job = requests.get()
+            if job is None:
+                break
+            
+            batch_id, frames, face_hints = job
+            
+            # (slot, shape) refers to the ring; oversized frames come inline
+            images = [
+                ring.view(*frame) if isinstance(frame, tuple) else frame
+                for frame in frames
+            ]
+            
+            try:
+                batch_results = detector.detect_mood_batch(images, face_hints)
+            except Exception as e:
+                batch_results = [{"success": False, "error": str(e)} for _ in images]
+            
+            # Release the views before the parent reuses the slots
+            del images
+            results.put((index, batch_id, batch_results))
+    finally:
+        ring.close()
+
+
+def _parse_frame_size(value: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT string"""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+class InferencePool:
+    """Run mood detection batches off the event loop
+    
+    ``thread`` mode shares the already-loaded detector between worker threads
+    (torch releases the GIL during the forward pass). ``process`` mode gives
+    every worker process its own model copy. ``shm`` mode also uses one
+    process per worker, but frames travel through a per-worker shared-memory
+    ring instead of being pickled, and only result dicts come back.
+    """
+    
+    MODES = ("thread", "process", "shm")
+    
+    def __init__(
+        self,
+        mood_detector,
+        mode: Optional[str] = None,
+        workers: Optional[int] = None,
+        torch_threads: Optional[int] = None
+    ):
+        self.mood_detector = mood_detector
+        self.mode = (mode or settings.INFERENCE_EXECUTOR).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown inference executor: {self.mode}")
+        
+        self.workers = max(1, workers or settings.INFERENCE_WORKERS)
+        
+        # Split the cores between workers unless told otherwise
+        if torch_threads is None:
+            torch_threads = settings.TORCH_THREADS_PER_WORKER
+        if torch_threads <= 0:
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.torch_threads = torch_threads
+        
+        self.executor: Optional[Executor] = None
+        
+        # Shared-memory workers
+        self._shm_workers: List[Dict] = []
+        self._shm_ctx = None
+        self._idle_workers: Optional[asyncio.Queue] = None
+        self._pending: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self._batch_ids = itertools.count()
+        self._results = None
+        self._collector: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+    
+    def start(self):
+        """Create the executor (process workers load their model here)"""
+        if self.mode == "shm":
+            self._start_shm_workers()
+        elif self.mode == "process":
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(self.torch_threads,)
+            )
+        else:
+            # intra-op thread count is process-wide, so set it once
+            _set_torch_threads(self.torch_threads)
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference"
+            )
+        
+        print(f"🧵 Inference pool: {self.workers} {self.mode} worker(s), "
+              f"{self.torch_threads} torch thread(s) each")
+    
+    def _start_shm_workers(self):
+        """Spawn worker processes, each with its own frame ring"""
+        self._shm_ctx = multiprocessing.get_context("spawn")
+        width, height = _parse_frame_size(settings.SHM_MAX_FRAME_SIZE)
+        slot_bytes = width * height * 3
+        # One batch in flight per worker, so one slot per batch entry is enough
+        slots = max(1, settings.BATCH_MAX_SIZE)
+        
+        self._loop = asyncio.get_running_loop()
+        self._results = self._shm_ctx.Queue()
+        self._idle_workers = asyncio.Queue()
+        
+        for index in range(self.workers):
+            worker = {"ring": SharedFrameRing(slots, slot_bytes), "restarts": 0}
+            self._shm_workers.append(worker)
+            self._spawn_shm_worker(index)
+            self._idle_workers.put_nowait(index)
+        
+        self._collector = threading.Thread(
+            target=self._collect_shm_results,
+            name="inference-results",
+            daemon=True
+        )
+        self._collector.start()
+    
+    def _spawn_shm_worker(self, index: int):
+        """Start (or restart) the process behind worker ``index`` on its ring"""
+        worker = self._shm_workers[index]
+        ring = worker["ring"]
+        # A fresh request queue, so a restarted worker never sees a stale job
+        worker["requests"] = self._shm_ctx.Queue()
+        worker["process"] = self._shm_ctx.Process(
+            target=_shm_worker_main,
+            args=(index, ring.name, ring.slots, ring.slot_bytes, worker["requests"],
+                  self._results, self.torch_threads),
+            name=f"inference-{index}",
+            daemon=True
+        )
+        worker["process"].start()
+    
+    def _collect_shm_results(self):
+        """Forward worker results to the event loop (runs in a thread)"""
+        next_check = time.monotonic() + SHM_LIVENESS_INTERVAL
+        while not self._stopping:
+            # On a timer rather than when idle: results from the other
+            # workers must not hide one that died
+            now = time.monotonic()
+            if now >= next_check:
+                self._check_shm_workers()
+                next_check = now + SHM_LIVENESS_INTERVAL
+            
+            try:
+                index, batch_id, results = self._results.get(timeout=next_check - now)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            self._loop.call_soon_threadsafe(
+                self._finish_shm_batch, batch_id, index, results
+            )
+    
+    def _check_shm_workers(self):
+        """Report workers that died to the event loop (runs in a thread)"""
+        for index, worker in enumerate(self._shm_workers):
+            process = worker.get("process")
+            if process is not None and not process.is_alive():
+                self._loop.call_soon_threadsafe(self._replace_shm_worker, index, process)
+    
+    def _replace_shm_worker(self, index: int, process):
+        """Fail a dead worker's batch, then respawn the worker or drop it"""
+        worker = self._shm_workers[index]
+        if self._stopping or worker.get("process") is not process:
+            # Already handled
+            return
+        process.join(timeout=0)
+        error = f"Inference worker {index} exited ({process.exitcode})"
+        
+        busy = False
+        for batch_id, (_, owner) in list(self._pending.items()):
+            if owner == index:
+                busy = True
+                self._fail_shm_batch(batch_id, error)
+        
+        if worker["restarts"] < settings.SHM_MAX_RESTARTS:
+            worker["restarts"] += 1
+            print(f"⚠️ {error}; restarting ({worker['restarts']}/{settings.SHM_MAX_RESTARTS})")
+            self._spawn_shm_worker(index)
+        else:
+            print(f"❌ {error}; restart limit reached, dropping it")
+            worker["process"] = None
+            if not self._live_shm_workers():
+                print("❌ No inference workers left")
+        
+        # An idle worker's index is still queued; a busy one's comes back
+        # here (a dropped index wakes a waiter, which then skips or fails)
+        if busy or worker["process"] is None:
+            self._idle_workers.put_nowait(index)
+    
+    def _live_shm_workers(self) -> int:
+        """Number of workers that haven't been dropped"""
+        return sum(1 for worker in self._shm_workers if worker.get("process") is not None)
+    
+    def _finish_shm_batch(self, batch_id: int, index: int, results: List[Dict]):
+        """Deliver a batch result and mark its worker idle again"""
+        pending = self._pending.pop(batch_id, None)
+        if pending is None:
+            # Failed when its worker died; the index was requeued then
+            return
+        if not pending[0].done():
+            pending[0].set_result(results)
+        # Only now may the worker's ring slots be overwritten
+        self._idle_workers.put_nowait(index)
+    
+    def _fail_shm_batch(self, batch_id: int, error: str):
+        """Fail a batch whose worker is gone"""
+        pending = self._pending.pop(batch_id, None)
+        if pending and not pending[0].done():
+            pending[0].set_exception(RuntimeError(error))
+    
+    async def _acquire_shm_worker(self) -> int:
+        """Wait for an idle live worker; fail fast once none are left"""
+        while True:
+            if not self._live_shm_workers():
+                raise RuntimeError("No inference workers left")
+            index = await self._idle_workers.get()
+            if self._shm_workers[index].get("process") is not None:
+                return index
+            if not self._live_shm_workers():
+                # Pass the wake-up on to the next waiter
+                self._idle_workers.put_nowait(index)
+    
+    async def _run_shm_batch(
+        self,
+        images: List[np.ndarray],
+        face_hints: Optional[List[Optional[Dict]]]
+    ) -> List[Dict]:
+        """Copy a batch into an idle worker's ring and wait for its results"""
+        index = await self._acquire_shm_worker()
+        worker = self._shm_workers[index]
+        ring = worker["ring"]
+        
+        # Frames larger than a slot fall back to being pickled
+        frames = [
+            ring.write(np.ascontiguousarray(image)) if ring.fits(image) else image
+            for image in images
+        ]
+        
+        batch_id = next(self._batch_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[batch_id] = (future, index)
+        worker["requests"].put((batch_id, frames, face_hints))
+        
+        return await future
+    
+    def _stop_shm_workers(self):
+        """Stop worker processes and free their rings"""
+        self._stopping = True
+        
+        live = [worker for worker in self._shm_workers if worker.get("process") is not None]
+        for worker in live:
+            worker["requests"].put(None)
+        for worker in live:
+            worker["process"].join(timeout=5)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        for worker in self._shm_workers:
+            worker["ring"].close()
+        
+        if self._collector:
+            self._collector.join(timeout=2)
+            self._collector = None
+        
+        self._shm_workers = []
+    
+    def shutdown(self):
+        """Stop the workers"""
+        if self.mode == "shm":
+            self._stop_shm_workers()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    async def run_batch(
+        self,
+        images: List[np.ndarray],
+        face_hints: Optional[List[Optional[Dict]]] = None
+    ) -> List[Dict]:
+        """Run one batch on a worker without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        
+        if self.mode in ("process", "shm"):
+            if self.mode == "shm":
+                results = await self._run_shm_batch(images, face_hints)
+            else:
+                results = await loop.run_in_executor(
+                    self.executor, _process_detect_batch, images, face_hints
+                )
+            # Detections happen in the workers; keep the shared counters current
+            self.mood_detector.total_detections += sum(
+                1 for result in results if result.get("success")
+            )
+            self.mood_detector.record_cascade(results)
+            return results
+        
+        return await loop.run_in_executor(
+            self.executor, self.mood_detector.detect_mood_batch, images, face_hints
+        )
+    
+    def get_stats(self) -> Dict:
+        """Get pool configuration"""
+        stats = {
+            "mode": self.mode,
+            "workers": self.workers,
+            "torch_threads_per_worker": self.torch_threads,
+        }
+        if self.mode == "shm":
+            stats["workers_alive"] = self._live_shm_workers()
+            stats["worker_restarts"] = sum(worker["restarts"] for worker in self._shm_workers)
+        return stats
@@ -0,0 +1,164 @@
+"""Cross-client micro-batching for mood detection"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.event_log import log_event
+from app.services.metrics import BATCH_SIZE, ERRORS
+
+
+class BatchScheduler:
+    """Collect frames from all clients and run them through the model in batches
+    
+    Handlers ``await submit(image)``; a single background task groups pending
+    frames into batches of up to ``max_batch_size`` (waiting at most
+    ``max_wait_ms`` after the first frame arrives), runs one forward pass and
+    resolves each handler's future with its own result.
+    """
+    
+    def __init__(
+        self,
+        inference_pool,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.inference_pool = inference_pool
+        self.max_batch_size = max(1, max_batch_size or settings.BATCH_MAX_SIZE)
+        if max_wait_ms is None:
+            max_wait_ms = settings.BATCH_MAX_WAIT_MS
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.queue_size = queue_size or settings.INFERENCE_QUEUE_SIZE
+        
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+        
+        # Statistics
+        self.total_batches = 0
+        self.total_frames = 0
+        self.max_seen_batch = 0
+    
+    async def start(self):
+        """Start the background batching task"""
+        # Bounded queue: submit() waits instead of piling up frames
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # One batch in flight per worker; the next batch fills up meanwhile
+        self._slots = asyncio.Semaphore(self.inference_pool.workers)
+        self._task = asyncio.create_task(self._run())
+        print(f"📦 Batch scheduler started (max batch {self.max_batch_size}, "
+              f"max wait {self.max_wait * 1000:.0f}ms)")
+    
+    async def stop(self):
+        """Stop the background tasks and fail any pending requests"""
+        tasks = list(self._inflight)
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        if self.queue:
+            while not self.queue.empty():
+                *_, future = self.queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+    
+    async def submit(self, image: np.ndarray, face_hint: Optional[Dict] = None) -> Dict:
+        """Queue one frame for detection and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, face_hint, future))
+        return await future
+    
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, Optional[Dict], asyncio.Future]]:
+        """Wait for the first frame, then gather more until full or timed out"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        # Drop requests whose client went away while waiting
+        return [item for item in batch if not item[-1].done()]
+    
+    async def _run(self):
+        """Batching loop"""
+        while True:
+            # Don't form a batch until a worker can take it
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            
+            if not batch:
+                self._slots.release()
+                continue
+            
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[np.ndarray, Optional[Dict], asyncio.Future]]):
+        """Run one batch on the inference pool and deliver the results"""
+        images = [image for image, _, _ in batch]
+        face_hints = [hint for _, hint, _ in batch]
+        
+        try:
+            results = await self.inference_pool.run_batch(images, face_hints)
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            ERRORS.inc(1, "batch")
+            log_event("batch_inference_error", logging.ERROR, error=str(e), batch_size=len(batch))
+            results = [{"success": False, "error": str(e)} for _ in batch]
+        finally:
+            self._slots.release()
+        
+        self.total_batches += 1
+        self.total_frames += len(batch)
+        BATCH_SIZE.observe(len(batch))
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    def get_stats(self) -> Dict:
+        """Get batching statistics"""
+        return {
+            "total_batches": self.total_batches,
+            "total_frames": self.total_frames,
+            "avg_batch_size": (
+                self.total_frames / self.total_batches if self.total_batches else 0.0
+            ),
+            "max_batch_size_seen": self.max_seen_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "inflight_batches": len(self._inflight),
+            "pool": self.inference_pool.get_stats(),
+        }
@@ -0,0 +1,154 @@
+"""In-process metrics rendered in the Prometheus text format"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Seconds, from sub-millisecond stages up to slow model calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# (name, type, help, labels, value) for values read at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by one label
+    
+    ``observe`` is a bisect plus two additions under a lock, cheap enough
+    for every frame and safe to call from inference worker threads.
+    """
+    
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS, label: str = ""):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series: Dict[str, List] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, label_value: str = ""):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (+Inf last), sum, count
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, label_value: str = ""):
+        """Observe the duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+    
+    def snapshot(self, label_value: str = "") -> Dict:
+        """Count, sum and mean of one series (for /api/stats)"""
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                return {"count": 0, "sum": 0.0, "mean": 0.0}
+            return {"count": series[2], "sum": series[1], "mean": series[1] / series[2]}
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        
+        for label_value, (counts, total, count) in sorted(series.items()):
+            labels = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label"""
+    
+    def __init__(self, name: str, help: str, label: str = ""):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, label_value: str = ""):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value, value in sorted(values.items()):
+            labels = {self.label: label_value} if self.label else {}
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """All metrics of this process"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+    
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS, label: str = "") -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets, label))
+    
+    def counter(self, name: str, help: str, label: str = "") -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, label))
+    
+    def render(self, samples: Iterable[Sample] = ()) -> str:
+        """Text exposition of every metric plus scrape-time ``samples``"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        
+        described = set()
+        for name, kind, help, labels, value in samples:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Hot-path stages of one frame: receive (arrival to pickup), decode,
+# queue (waiting for a batch), preprocess, inference, music, send
+STAGE_SECONDS = registry.histogram(
+    "mood_stage_seconds", "Time spent per frame in each processing stage", label="stage"
+)
+BATCH_SIZE = registry.histogram(
+    "mood_inference_batch_size", "Frames per inference batch", buckets=BATCH_BUCKETS
+)
+ERRORS = registry.counter("mood_errors_total", "Errors by where they happened", label="where")
+LOG_SUPPRESSED = registry.counter(
+    "mood_log_suppressed_total", "Log records dropped by sampling", label="event"
+)
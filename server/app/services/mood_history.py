@@ -0,0 +1,430 @@
+"""Per-client mood history in fixed-size numpy rings
+
+Every successful detection is kept at three resolutions per client:
+
+    raw      the last HISTORY_RAW_SIZE detections          RAW_RECORD, 40 bytes
+    second   the last HISTORY_SECONDS one-second buckets    BUCKET_RECORD, 58 bytes
+    minute   the last HISTORY_MINUTES one-minute buckets    BUCKET_RECORD
+
+Detections are rolled up as they arrive: they are summed into the open
+second, which is folded into the open minute once it is over. So a
+client's memory is fixed by the ring sizes (about 300 kB with the
+defaults) however long the session runs. Emotions are stored as
+percentages that sum to 100; a bucket holds their mean, the mean
+confidence and how often each emotion was the top one.
+
+With HISTORY_SPILL every finished bucket is also appended to
+HISTORY_DIR/<client_id>-<pid>.sec / .min, and queries reach back into
+those files once the rings no longer cover the range; ``read_spill``
+loads one. Everything runs on the event loop, so there is no locking.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.mood_smoother import EMOTION_LABELS
+
+RAW_RECORD = np.dtype([
+    ("t", "<f8"),
+    ("emotions", "<f4", (len(EMOTION_LABELS),)),
+    ("confidence", "<f4"),
+])
+BUCKET_RECORD = np.dtype([
+    ("t", "<f8"),                                        # bucket start
+    ("count", "<u4"),                                    # detections in it
+    ("emotions", "<f4", (len(EMOTION_LABELS),)),         # mean
+    ("confidence", "<f4"),                               # mean
+    ("dominant", "<u2", (len(EMOTION_LABELS),)),         # times each was the top emotion
+])
+
+RESOLUTIONS = ("raw", "second", "minute")
+BUCKET_SECONDS = {"second": 1, "minute": 60}
+SPILL_SUFFIXES = {"second": ".sec", "minute": ".min"}
+
+
+class _Ring:
+    """Fixed-capacity ring of records; the oldest is overwritten first"""
+    
+    def __init__(self, dtype: np.dtype, capacity: int):
+        self.data = np.zeros(max(1, capacity), dtype=dtype)
+        self.next = 0
+        self.size = 0
+    
+    def append(self, record):
+        self.data[self.next] = record
+        self.next = (self.next + 1) % len(self.data)
+        self.size = min(self.size + 1, len(self.data))
+    
+    @property
+    def full(self) -> bool:
+        return self.size == len(self.data)
+    
+    def oldest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.data["t"][self.next if self.full else 0])
+    
+    def ordered(self) -> np.ndarray:
+        """All records, oldest first"""
+        if not self.full:
+            return self.data[:self.size]
+        return np.concatenate((self.data[self.next:], self.data[:self.next]))
+    
+    def between(self, start: float, end: float) -> np.ndarray:
+        """Records with start <= t <= end (timestamps never decrease)"""
+        rows = self.ordered()
+        times = rows["t"]
+        return rows[np.searchsorted(times, start, side="left"):np.searchsorted(times, end, side="right")]
+
+
+class _Accumulator:
+    """Running sums of the bucket being filled"""
+    
+    def __init__(self):
+        self.start = 0.0
+        self.count = 0
+        self.emotions = np.zeros(len(EMOTION_LABELS))
+        self.confidence = 0.0
+        self.dominant = np.zeros(len(EMOTION_LABELS), dtype=np.int64)
+    
+    def add(self, emotions: np.ndarray, confidence: float):
+        self.count += 1
+        self.emotions += emotions
+        self.confidence += confidence
+        self.dominant[int(np.argmax(emotions))] += 1
+    
+    def merge(self, other: "_Accumulator"):
+        self.count += other.count
+        self.emotions += other.emotions
+        self.confidence += other.confidence
+        self.dominant += other.dominant
+    
+    def record(self) -> np.ndarray:
+        record = np.zeros(1, dtype=BUCKET_RECORD)
+        record["t"] = self.start
+        record["count"] = self.count
+        record["emotions"] = self.emotions / self.count
+        record["confidence"] = self.confidence / self.count
+        record["dominant"] = np.minimum(self.dominant, np.iinfo(np.uint16).max)
+        return record
+    
+    def clear(self):
+        self.count = 0
+        self.emotions[:] = 0
+        self.confidence = 0.0
+        self.dominant[:] = 0
+
+
+class ClientHistory:
+    """One client's detections at raw, per-second and per-minute resolution"""
+    
+    def __init__(self, client_id: str, spill_dir: Optional[Path] = None):
+        self.client_id = client_id
+        self.raw = _Ring(RAW_RECORD, settings.HISTORY_RAW_SIZE)
+        self.rings = {
+            "second": _Ring(BUCKET_RECORD, settings.HISTORY_SECONDS),
+            "minute": _Ring(BUCKET_RECORD, settings.HISTORY_MINUTES),
+        }
+        self._open = {"second": _Accumulator(), "minute": _Accumulator()}
+        
+        self.spill_paths: Dict[str, Path] = {}
+        self._spill_files: Dict[str, BinaryIO] = {}
+        if spill_dir is not None:
+            for resolution, suffix in SPILL_SUFFIXES.items():
+                path = spill_dir / f"{client_id}-{os.getpid()}{suffix}"
+                self.spill_paths[resolution] = path
+                # The files belong to this history alone; never pick up
+                # buckets another one left behind under the same name
+                self._spill_files[resolution] = open(path, "wb")
+        
+        self.detections = 0
+        self.first_t: Optional[float] = None
+        self.last_t = 0.0
+        self.closed_at: Optional[float] = None
+    
+    def add(self, t: float, emotions: np.ndarray, confidence: float):
+        """Record one detection (emotions in percent)"""
+        # Keep timestamps sorted even if the wall clock steps back
+        t = max(float(t), self.last_t)
+        second = self._open["second"]
+        if second.count and math.floor(t) > second.start:
+            self._finish_second()
+        if not second.count:
+            second.start = float(math.floor(t))
+        second.add(emotions, confidence)
+        
+        record = np.zeros(1, dtype=RAW_RECORD)
+        record["t"] = t
+        record["emotions"] = emotions
+        record["confidence"] = confidence
+        self.raw.append(record)
+        
+        self.detections += 1
+        if self.first_t is None:
+            self.first_t = t
+        self.last_t = t
+    
+    def _finish_second(self):
+        """Store the open second and fold it into the open minute"""
+        second, minute = self._open["second"], self._open["minute"]
+        self._store("second", second.record())
+        
+        start = second.start - second.start % 60
+        if minute.count and start > minute.start:
+            self._store("minute", minute.record())
+            minute.clear()
+        if not minute.count:
+            minute.start = start
+        minute.merge(second)
+        second.clear()
+    
+    def _store(self, resolution: str, record: np.ndarray):
+        self.rings[resolution].append(record)
+        spill = self._spill_files.get(resolution)
+        if spill is not None:
+            spill.write(record.tobytes())
+    
+    def close(self):
+        """Finish the open buckets and close the spill files"""
+        if self._open["second"].count:
+            self._finish_second()
+        if self._open["minute"].count:
+            self._store("minute", self._open["minute"].record())
+            self._open["minute"].clear()
+        for spill in self._spill_files.values():
+            spill.close()
+        self._spill_files.clear()
+        self.closed_at = time.time()
+    
+    def _pending(self, resolution: str) -> List[np.ndarray]:
+        """Buckets not stored yet, as records (what _finish_second would store)"""
+        second = self._open["second"]
+        if resolution == "second":
+            return [second.record()] if second.count else []
+        
+        pending = []
+        minute = _Accumulator()
+        minute.start = self._open["minute"].start
+        minute.merge(self._open["minute"])
+        if second.count:
+            start = second.start - second.start % 60
+            if minute.count and start > minute.start:
+                pending.append(minute.record())
+                minute = _Accumulator()
+            if not minute.count:
+                minute.start = start
+            minute.merge(second)
+        if minute.count:
+            pending.append(minute.record())
+        return pending
+    
+    def covers(self, resolution: str, start: float) -> bool:
+        """Whether the in-memory data at ``resolution`` reaches back to ``start``"""
+        ring = self.raw if resolution == "raw" else self.rings[resolution]
+        if not ring.full:
+            # Nothing has been dropped yet
+            return True
+        return ring.oldest() <= start
+    
+    def query(self, resolution: str, start: float, end: float) -> np.ndarray:
+        """Records in start..end, from the rings and the spill files
+        
+        Buckets are included when any part of them is in the range.
+        """
+        if resolution == "raw":
+            return self.raw.between(start, end)
+        
+        start -= start % BUCKET_SECONDS[resolution]
+        ring = self.rings[resolution]
+        parts = []
+        oldest = ring.oldest()
+        if resolution in self.spill_paths and (oldest is None or start < oldest):
+            # Older than the ring: read the bucket files
+            older = read_spill(self.spill_paths[resolution], self._spill_files.get(resolution))
+            times = older["t"]
+            older = older[np.searchsorted(times, start, side="left"):np.searchsorted(times, end, side="right")]
+            parts.append(older if oldest is None else older[older["t"] < oldest])
+        parts.append(ring.between(start, end))
+        parts += [record for record in self._pending(resolution) if start <= record["t"][0] <= end]
+        return np.concatenate(parts)
+    
+    def summary(self) -> Dict:
+        return {
+            "client_id": self.client_id,
+            "detections": self.detections,
+            "first": self.first_t,
+            "last": self.last_t if self.detections else None,
+            "connected": self.closed_at is None,
+            "memory_bytes": self.raw.data.nbytes + sum(ring.data.nbytes for ring in self.rings.values()),
+        }
+
+
+def read_spill(path: Path, handle: Optional[BinaryIO] = None) -> np.ndarray:
+    """Bucket records from a spill file (memory-mapped, oldest first)"""
+    if handle is not None:
+        # Make what is still buffered visible to the reader
+        handle.flush()
+    path = Path(path)
+    # A trailing partial record means the writer was cut off mid-write
+    count = path.stat().st_size // BUCKET_RECORD.itemsize if path.exists() else 0
+    if not count:
+        return np.zeros(0, dtype=BUCKET_RECORD)
+    return np.memmap(path, dtype=BUCKET_RECORD, mode="r", shape=(count,))
+
+
+def summarize(rows: np.ndarray, resolution: str) -> Dict:
+    """Mean emotions and confidence, and each emotion's share of detections"""
+    if resolution == "raw":
+        counts = np.ones(len(rows))
+        dominant = np.bincount(rows["emotions"].argmax(axis=1), minlength=len(EMOTION_LABELS))
+    else:
+        counts = rows["count"].astype(np.float64)
+        dominant = rows["dominant"].sum(axis=0, dtype=np.float64)
+    
+    total = counts.sum()
+    if not total:
+        return {"detections": 0}
+    emotions = counts @ rows["emotions"].astype(np.float64) / total
+    top = int(np.argmax(emotions))
+    return {
+        "detections": int(total),
+        "dominant_emotion": EMOTION_LABELS[top],
+        "confidence": round(float(counts @ rows["confidence"] / total), 4),
+        "emotions": {
+            label: round(float(value), 3) for label, value in zip(EMOTION_LABELS, emotions)
+        },
+        "dominant_share": {
+            label: round(float(value / total), 4) for label, value in zip(EMOTION_LABELS, dominant)
+        },
+    }
+
+
+def to_columns(rows: np.ndarray, resolution: str) -> Dict:
+    """Records as JSON-friendly columns"""
+    columns = {
+        "t": np.round(rows["t"], 3).tolist(),
+        "dominant_emotion": [EMOTION_LABELS[i] for i in rows["emotions"].argmax(axis=1)],
+        "confidence": np.round(rows["confidence"].astype(np.float64), 4).tolist(),
+        "emotions": np.round(rows["emotions"].astype(np.float64), 3).tolist(),
+    }
+    if resolution != "raw":
+        columns["count"] = rows["count"].tolist()
+    return columns
+
+
+class MoodHistory:
+    """Mood history of connected and recently disconnected clients
+    
+    Disconnected clients stay queryable until HISTORY_MAX_CLOSED newer ones
+    have disconnected; their spill files stay on disk.
+    """
+    
+    def __init__(self):
+        self.labels = list(EMOTION_LABELS)
+        self.spill_dir: Optional[Path] = None
+        if settings.HISTORY_SPILL:
+            self.spill_dir = Path(settings.HISTORY_DIR)
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.max_closed = settings.HISTORY_MAX_CLOSED
+        
+        self.clients: Dict[str, ClientHistory] = {}
+        self.closed: "OrderedDict[str, ClientHistory]" = OrderedDict()
+        
+        # Statistics
+        self.detections_recorded = 0
+        self.clients_evicted = 0
+    
+    def record(self, client_id: str, result: Dict, t: Optional[float] = None):
+        """Add a successful detection result to the client's history"""
+        emotions = np.array(
+            [result.get("emotions", {}).get(label, 0.0) for label in self.labels], dtype=np.float64
+        )
+        total = emotions.sum()
+        if total <= 0:
+            return
+        
+        history = self.clients.get(client_id)
+        if history is None:
+            # An id can come back once its old connection is gone
+            self.closed.pop(client_id, None)
+            history = self.clients[client_id] = ClientHistory(client_id, self.spill_dir)
+        history.add(time.time() if t is None else t, emotions * (100.0 / total),
+                    float(result.get("confidence", 0.0)))
+        self.detections_recorded += 1
+    
+    def close_client(self, client_id: str):
+        """Finish a disconnected client's buckets; keep it for queries a while"""
+        history = self.clients.pop(client_id, None)
+        if history is None:
+            return
+        history.close()
+        self.closed[client_id] = history
+        while len(self.closed) > self.max_closed:
+            self.closed.popitem(last=False)
+            self.clients_evicted += 1
+    
+    def get(self, client_id: str) -> Optional[ClientHistory]:
+        return self.clients.get(client_id) or self.closed.get(client_id)
+    
+    def query(
+        self,
+        client_id: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = "auto",
+        aggregate: bool = False
+    ) -> Optional[Dict]:
+        """Range query (columns) or aggregate over one client's history
+        
+        ``auto`` picks the finest resolution whose ring still reaches back
+        to ``start``. Returns None for an unknown client.
+        """
+        history = self.get(client_id)
+        if history is None:
+            return None
+        
+        end = time.time() if end is None else end
+        start = 0.0 if start is None else start
+        if resolution == "auto":
+            resolution = next(
+                (name for name in RESOLUTIONS if history.covers(name, start)), "minute"
+            )
+        
+        rows = history.query(resolution, start, end)
+        response = {
+            "client_id": client_id,
+            "resolution": resolution,
+            "start": start,
+            "end": end,
+            "labels": self.labels,
+        }
+        if aggregate:
+            response["aggregate"] = summarize(rows, resolution)
+        else:
+            response["points"] = to_columns(rows, resolution)
+        return response
+    
+    def list_clients(self) -> List[Dict]:
+        return [history.summary() for history in [*self.clients.values(), *self.closed.values()]]
+    
+    def close(self):
+        """Finish every open bucket (shutdown)"""
+        for client_id in list(self.clients):
+            self.close_client(client_id)
+    
+    def get_stats(self) -> Dict:
+        histories = [*self.clients.values(), *self.closed.values()]
+        return {
+            "clients": len(self.clients),
+            "closed_clients": len(self.closed),
+            "detections_recorded": self.detections_recorded,
+            "clients_evicted": self.clients_evicted,
+            "memory_bytes": sum(history.summary()["memory_bytes"] for history in histories),
+            "spill_dir": str(self.spill_dir) if self.spill_dir else None,
+        }
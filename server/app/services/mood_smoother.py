@@ -0,0 +1,117 @@
+"""Per-client temporal smoothing of emotion results"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+EMOTION_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+
+class MoodSmoother:
+    """Turn a noisy stream of per-frame emotions into stable mood changes
+    
+    The last ``history`` emotion vectors are kept in a fixed-size ring
+    buffer and averaged with exponentially decaying weights (the newest
+    frame weighs ``alpha``, the one before ``alpha * (1 - alpha)``, ...).
+    Frames whose result doesn't meet the confidence threshold are not added
+    to the history. A new mood is only declared once it has been the top
+    smoothed emotion for ``min_dwell`` updates in a row, its smoothed score
+    meets the confidence threshold and it leads the current mood by at
+    least ``hysteresis`` (0-1 scale).
+    """
+    
+    def __init__(
+        self,
+        labels: Sequence[str] = EMOTION_LABELS,
+        history: Optional[int] = None,
+        alpha: Optional[float] = None,
+        hysteresis: Optional[float] = None,
+        min_dwell: Optional[int] = None,
+        confidence_threshold: Optional[float] = None
+    ):
+        self.labels = list(labels)
+        history = settings.MOOD_HISTORY_SIZE if history is None else history
+        alpha = settings.MOOD_SMOOTHING_ALPHA if alpha is None else alpha
+        self.hysteresis = settings.MOOD_HYSTERESIS if hysteresis is None else hysteresis
+        self.min_dwell = settings.MOOD_MIN_DWELL if min_dwell is None else min_dwell
+        if confidence_threshold is None:
+            confidence_threshold = settings.CONFIDENCE_THRESHOLD
+        self.confidence_threshold = confidence_threshold
+        
+        self._history = np.zeros((max(1, history), len(self.labels)), dtype=np.float32)
+        # _decay[k] is the weight of the frame k updates old
+        self._decay = alpha * (1 - alpha) ** np.arange(len(self._history), dtype=np.float32)
+        self._next = 0
+        self._filled = 0
+        
+        self.mood: Optional[str] = None
+        self.smoothed: Optional[np.ndarray] = None
+        self._candidate: Optional[int] = None
+        self._candidate_streak = 0
+        
+        # Statistics
+        self.updates = 0
+        self.transitions = 0
+    
+    def _vector(self, emotions: Dict[str, float]) -> np.ndarray:
+        """Emotion scores (percent or 0-1) as a probability vector"""
+        vector = np.array([emotions.get(label, 0.0) for label in self.labels], dtype=np.float32)
+        total = vector.sum()
+        return vector / total if total > 0 else vector
+    
+    def _smooth(self) -> np.ndarray:
+        """Exponentially weighted mean of the filled part of the ring"""
+        size = len(self._history)
+        # Age of each slot: the last written one is 0 updates old
+        ages = (self._next - 1 - np.arange(size)) % size
+        weights = np.where(ages < self._filled, self._decay[ages], 0.0)
+        return weights @ self._history / weights.sum()
+    
+    def update(self, result: Dict) -> Optional[Dict]:
+        """Add a detection; return the new mood if it changed, else None"""
+        self.updates += 1
+        
+        confidence = float(result.get("confidence", 0.0))
+        if not result.get("meets_threshold", confidence >= self.confidence_threshold):
+            return None
+        
+        self._history[self._next] = self._vector(result.get("emotions", {}))
+        self._next = (self._next + 1) % len(self._history)
+        self._filled = min(self._filled + 1, len(self._history))
+        self.smoothed = self._smooth()
+        
+        leader = int(np.argmax(self.smoothed))
+        if self.mood is not None and self.labels[leader] == self.mood:
+            self._candidate, self._candidate_streak = None, 0
+            return None
+        
+        # Count how long the same challenger has been on top
+        if leader == self._candidate:
+            self._candidate_streak += 1
+        else:
+            self._candidate, self._candidate_streak = leader, 1
+        
+        score = float(self.smoothed[leader])
+        if self._candidate_streak < self.min_dwell:
+            return None
+        # Averaging can crown a leader that no frame was confident about
+        if score < self.confidence_threshold:
+            return None
+        if self.mood is not None:
+            current = float(self.smoothed[self.labels.index(self.mood)])
+            if score - current < self.hysteresis:
+                return None
+        
+        previous, self.mood = self.mood, self.labels[leader]
+        self._candidate, self._candidate_streak = None, 0
+        self.transitions += 1
+        
+        return {
+            "mood": self.mood,
+            "previous_mood": previous,
+            "confidence": score,
+            "emotions": {
+                label: float(value * 100) for label, value in zip(self.labels, self.smoothed)
+            },
+        }
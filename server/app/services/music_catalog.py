@@ -0,0 +1,161 @@
+"""Binary, memory-mappable music catalog
+
+Layout (all sections 64-byte aligned)::
+
+    b"MOODCAT1" | uint32 header length | JSON header | columns...
+
+The header lists every column's dtype, shape and byte offset (relative to
+the first aligned byte after the header). Numeric columns are the
+MusicIndex arrays, already sorted into cells, so opening a catalog is an
+mmap plus a header parse: no per-track work, and workers that map the same
+file share its pages. Strings are stored as one UTF-8 blob per field plus
+an offsets column.
+"""
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.music_index import MOOD_LABELS, MusicIndex
+
+MAGIC = b"MOODCAT1"
+ALIGNMENT = 64
+STRING_FIELDS = ("title", "artist", "url")
+
+
+class PackedStrings:
+    """Read-only sequence of strings stored as offsets + UTF-8 blob"""
+    
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, row: int) -> str:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+
+def _pack_strings(values) -> List[np.ndarray]:
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return [offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)]
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_catalog(index: MusicIndex, path: Path):
+    """Write an index as a binary catalog (atomically replacing ``path``)"""
+    columns: Dict[str, np.ndarray] = {
+        "matrix": np.ascontiguousarray(index.matrix, dtype=np.float32),
+        "cell_start": np.ascontiguousarray(index.cell_start, dtype=np.int64),
+    }
+    for field in STRING_FIELDS:
+        offsets, data = _pack_strings(getattr(index, field + "s"))
+        columns[field + "_offsets"] = offsets
+        columns[field + "_data"] = data
+    
+    header = {"version": 1, "count": len(index), "grid": index.grid, "columns": {}}
+    offset = 0
+    for name, array in columns.items():
+        header["columns"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+    
+    # Write next to the target and rename: readers keep their old mapping
+    # until they reopen, and never see a half-written file
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(data_start + header["columns"][name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def is_catalog(path: Path) -> bool:
+    """Whether a file is a binary catalog"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def open_catalog(path: Path, **kwargs) -> MusicIndex:
+    """Memory-map a binary catalog as a MusicIndex"""
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    if buffer[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f"{path} is not a music catalog")
+    
+    header_len = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 4].tobytes(), "little")
+    header_start = len(MAGIC) + 4
+    header = json.loads(buffer[header_start:header_start + header_len].tobytes())
+    data_start = _aligned(header_start + header_len)
+    
+    def column(name: str) -> np.ndarray:
+        spec = header["columns"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        return np.frombuffer(buffer, dtype=dtype, count=count,
+                             offset=data_start + spec["offset"]).reshape(spec["shape"])
+    
+    strings = {
+        field: PackedStrings(column(field + "_offsets"), column(field + "_data"))
+        for field in STRING_FIELDS
+    }
+    return MusicIndex(
+        column("matrix"),
+        column("cell_start"),
+        strings["title"],
+        strings["artist"],
+        strings["url"],
+        grid=header["grid"],
+        **kwargs
+    )
+
+
+def load_tracks(path: Path) -> List[Dict]:
+    """Read tracks from JSON or CSV source files
+    
+    JSON may be a list of tracks or the songs.json layout ({mood: [...]}).
+    CSV needs title/artist/url columns plus either a mood column or one
+    column per mood; valence and energy columns are optional.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        tracks = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                track = {field: row.get(field, "") for field in STRING_FIELDS}
+                moods = {m: float(row[m]) for m in MOOD_LABELS if row.get(m)}
+                if moods:
+                    track["moods"] = moods
+                elif row.get("mood"):
+                    track["mood"] = row["mood"]
+                for field in ("valence", "energy"):
+                    if row.get(field):
+                        track[field] = float(row[field])
+                tracks.append(track)
+        return tracks
+    
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [dict(song, mood=song.get("mood", mood))
+                for mood, songs in data.items() for song in songs]
+    return data
@@ -0,0 +1,273 @@
+"""Vectorized mood-to-track index for large music catalogs"""
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MOOD_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+# Typical (valence, energy) of music that fits each mood
+MOOD_PROFILES = {
+    'angry': (0.2, 0.9),
+    'disgust': (0.25, 0.55),
+    'fear': (0.2, 0.6),
+    'happy': (0.9, 0.8),
+    'sad': (0.15, 0.25),
+    'surprise': (0.7, 0.85),
+    'neutral': (0.5, 0.4),
+}
+
+# Feature columns: one affinity per mood, then valence and energy
+NUM_MOODS = len(MOOD_LABELS)
+VALENCE, ENERGY = NUM_MOODS, NUM_MOODS + 1
+NUM_FEATURES = NUM_MOODS + 2
+
+# Below this many tracks a full scan is as fast as probing cells
+FULL_SCAN_MAX = 8192
+
+
+def track_features(track: Dict, mood: Optional[str] = None) -> np.ndarray:
+    """Feature vector of one catalog entry
+    
+    Mood affinities come from ``track["moods"]`` ({mood: weight}) or a single
+    ``track["mood"]`` / ``mood``; valence and energy default to the mood's
+    profile when the track doesn't have them.
+    """
+    features = np.zeros(NUM_FEATURES, dtype=np.float32)
+    moods = track.get("moods") or {track.get("mood") or mood or "neutral": 1.0}
+    for label, weight in moods.items():
+        if label in MOOD_LABELS:
+            features[MOOD_LABELS.index(label)] = weight
+    total = features[:NUM_MOODS].sum()
+    if total > 0:
+        features[:NUM_MOODS] /= total
+    
+    profile = np.array([MOOD_PROFILES[m] for m in MOOD_LABELS]).T @ features[:NUM_MOODS]
+    features[VALENCE] = track.get("valence", profile[0])
+    features[ENERGY] = track.get("energy", profile[1])
+    return features
+
+
+def _bins(values: np.ndarray, grid: int) -> np.ndarray:
+    return np.clip((values * grid).astype(np.int64), 0, grid - 1)
+
+
+def _cells(features: np.ndarray, grid: int) -> np.ndarray:
+    """Cell id of each row: dominant mood, valence bin, energy bin"""
+    dominant = features[:, :NUM_MOODS].argmax(axis=1)
+    return (dominant * grid + _bins(features[:, VALENCE], grid)) * grid + _bins(features[:, ENERGY], grid)
+
+
+class MusicIndex:
+    """Score every track of a catalog against an emotion distribution
+    
+    Tracks are rows of a float32 matrix: 7 mood affinities, valence, energy
+    and the precomputed squared norm of (valence, energy). A query is built
+    from the full emotion distribution, so that::
+        
+        score = mood_weight * affinity . emotions
+                - ve_weight * |(valence, energy) - target|^2
+    
+    is one matrix-vector product over the candidate rows.
+    
+    For large catalogs the rows are sorted into IVF-style cells (dominant
+    mood x valence bin x energy bin), each a contiguous slice of the matrix.
+    A query only scores the cells of its ``probe_moods`` strongest moods
+    within ``probe_radius`` bins of its target valence/energy, widening to
+    a full scan if that yields too few candidates.
+    """
+    
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        cell_start: np.ndarray,
+        titles: Sequence[str],
+        artists: Sequence[str],
+        urls: Sequence[str],
+        grid: int = 16,
+        probe_moods: int = 2,
+        probe_radius: int = 1,
+        mood_weight: float = 1.0,
+        ve_weight: float = 1.0
+    ):
+        # Rows sorted by cell; cell c is matrix[cell_start[c]:cell_start[c + 1]].
+        # Any sequence type works for the strings (e.g. memory-mapped ones).
+        self.matrix = matrix
+        self.cell_start = cell_start
+        self.titles = titles
+        self.artists = artists
+        self.urls = urls
+        self.grid = grid
+        self.probe_moods = probe_moods
+        self.probe_radius = probe_radius
+        self.mood_weight = mood_weight
+        self.ve_weight = ve_weight
+        
+        self._profiles = np.array([MOOD_PROFILES[m] for m in MOOD_LABELS], dtype=np.float32)
+    
+    @classmethod
+    def build(
+        cls,
+        features: np.ndarray,
+        titles: Sequence[str],
+        artists: Sequence[str],
+        urls: Sequence[str],
+        grid: int = 16,
+        **kwargs
+    ) -> "MusicIndex":
+        """Index an (N, 9) feature matrix and the matching track strings"""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        
+        # Sort rows by cell so every cell is a contiguous slice
+        cells = _cells(features, grid)
+        order = np.argsort(cells, kind="stable")
+        cell_start = np.searchsorted(cells[order], np.arange(NUM_MOODS * grid * grid + 1))
+        
+        matrix = np.empty((len(features), NUM_FEATURES + 1), dtype=np.float32)
+        matrix[:, :NUM_FEATURES] = features[order]
+        matrix[:, NUM_FEATURES] = features[order, VALENCE] ** 2 + features[order, ENERGY] ** 2
+        
+        return cls(
+            matrix,
+            cell_start,
+            np.asarray(titles, dtype=object)[order],
+            np.asarray(artists, dtype=object)[order],
+            np.asarray(urls, dtype=object)[order],
+            grid=grid,
+            **kwargs
+        )
+    
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Dict], **kwargs) -> "MusicIndex":
+        """Build from a list of track dicts (title, artist, url, mood(s), ...)"""
+        tracks = list(tracks)
+        features = np.stack([track_features(t) for t in tracks]) if tracks else np.zeros((0, NUM_FEATURES))
+        return cls.build(
+            features,
+            [t.get("title", "") for t in tracks],
+            [t.get("artist", "") for t in tracks],
+            [t.get("url", "") for t in tracks],
+            **kwargs
+        )
+    
+    @classmethod
+    def from_mood_lists(cls, songs_db: Dict[str, List[Dict]], **kwargs) -> "MusicIndex":
+        """Build from the legacy songs.json layout ({mood: [track, ...]})"""
+        tracks = [dict(song, mood=song.get("mood", mood))
+                  for mood, songs in songs_db.items() for song in songs]
+        return cls.from_tracks(tracks, **kwargs)
+    
+    def __len__(self) -> int:
+        return len(self.matrix)
+    
+    def _mix_and_target(self, emotions: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized emotion mix and the (valence, energy) it calls for"""
+        mix = np.array([emotions.get(m, 0.0) for m in MOOD_LABELS], dtype=np.float32)
+        total = mix.sum()
+        mix = mix / total if total > 0 else np.full(NUM_MOODS, 1 / NUM_MOODS, dtype=np.float32)
+        return mix, mix @ self._profiles
+    
+    def query_vector(self, mix: np.ndarray, target: np.ndarray) -> np.ndarray:
+        """Weights such that ``matrix @ weights`` is each track's score"""
+        # -|f - t|^2 = 2 f.t - |f|^2 - |t|^2, and |t|^2 is the same for all rows
+        weights = np.empty(NUM_FEATURES + 1, dtype=np.float32)
+        weights[:NUM_MOODS] = self.mood_weight * mix
+        weights[VALENCE:ENERGY + 1] = 2 * self.ve_weight * target
+        weights[NUM_FEATURES] = -self.ve_weight
+        return weights
+    
+    def _probe_ranges(self, mix: np.ndarray, target: np.ndarray) -> List[Tuple[int, int]]:
+        """Row ranges of the cells worth scoring for a query"""
+        v_bin, e_bin = _bins(target, self.grid)
+        v_lo, v_hi = max(0, v_bin - self.probe_radius), min(self.grid - 1, v_bin + self.probe_radius)
+        e_lo, e_hi = max(0, e_bin - self.probe_radius), min(self.grid - 1, e_bin + self.probe_radius)
+        
+        ranges = []
+        for mood in np.argsort(mix)[::-1][:self.probe_moods]:
+            for v in range(v_lo, v_hi + 1):
+                # Energy bins of one valence bin are adjacent cells
+                first = (mood * self.grid + v) * self.grid
+                start, end = self.cell_start[first + e_lo], self.cell_start[first + e_hi + 1]
+                if end > start:
+                    ranges.append((int(start), int(end)))
+        return ranges
+    
+    def _score(self, weights: np.ndarray, ranges: List[Tuple[int, int]]):
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            return self.matrix[start:end] @ weights, np.arange(start, end)
+        scores = np.concatenate([self.matrix[s:e] @ weights for s, e in ranges])
+        rows = np.concatenate([np.arange(s, e) for s, e in ranges])
+        return scores, rows
+    
+    def query(
+        self,
+        emotions: Dict[str, float],
+        k: int = 5,
+        exclude: Iterable[int] = ()
+    ) -> np.ndarray:
+        """Row ids of the ``k`` best tracks, best first, skipping ``exclude``"""
+        return self._top(emotions, k, exclude)[0]
+    
+    def _top(
+        self,
+        emotions: Dict[str, float],
+        k: int,
+        exclude: Iterable[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids and scores of the ``k`` best tracks"""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        mix, target = self._mix_and_target(emotions)
+        weights = self.query_vector(mix, target)
+        exclude = np.fromiter(exclude, dtype=np.int64)
+        
+        ranges = [(0, len(self))]
+        if len(self) > FULL_SCAN_MAX:
+            probed = self._probe_ranges(mix, target)
+            if sum(e - s for s, e in probed) >= k + len(exclude):
+                ranges = probed
+        
+        scores, rows = self._score(weights, ranges)
+        if len(exclude):
+            scores[np.isin(rows, exclude)] = -np.inf
+        
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        best = best[np.isfinite(scores[best])]
+        return rows[best], scores[best]
+    
+    def recommend(
+        self,
+        emotions: Dict[str, float],
+        k: int = 5,
+        exclude: Iterable[int] = (),
+        margin: float = 0.1
+    ) -> Optional[int]:
+        """Row id of a random pick among the top ``k``, or None
+        
+        Only tracks scoring within ``margin`` of the best match are eligible,
+        so excluding recent tracks never falls back to poor matches; if all
+        eligible tracks were played recently, the least recent is repeated.
+        """
+        # Position of each row's latest play in ``exclude`` (oldest first)
+        last_played = {int(row): i for i, row in enumerate(exclude)}
+        rows, scores = self._top(emotions, k + len(last_played), ())
+        if len(rows) == 0:
+            return None
+        
+        eligible = rows[scores >= scores[0] - margin].tolist()
+        fresh = [row for row in eligible if row not in last_played][:k]
+        if fresh:
+            return random.choice(fresh)
+        return min(eligible, key=last_played.get)
+    
+    def track(self, row: int) -> Dict:
+        """Catalog entry of a row id"""
+        return {
+            "title": self.titles[row],
+            "artist": self.artists[row],
+            "url": self.urls[row],
+        }
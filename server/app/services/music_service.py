@@ -1,10 +1,13 @@
 """Music recommendation service"""
 import json
 import random
-from typing import Dict, Optional
+import time
+from typing import Dict, Iterable, Optional
 from pathlib import Path
 
 from app.config import settings
+from app.services.music_catalog import is_catalog, load_tracks, open_catalog
+from app.services.music_index import MusicIndex
 
 class MusicService:
     """Handle music recommendations based on mood"""
@@ -13,6 +16,12 @@ class MusicService:
         self.use_spotify = settings.USE_SPOTIFY
         self.songs_db = self._load_songs_database()
         
+        # Binary catalogs are re-mapped when their mtime changes
+        self.catalog_path = Path(settings.MUSIC_CATALOG_PATH) if settings.MUSIC_CATALOG_PATH else None
+        self._catalog_mtime: Optional[int] = None
+        self._last_reload_check = time.monotonic()
+        self.index = self._build_index()
+        
         if self.use_spotify:
             self._init_spotify()
     
@@ -60,18 +69,56 @@ class MusicService:
         with open(db_path, 'r') as f:
             return json.load(f)
     
+    def _build_index(self) -> MusicIndex:
+        """Index the track catalog (or the local songs database)"""
+        catalog_path = self.catalog_path
+        
+        if catalog_path and catalog_path.exists() and is_catalog(catalog_path):
+            # Memory-mapped, pre-indexed catalog (scripts/convert_catalog.py)
+            self._catalog_mtime = catalog_path.stat().st_mtime_ns
+            index = open_catalog(catalog_path)
+        elif catalog_path and catalog_path.exists():
+            # JSON or CSV tracks, parsed and indexed in this process
+            index = MusicIndex.from_tracks(load_tracks(catalog_path))
+        else:
+            index = MusicIndex.from_mood_lists(self.songs_db)
+        
+        print(f"🎵 Music index: {len(index)} tracks")
+        return index
+    
+    def _maybe_reload(self):
+        """Swap in the binary catalog if it changed on disk"""
+        if self._catalog_mtime is None:
+            return
+        now = time.monotonic()
+        if now - self._last_reload_check < settings.MUSIC_CATALOG_RELOAD_S:
+            return
+        self._last_reload_check = now
+        
+        try:
+            mtime = self.catalog_path.stat().st_mtime_ns
+            if mtime == self._catalog_mtime:
+                return
+            index = open_catalog(self.catalog_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Music catalog reload failed: {e}")
+            return
+        
+        # Queries already running keep using the old mapping
+        self.index = index
+        self._catalog_mtime = mtime
+        print(f"🔄 Music catalog reloaded: {len(index)} tracks")
+    
     def _init_spotify(self):
         """Initialize Spotify client"""
         try:
-            import spotipy
-            from spotipy.oauth2 import SpotifyClientCredentials
+            from app.services.spotify_client import AsyncSpotifyClient
             
-            auth_manager = SpotifyClientCredentials(
+            self.spotify = AsyncSpotifyClient(
                 client_id=settings.SPOTIFY_CLIENT_ID,
                 client_secret=settings.SPOTIFY_CLIENT_SECRET
             )
-            self.spotify = spotipy.Spotify(auth_manager=auth_manager)
-            print("✅ Spotify client initialized")
+            print(f"✅ Spotify client initialized ({self.spotify.api_url})")
         except Exception as e:
             print(f"⚠️  Spotify initialization failed: {e}")
             self.spotify = None
@@ -96,25 +143,56 @@ class MusicService:
             "mood": mood
         }
     
-    def search_spotify(self, mood: str, query: str) -> Optional[Dict]:
+    def recommend(self, emotions: Dict[str, float], recent: Optional[Iterable[int]] = None) -> Optional[Dict]:
+        """Recommend a track for a full emotion distribution
+        
+        ``recent`` holds the catalog rows recently recommended to this
+        client; they are skipped and the new pick is appended to it.
+        """
+        self._maybe_reload()
+        
+        row = self.index.recommend(
+            emotions,
+            k=settings.MUSIC_TOP_K,
+            exclude=recent if recent is not None else ()
+        )
+        if row is None:
+            return None
+        
+        if recent is not None:
+            recent.append(row)
+        
+        song = self.index.track(row)
+        song["mood"] = max(emotions, key=emotions.get)
+        return song
+    
+    async def search_spotify(self, mood: str, query: str) -> Optional[Dict]:
         """Search Spotify for mood-based songs"""
         if not self.use_spotify or not self.spotify:
             return None
         
-        try:
-            results = self.spotify.search(q=query, type='track', limit=1)
-            tracks = results['tracks']['items']
-            
-            if tracks:
-                track = tracks[0]
-                return {
-                    "title": track['name'],
-                    "artist": track['artists'][0]['name'],
-                    "url": track['external_urls']['spotify'],
-                    "uri": track['uri'],
-                    "mood": mood
-                }
-        except Exception as e:
-            print(f"❌ Spotify search error: {e}")
+        return await self.spotify.search_track(query, mood)
+    
+    async def resolve(self, song: Optional[Dict]) -> Optional[Dict]:
+        """Fill in a playable Spotify link for a catalog song if we can"""
+        if not song or not self.use_spotify or not self.spotify:
+            return song
+        if song.get("url", "").startswith("https://"):
+            return song
         
-        return None
\ No newline at end of file
+        match = await self.search_spotify(song["mood"], f"{song['title']} {song['artist']}")
+        if match is None:
+            return song
+        return dict(song, url=match["url"], uri=match["uri"])
+    
+    def get_stats(self) -> Dict:
+        """Catalog and Spotify lookup statistics"""
+        return {
+            "catalog_tracks": len(self.index),
+            "spotify": self.spotify.get_stats() if self.use_spotify and self.spotify else None,
+        }
+    
+    async def aclose(self):
+        """Release the Spotify connection pool"""
+        if self.use_spotify and self.spotify:
+            await self.spotify.aclose()
\ No newline at end of file
@@ -0,0 +1,322 @@
+"""Negotiated WebSocket result protocol
+
+Version 1 (the default) is plain JSON text: one ``frame_ack`` per frame and
+a full ``mood_detected`` message (all emotions and the song) per detection.
+
+Clients may switch to version 2 after ``connected`` by sending::
+
+    {"type": "negotiate", "version": 2, "encoding": "binary", "ack_every": 10}
+
+Version 2 acks cumulatively (``ack`` = frames received so far, sent every
+``ack_every`` frames and piggybacked on every result), sends emotions as a
+list in ``labels`` order and includes the song only when it changed. Each
+result names the ``frame`` (1-based count of binary messages received) it
+was detected on. With ``"report_all": true`` every detection is reported,
+not just mood changes; results that aren't a change have ``changed`` false
+and no song (used by scripts/loadgen.py to measure per-frame latency).
+When the model found faces, results carry ``faces``: per person a stable
+``id``, its ``box`` [x, y, w, h], ``mood``, ``confidence`` and emotions;
+the top-level mood is their aggregate.
+Results, acks and rate hints use the negotiated encoding:
+
+- ``json``: compact JSON text
+- ``msgpack``: the same message as MessagePack (if msgpack is installed)
+- ``binary``: fixed little-endian layouts, first byte is the message type::
+
+      MOOD      B type, B mood index, B flags, x, I ack, I frame,
+                f confidence, d timestamp, 7f emotions (percent)
+                [H song length, song as UTF-8 JSON]  if flags & SONG
+                [B face count, per face: I id, 4H box, B mood index,
+                 f confidence, 7f emotions]           if flags & FACES
+      ACK       B type, 3x, I ack
+      RATE_HINT B type, 3x, f fps
+
+Control messages (connected, negotiated, pong, error) are always JSON text.
+"""
+import json
+import struct
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from fastapi import WebSocket
+
+from app.config import settings
+from app.services.music_index import MOOD_LABELS
+
+PROTOCOL_VERSIONS = (1, 2)
+
+# Largest ack_every a client may ask for
+MAX_ACK_EVERY = 1000
+
+# Binary message types and flags
+MOOD, ACK, RATE_HINT = 1, 2, 3
+FLAG_SONG, FLAG_CHANGED, FLAG_FACES = 1, 2, 4
+
+MOOD_STRUCT = struct.Struct(f"<BBBxIIfd{len(MOOD_LABELS)}f")
+ACK_STRUCT = struct.Struct("<B3xI")
+RATE_HINT_STRUCT = struct.Struct("<B3xf")
+SONG_LENGTH = struct.Struct("<H")
+FACE_COUNT = struct.Struct("<B")
+FACE_STRUCT = struct.Struct(f"<I4HBf{len(MOOD_LABELS)}f")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def available_encodings() -> List[str]:
+    """Result encodings this server can speak in version 2"""
+    encodings = ["json", "binary"]
+    if msgpack is not None:
+        encodings.insert(1, "msgpack")
+    return encodings
+
+
+class ProtocolSession:
+    """Per-connection protocol state and message encoding"""
+    
+    def __init__(self):
+        self.version = 1
+        self.encoding = "json"
+        self.ack_every = 1
+        self.report_all = False
+        
+        self.frames_received = 0
+        self.frames_acked = 0
+        self.last_song: Optional[Dict] = None
+        
+        # Statistics
+        self.messages_sent = 0
+        self.bytes_sent = 0
+    
+    @staticmethod
+    def advertise() -> Dict:
+        """Protocol options for the ``connected`` handshake"""
+        return {
+            "versions": list(PROTOCOL_VERSIONS),
+            "encodings": available_encodings(),
+            "labels": list(MOOD_LABELS),
+            "ack_every": settings.PROTOCOL_ACK_EVERY,
+        }
+    
+    def negotiate(self, request: Dict) -> Dict:
+        """Apply a ``negotiate`` request; returns the reply to send"""
+        version = request.get("version", 2)
+        encoding = request.get("encoding", "json")
+        ack_every = request.get("ack_every", settings.PROTOCOL_ACK_EVERY)
+        # Everything is validated before the session changes
+        if isinstance(version, bool) or version not in PROTOCOL_VERSIONS:
+            return {"type": "error", "message": f"Unsupported protocol version: {version}"}
+        if version == 2:
+            if encoding not in available_encodings():
+                return {"type": "error", "message": f"Unsupported encoding: {encoding}"}
+            if (not isinstance(ack_every, int) or isinstance(ack_every, bool)
+                    or not 1 <= ack_every <= MAX_ACK_EVERY):
+                return {"type": "error",
+                        "message": f"ack_every must be an integer from 1 to {MAX_ACK_EVERY}"}
+        
+        self.version = version
+        if version == 1:
+            self.encoding, self.ack_every, self.report_all = "json", 1, False
+        else:
+            self.encoding = encoding
+            self.ack_every = ack_every
+            self.report_all = bool(request.get("report_all", False))
+        # The song is resent after switching
+        self.last_song = None
+        
+        return {
+            "type": "negotiated",
+            "version": self.version,
+            "encoding": self.encoding,
+            "ack_every": self.ack_every,
+            "report_all": self.report_all,
+            "labels": list(MOOD_LABELS),
+        }
+    
+    def frame_received(self) -> Optional[Dict]:
+        """Count a received frame; returns an ack message if one is due"""
+        self.frames_received += 1
+        if self.version == 1:
+            return {
+                "type": "frame_ack",
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        if self.frames_received - self.frames_acked < self.ack_every:
+            return None
+        self.frames_acked = self.frames_received
+        return {"type": "ack", "ack": self.frames_received}
+    
+    def mood_message(
+        self,
+        mood: str,
+        confidence: float,
+        emotions: Dict[str, float],
+        song: Optional[Dict],
+        frame: int = 0,
+        changed: bool = True,
+        faces: Optional[List[Dict]] = None
+    ) -> Dict:
+        """Result message for a detected mood (``changed`` False: report_all only)"""
+        if self.version == 1:
+            message = {
+                "type": "mood_detected",
+                "mood": mood,
+                "confidence": confidence,
+                "song": song,
+                "timestamp": datetime.now().isoformat(),
+                "all_emotions": emotions
+            }
+            if faces is not None:
+                message["faces"] = [
+                    {
+                        "id": face.get("id", 0),
+                        "box": [int(v) for v in face["box"]],
+                        "mood": face["dominant_emotion"],
+                        "confidence": float(face["confidence"]),
+                        "emotions": {k: float(v) for k, v in face["emotions"].items()},
+                    }
+                    for face in faces
+                ]
+            return message
+        
+        # Acks ride along with results
+        self.frames_acked = self.frames_received
+        message = {
+            "type": "mood_detected",
+            "mood": mood,
+            "confidence": confidence,
+            "emotions": [emotions.get(label, 0.0) for label in MOOD_LABELS],
+            "timestamp": time.time(),
+            "ack": self.frames_received,
+            "frame": frame,
+            "changed": changed,
+        }
+        if changed and song != self.last_song:
+            self.last_song = song
+            message["song"] = song
+        if faces is not None:
+            message["faces"] = [
+                {
+                    "id": face.get("id", 0),
+                    "box": [int(v) for v in face["box"]],
+                    "mood": face["dominant_emotion"],
+                    "confidence": float(face["confidence"]),
+                    "emotions": [float(face["emotions"].get(label, 0.0)) for label in MOOD_LABELS],
+                }
+                for face in faces
+            ]
+        return message
+    
+    def encode(self, message: Dict) -> Union[str, bytes]:
+        """Serialize a message for the negotiated encoding"""
+        kind = message["type"]
+        is_result = kind in ("mood_detected", "ack", "rate_hint")
+        
+        if self.version == 1 or not is_result or self.encoding == "json":
+            return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        if self.encoding == "msgpack":
+            return msgpack.packb(message, use_single_float=True)
+        
+        if kind == "ack":
+            return ACK_STRUCT.pack(ACK, message["ack"])
+        if kind == "rate_hint":
+            return RATE_HINT_STRUCT.pack(RATE_HINT, message["fps"])
+        
+        has_song = "song" in message
+        has_faces = "faces" in message
+        flags = (
+            (FLAG_SONG if has_song else 0)
+            | (FLAG_CHANGED if message["changed"] else 0)
+            | (FLAG_FACES if has_faces else 0)
+        )
+        packed = MOOD_STRUCT.pack(
+            MOOD,
+            MOOD_LABELS.index(message["mood"]),
+            flags,
+            message["ack"],
+            message["frame"],
+            message["confidence"],
+            message["timestamp"],
+            *message["emotions"]
+        )
+        parts = [packed]
+        if has_song:
+            song = json.dumps(message["song"], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            parts += [SONG_LENGTH.pack(len(song)), song]
+        if has_faces:
+            faces = message["faces"][:255]
+            parts.append(FACE_COUNT.pack(len(faces)))
+            for face in faces:
+                parts.append(FACE_STRUCT.pack(
+                    face["id"],
+                    *(min(max(v, 0), 0xFFFF) for v in face["box"]),
+                    MOOD_LABELS.index(face["mood"]),
+                    face["confidence"],
+                    *face["emotions"]
+                ))
+        return b"".join(parts)
+    
+    async def send(self, websocket: WebSocket, message: Dict):
+        """Encode and send one message"""
+        data = self.encode(message)
+        if isinstance(data, bytes):
+            await websocket.send_bytes(data)
+        else:
+            await websocket.send_text(data)
+        self.messages_sent += 1
+        self.bytes_sent += len(data)
+
+
+def decode_message(data: Union[str, bytes], encoding: str = "json") -> Dict:
+    """Parse a server message back into a dict (for Python clients)"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if encoding == "msgpack":
+        return msgpack.unpackb(data)
+    
+    kind = data[0]
+    if kind == ACK:
+        return {"type": "ack", "ack": ACK_STRUCT.unpack(data)[1]}
+    if kind == RATE_HINT:
+        return {"type": "rate_hint", "fps": RATE_HINT_STRUCT.unpack(data)[1]}
+    if kind != MOOD:
+        raise ValueError(f"Unknown binary message type: {kind}")
+    
+    _, mood, flags, ack, frame, confidence, timestamp, *emotions = MOOD_STRUCT.unpack_from(data)
+    message = {
+        "type": "mood_detected",
+        "mood": MOOD_LABELS[mood],
+        "confidence": confidence,
+        "emotions": emotions,
+        "timestamp": timestamp,
+        "ack": ack,
+        "frame": frame,
+        "changed": bool(flags & FLAG_CHANGED),
+    }
+    offset = MOOD_STRUCT.size
+    if flags & FLAG_SONG:
+        (length,) = SONG_LENGTH.unpack_from(data, offset)
+        offset += SONG_LENGTH.size
+        message["song"] = json.loads(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    if flags & FLAG_FACES:
+        (count,) = FACE_COUNT.unpack_from(data, offset)
+        offset += FACE_COUNT.size
+        message["faces"] = []
+        for _ in range(count):
+            face_id, x, y, w, h, face_mood, face_confidence, *face_emotions = (
+                FACE_STRUCT.unpack_from(data, offset)
+            )
+            offset += FACE_STRUCT.size
+            message["faces"].append({
+                "id": face_id,
+                "box": [x, y, w, h],
+                "mood": MOOD_LABELS[face_mood],
+                "confidence": face_confidence,
+                "emotions": face_emotions,
+            })
+    return message
@@ -0,0 +1,233 @@
+"""Gateway-side client for remote inference replicas"""
+import asyncio
+import itertools
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.rpc import open_connection, read_message, write_message
+
+
+class InferenceReplica:
+    """One multiplexed connection to an inference server"""
+    
+    def __init__(self, address: str):
+        self.address = address
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.healthy = False
+        self.health: Dict = {}
+        
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+        
+        # Statistics
+        self.requests = 0
+        self.failures = 0
+        self.latency_ms = 0.0
+    
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+    
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+    
+    async def connect(self):
+        """Open the connection and start dispatching responses"""
+        self.reader, self.writer = await asyncio.wait_for(
+            open_connection(self.address), settings.INFERENCE_RPC_TIMEOUT_S
+        )
+        self._reader_task = asyncio.create_task(self._read_responses(self.reader, self.writer))
+    
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Resolve pending calls as their responses arrive"""
+        error: Exception = ConnectionError(f"Inference replica {self.address} closed the connection")
+        try:
+            while True:
+                header, _ = await read_message(reader)
+                future = self._pending.pop(header.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in header:
+                    future.set_exception(RuntimeError(header["error"]))
+                else:
+                    future.set_result(header["result"])
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            if not isinstance(e, asyncio.IncompleteReadError):
+                error = ConnectionError(f"Inference replica {self.address}: {e}")
+        finally:
+            # A reconnect may already have replaced this connection
+            if self.writer is writer:
+                self._disconnect(error)
+    
+    def _disconnect(self, error: Exception):
+        """Drop the connection and fail every call still waiting on it"""
+        self.healthy = False
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+    
+    async def call(self, header: Dict, payload=b"", timeout: Optional[float] = None) -> Dict:
+        """Send one request and wait for its response"""
+        if not self.connected:
+            raise ConnectionError(f"Inference replica {self.address} is not connected")
+        
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            write_message(self.writer, {**header, "id": request_id}, payload)
+            await self.writer.drain()
+            return await asyncio.wait_for(future, timeout or settings.INFERENCE_RPC_TIMEOUT_S)
+        finally:
+            self._pending.pop(request_id, None)
+    
+    async def check_health(self) -> bool:
+        """(Re)connect if needed and ping the replica"""
+        try:
+            if not self.connected:
+                await self.connect()
+            was_down = self.health.get("status") == "down"
+            self.health = await self.call({"op": "health"}, timeout=settings.INFERENCE_HEALTH_TIMEOUT_S)
+            self.healthy = self.health.get("status") == "ok"
+            if self.healthy and was_down:
+                print(f"✅ Inference replica {self.address} is back")
+        except (asyncio.TimeoutError, ConnectionError, OSError, RuntimeError) as e:
+            reason = str(e) or type(e).__name__
+            if self.healthy or not self.health:
+                print(f"⚠️  Inference replica {self.address} unhealthy: {reason}")
+            self.health = {"status": "down", "error": reason}
+            self._disconnect(ConnectionError(f"Inference replica {self.address} failed its health check"))
+        return self.healthy
+    
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._disconnect(ConnectionError("Inference client closed"))
+    
+    def get_stats(self) -> Dict:
+        return {
+            "address": self.address,
+            "healthy": self.healthy,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": round(self.latency_ms, 2),
+            "health": self.health,
+        }
+
+
+class RemoteInferenceClient:
+    """Send frames to inference replicas instead of a local model
+    
+    Drop-in replacement for BatchScheduler on the gateway: handlers still
+    ``await submit(image, face_hint)``. Each frame goes to the healthy
+    replica with the fewest requests in flight (ties go to the lower
+    latency); batching happens on the replicas. A background task pings
+    every replica, takes failing ones out of rotation and reconnects them
+    when they come back. Frames whose replica drops are retried once on
+    another replica.
+    """
+    
+    def __init__(self, addresses: Optional[List[str]] = None):
+        if addresses is None:
+            addresses = [a for a in settings.INFERENCE_REPLICAS.split(",") if a.strip()]
+        if not addresses:
+            raise ValueError("INFERENCE_MODE=remote needs at least one INFERENCE_REPLICAS address")
+        
+        self.replicas = [InferenceReplica(address.strip()) for address in addresses]
+        self._health_task: Optional[asyncio.Task] = None
+        
+        # Statistics
+        self.total_frames = 0
+        self.total_detections = 0
+        self.retries = 0
+        self.unavailable = 0
+    
+    async def start(self):
+        """Connect to the replicas and start health checks"""
+        await asyncio.gather(*(replica.check_health() for replica in self.replicas))
+        self._health_task = asyncio.create_task(self._check_health_loop())
+        
+        healthy = sum(replica.healthy for replica in self.replicas)
+        print(f"🛰️  Remote inference: {healthy}/{len(self.replicas)} replica(s) healthy")
+    
+    async def stop(self):
+        """Stop health checks and close connections"""
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await asyncio.gather(*(replica.close() for replica in self.replicas))
+    
+    async def _check_health_loop(self):
+        while True:
+            await asyncio.sleep(settings.INFERENCE_HEALTH_INTERVAL_S)
+            await asyncio.gather(*(replica.check_health() for replica in self.replicas))
+    
+    def _pick(self, exclude: Optional[InferenceReplica] = None) -> Optional[InferenceReplica]:
+        """Least loaded healthy replica"""
+        candidates = [
+            replica for replica in self.replicas
+            if replica.healthy and replica.connected and replica is not exclude
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda replica: (replica.inflight, replica.latency_ms))
+    
+    async def submit(self, image: np.ndarray, face_hint: Optional[Dict] = None) -> Dict:
+        """Detect the mood in one frame on a replica"""
+        self.total_frames += 1
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        header = {"op": "detect", "shape": list(image.shape), "face_hint": face_hint}
+        
+        replica = self._pick()
+        for attempt in range(2):
+            if replica is None:
+                self.unavailable += 1
+                return {"success": False, "error": "No inference replica available"}
+            
+            started = time.perf_counter()
+            replica.requests += 1
+            try:
+                result = await replica.call(header, memoryview(image).cast("B"))
+            except ConnectionError as e:
+                # The replica went away mid-request: try another one
+                replica.failures += 1
+                if attempt == 0:
+                    self.retries += 1
+                    replica = self._pick(exclude=replica)
+                    continue
+                return {"success": False, "error": str(e)}
+            except (asyncio.TimeoutError, RuntimeError) as e:
+                replica.failures += 1
+                return {"success": False, "error": str(e) or "Inference request timed out"}
+            
+            elapsed = (time.perf_counter() - started) * 1000
+            replica.latency_ms = elapsed if not replica.latency_ms else 0.8 * replica.latency_ms + 0.2 * elapsed
+            if result.get("success"):
+                self.total_detections += 1
+            return result
+    
+    def get_stats(self) -> Dict:
+        """Per-replica load and health"""
+        return {
+            "mode": "remote",
+            "total_frames": self.total_frames,
+            "total_detections": self.total_detections,
+            "retries": self.retries,
+            "unavailable": self.unavailable,
+            "healthy_replicas": sum(replica.healthy for replica in self.replicas),
+            "replicas": [replica.get_stats() for replica in self.replicas],
+        }
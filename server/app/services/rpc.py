@@ -0,0 +1,71 @@
+"""Length-prefixed RPC framing between gateways and inference servers
+
+Every message is::
+
+    uint32 header length | uint32 payload length | JSON header | payload
+
+The header carries the request id, operation and small arguments; the
+payload carries raw frame pixels (``shape`` in the header), so frames cross
+the socket without any encoding step. Requests are multiplexed over one
+connection and answered by id, in whatever order they finish.
+"""
+import asyncio
+import json
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+PREFIX = struct.Struct("<II")
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 64 << 20
+
+
+def _json_default(value):
+    """Make numpy scalars and arrays in results JSON serializable"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_message(header: Dict, payload=b"") -> bytes:
+    """Prefix and header for one message (the payload is written separately)"""
+    header_bytes = json.dumps(header, separators=(",", ":"), default=_json_default).encode("utf-8")
+    return PREFIX.pack(len(header_bytes), len(payload)) + header_bytes
+
+
+def write_message(writer: asyncio.StreamWriter, header: Dict, payload=b""):
+    """Queue one message on a stream (call ``drain`` to apply backpressure)"""
+    writer.write(encode_message(header, payload))
+    if len(payload):
+        writer.write(payload)
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[Dict, bytes]:
+    """Read one message; raises IncompleteReadError when the peer hangs up"""
+    header_len, payload_len = PREFIX.unpack(await reader.readexactly(PREFIX.size))
+    if header_len > MAX_HEADER_BYTES or payload_len > MAX_PAYLOAD_BYTES:
+        raise ConnectionError(f"Oversized RPC message ({header_len}+{payload_len} bytes)")
+    
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def parse_address(address: str) -> Tuple[str, ...]:
+    """``unix:/path/to.sock`` or ``host:port``"""
+    address = address.strip()
+    if address.startswith("unix:"):
+        return ("unix", address[len("unix:"):])
+    host, _, port = address.rpartition(":")
+    return ("tcp", host or "127.0.0.1", int(port))
+
+
+async def open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Connect to an inference server"""
+    kind, *target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target[0])
+    return await asyncio.open_connection(target[0], target[1])
@@ -0,0 +1,61 @@
+"""Shared-memory frame ring buffers for process inference workers"""
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """Fixed number of fixed-size frame slots in one shared memory block
+
+    The FastAPI process copies decoded frames into slots; worker processes
+    attach to the same block by name and read them as zero-copy numpy views.
+    Slots are handed out round-robin, so with at most ``slots`` frames in
+    flight a slot is never overwritten while a worker is reading it.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            # The creating process owns cleanup; don't let the tracker unlink it
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+
+        self.name = self.shm.name
+        self._next_slot = 0
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_bytes: int) -> "SharedFrameRing":
+        """Attach to a ring created by another process"""
+        return cls(slots, slot_bytes, name=name)
+
+    def fits(self, image: np.ndarray) -> bool:
+        """Check whether a frame fits into one slot"""
+        return image.dtype == np.uint8 and image.nbytes <= self.slot_bytes
+
+    def write(self, image: np.ndarray) -> Tuple[int, Tuple[int, ...]]:
+        """Copy a frame into the next slot and return (slot, shape)"""
+        slot = self._next_slot
+        self._next_slot = (self._next_slot + 1) % self.slots
+
+        self.view(slot, image.shape)[...] = image
+        return slot, image.shape
+
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """Zero-copy view of a frame stored in a slot"""
+        return np.ndarray(
+            shape,
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=slot * self.slot_bytes
+        )
+
+    def close(self):
+        """Detach from the block (and free it if this process created it)"""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
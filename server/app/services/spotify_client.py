@@ -0,0 +1,212 @@
+"""Async, pooled and cached Spotify track lookups"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+from app.services.event_log import log_event
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after ``ttl`` seconds"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(found, value); expired entries count as missing"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+    
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``burst``"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so tokens are handed out in order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncSpotifyClient:
+    """Search Spotify without ever blocking the event loop
+    
+    - one pooled httpx.AsyncClient with keep-alive connections and hard
+      timeouts
+    - client-credentials token cached until shortly before it expires
+    - TTL + LRU cache of results keyed on (mood, query); misses are cached
+      too, so a query with no match isn't retried on every detection
+    - concurrent lookups of the same key share one upstream request
+    - a token bucket keeps the upstream request rate under the API limit
+    """
+    
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        api_url: Optional[str] = None,
+        auth_url: Optional[str] = None
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("httpx not installed. Run: uv add httpx")
+        
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = (api_url or settings.SPOTIFY_API_URL).rstrip("/")
+        self.auth_url = auth_url or settings.SPOTIFY_AUTH_URL
+        
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.SPOTIFY_TIMEOUT_S),
+            limits=httpx.Limits(
+                max_connections=settings.SPOTIFY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SPOTIFY_MAX_CONNECTIONS
+            )
+        )
+        self._cache = TTLCache(settings.SPOTIFY_CACHE_SIZE, settings.SPOTIFY_CACHE_TTL_S)
+        self._bucket = TokenBucket(settings.SPOTIFY_RATE_LIMIT, settings.SPOTIFY_BURST)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+        
+        # Statistics
+        self.upstream_requests = 0
+        self.coalesced = 0
+        self.errors = 0
+    
+    async def _access_token(self) -> str:
+        """Client-credentials token, refreshed by one caller at a time"""
+        async with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires:
+                return self._token
+            
+            response = await self._http.post(
+                self.auth_url,
+                data={"grant_type": "client_credentials"},
+                auth=(self.client_id, self.client_secret)
+            )
+            response.raise_for_status()
+            payload = response.json()
+            self._token = payload["access_token"]
+            # Refresh a minute early
+            self._token_expires = time.monotonic() + payload.get("expires_in", 3600) - 60
+            return self._token
+    
+    async def _search(self, query: str, mood: str) -> Optional[Dict]:
+        """One upstream search request"""
+        await self._bucket.acquire()
+        self.upstream_requests += 1
+        
+        token = await self._access_token()
+        response = await self._http.get(
+            f"{self.api_url}/search",
+            params={"q": query, "type": "track", "limit": 1},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 401:
+            # Token revoked or expired early; fetch a new one next time
+            self._token = None
+        response.raise_for_status()
+        
+        tracks = response.json()["tracks"]["items"]
+        if not tracks:
+            return None
+        
+        track = tracks[0]
+        return {
+            "title": track['name'],
+            "artist": track['artists'][0]['name'],
+            "url": track['external_urls']['spotify'],
+            "uri": track['uri'],
+            "mood": mood
+        }
+    
+    async def search_track(self, query: str, mood: str) -> Optional[Dict]:
+        """Best matching track for a query, or None (also on errors)"""
+        key = (mood, query)
+        found, result = self._cache.get(key)
+        if found:
+            return result
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._search(query, mood)
+            self._cache.put(key, result)
+        except asyncio.CancelledError:
+            # Don't leave coalesced waiters hanging
+            future.set_result(None)
+            raise
+        except Exception as e:
+            # Errors aren't cached; the next detection tries again
+            self.errors += 1
+            log_event("spotify_search_error", logging.WARNING, query=query, error=str(e))
+            result = None
+        finally:
+            del self._inflight[key]
+        
+        future.set_result(result)
+        return result
+    
+    def get_stats(self) -> Dict:
+        """Cache and upstream statistics"""
+        return {
+            "cache_size": len(self._cache),
+            "cache_hits": self._cache.hits,
+            "cache_misses": self._cache.misses,
+            "coalesced": self.coalesced,
+            "upstream_requests": self.upstream_requests,
+            "errors": self.errors,
+        }
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self._http.aclose()
@@ -1,17 +1,16 @@
 """WebSocket handlers for real-time frame processing"""
 import json
 import asyncio
+import logging
 import time
-from datetime import datetime
+import uuid
 from typing import Dict
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request
-from PIL import Image
-import io
-import numpy as np
-
+from app.config import settings
+from app.services.event_log import log_event
 from app.services.frame_processor import FrameProcessor
-from app.services.music_service import MusicService
+from app.services.metrics import ERRORS, STAGE_SECONDS
 
 router = APIRouter()
 
@@ -22,6 +21,8 @@ class ConnectionManager:
         self.active_connections: Dict[str, WebSocket] = {}
         self.frame_processors: Dict[str, FrameProcessor] = {}
         self.last_detection_time: Dict[str, float] = {}
+        # Counters of clients that already disconnected
+        self.closed_counters: Dict[str, int] = {}
     
     async def connect(self, websocket: WebSocket, client_id: str):
         """Connect a new client"""
@@ -36,11 +37,29 @@ class ConnectionManager:
         if client_id in self.active_connections:
             del self.active_connections[client_id]
         if client_id in self.frame_processors:
+            for name, value in self.frame_processors[client_id].get_counters().items():
+                self.closed_counters[name] = self.closed_counters.get(name, 0) + value
             del self.frame_processors[client_id]
         if client_id in self.last_detection_time:
             del self.last_detection_time[client_id]
         print(f"❌ Client {client_id} disconnected. Total: {len(self.active_connections)}")
     
+    def get_stats(self) -> Dict:
+        """Get frame statistics across all clients since startup"""
+        counters = dict(self.closed_counters)
+        for processor in list(self.frame_processors.values()):
+            for name, value in processor.get_counters().items():
+                counters[name] = counters.get(name, 0) + value
+        
+        detected = counters.get("frames_detected", 0)
+        return {
+            "active_connections": len(self.active_connections),
+            **counters,
+            "skip_rate": (
+                counters.get("frames_skipped_unchanged", 0) / detected if detected else 0.0
+            ),
+        }
+    
     async def send_message(self, client_id: str, message: dict):
         """Send message to specific client"""
         if client_id in self.active_connections:
@@ -48,101 +67,210 @@ class ConnectionManager:
             await websocket.send_json(message)
 
 manager = ConnectionManager()
-music_service = MusicService()
+
+def observe_inference_timings(result: Dict, elapsed: float):
+    """Split a detection round trip into queue, preprocess and inference time"""
+    # Workers report what they spent; the rest was waiting for a batch
+    timings = result.pop("timings", None) or {}
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage)
+    STAGE_SECONDS.observe(max(0.0, elapsed - sum(timings.values())), "queue")
+
+async def run_detection_loop(websocket: WebSocket, client_id: str):
+    """Run detection on the newest frame whenever the client is due for one"""
+    inference_scheduler = websocket.app.state.inference_scheduler
+    music_service = websocket.app.state.music_service
+    mood_history = websocket.app.state.mood_history
+    frame_processor = manager.frame_processors[client_id]
+    protocol = frame_processor.protocol
+    frame_slot = frame_processor.frame_slot
+    interval = settings.DETECTION_INTERVAL / 1000.0
+    
+    while True:
+        await frame_slot.wait()
+        
+        # Throttle; frames arriving meanwhile replace the waiting one
+        time_since_last = time.time() - manager.last_detection_time.get(client_id, 0)
+        if time_since_last < interval:
+            await asyncio.sleep(interval - time_since_last)
+        
+        frame_data, received_at, frame_seq = frame_slot.take()
+        started = time.time()
+        manager.last_detection_time[client_id] = started
+        STAGE_SECONDS.observe(started - received_at, "receive")
+        
+        try:
+            # Only frames picked for detection get decoded
+            with STAGE_SECONDS.time("decode"):
+                img_array = frame_processor.decode_frame(frame_data)
+            
+            face_hint = frame_processor.face_hint(img_array)
+            
+            # Reuse the last result if the frame (or face) barely changed
+            mood_result = frame_processor.change_detector.check(
+                img_array, frame_processor.face_region(face_hint)
+            )
+            
+            if mood_result is None:
+                # Run mood detection (batched with other clients' frames)
+                submitted = time.perf_counter()
+                mood_result = await inference_scheduler.submit(img_array, face_hint)
+                observe_inference_timings(mood_result, time.perf_counter() - submitted)
+                frame_processor.update_face(mood_result, face_hint, img_array)
+                frame_processor.change_detector.update(mood_result)
+            
+            frame_processor.record_detection(time.time() - started)
+            if mood_history and mood_result and mood_result.get("success"):
+                # Raw per-frame result, before smoothing
+                mood_history.record(client_id, mood_result)
+            
+            mood_change = None
+            if mood_result and mood_result.get("success"):
+                if settings.MOOD_SMOOTHING:
+                    # Only a mood that held over several frames counts
+                    mood_change = frame_processor.mood_smoother.update(mood_result)
+                else:
+                    mood_change = {
+                        "mood": mood_result["dominant_emotion"],
+                        "confidence": mood_result["confidence"],
+                        "emotions": mood_result.get("emotions", {})
+                    }
+            
+            if mood_change:
+                mood = mood_change["mood"]
+                confidence = float(mood_change["confidence"])  # Convert to Python float
+                
+                with STAGE_SECONDS.time("music"):
+                    # Recommend from the whole emotion mix, not just the top mood
+                    song = music_service.recommend(
+                        mood_change["emotions"], frame_processor.recent_tracks
+                    )
+                    # Cached, rate-limited Spotify link lookup (no-op if disabled)
+                    song = await music_service.resolve(song)
+                
+                # Convert all emotions to Python floats
+                all_emotions = {
+                    k: float(v) for k, v in mood_change["emotions"].items()
+                }
+                
+                # Send result back to client (in the negotiated encoding)
+                with STAGE_SECONDS.time("send"):
+                    await protocol.send(websocket, protocol.mood_message(
+                        mood, confidence, all_emotions, song, frame_seq,
+                        faces=mood_result.get("faces")
+                    ))
+                
+                log_event(
+                    "mood_detected",
+                    client=client_id,
+                    mood=mood,
+                    confidence=round(confidence, 3),
+                    faces=len(mood_result.get("faces") or ()),
+                    song=f"{song['title']} - {song['artist']}" if song else None
+                )
+            
+            elif protocol.report_all and mood_result and mood_result.get("success"):
+                # Benchmark clients want a result for every detected frame
+                with STAGE_SECONDS.time("send"):
+                    await protocol.send(websocket, protocol.mood_message(
+                        mood_result["dominant_emotion"],
+                        float(mood_result["confidence"]),
+                        {k: float(v) for k, v in mood_result.get("emotions", {}).items()},
+                        None,
+                        frame_seq,
+                        changed=False,
+                        faces=mood_result.get("faces")
+                    ))
+            
+            if settings.ADAPTIVE_RATE:
+                # Ask the client to send about as fast as we can use frames
+                fps = frame_processor.recommended_fps()
+                if frame_processor.rate_hint_due(fps):
+                    frame_processor.last_rate_hint = fps
+                    await protocol.send(websocket, {
+                        "type": "rate_hint",
+                        "fps": fps
+                    })
+        
+        except Exception as e:
+            ERRORS.inc(1, "frame")
+            log_event("frame_error", logging.ERROR, exc_info=True, client=client_id, error=str(e))
+            await protocol.send(websocket, {
+                "type": "error",
+                "message": str(e)
+            })
 
 @router.websocket("/stream")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for receiving video frames"""
-    client_id = str(id(websocket))
+    # Unique per connection: ids name history and archive files, and
+    # id(websocket) comes back once the object is freed
+    client_id = uuid.uuid4().hex[:16]
     
     await manager.connect(websocket, client_id)
+    detection_task = None
+    frame_archiver = websocket.app.state.frame_archiver
+    mood_history = websocket.app.state.mood_history
     
     try:
-        # Send connection confirmation
+        frame_processor = manager.frame_processors[client_id]
+        protocol = frame_processor.protocol
+        
+        # Send connection confirmation; clients may negotiate a compact
+        # result protocol, otherwise everything stays JSON
         await websocket.send_json({
             "type": "connected",
             "client_id": client_id,
-            "message": "WebSocket connection established"
+            "message": "WebSocket connection established",
+            "protocol": protocol.advertise()
         })
         
-        # Get mood detector from app state (via websocket.app)
-        mood_detector = websocket.app.state.mood_detector
-        frame_processor = manager.frame_processors[client_id]
+        detection_task = asyncio.create_task(run_detection_loop(websocket, client_id))
         
         while True:
             # Receive frame data (binary blob)
             data = await websocket.receive()
             
-            if "bytes" in data:
-                frame_data = data["bytes"]
-                current_time = time.time()
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
+            
+            if data.get("bytes") is not None:
+                # Latest frame wins; decoding happens only if it gets picked
+                frame_processor.frame_count += 1
+                frame_processor.frame_slot.put(data["bytes"], frame_processor.frame_count)
+                if frame_archiver:
+                    # Non-blocking enqueue of the bytes exactly as received
+                    frame_archiver.archive(
+                        client_id, data["bytes"], frame_processor.frame_count, time.time()
+                    )
                 
-                # Process frame
-                try:
-                    # Convert bytes to image
-                    image = Image.open(io.BytesIO(frame_data))
-                    img_array = np.array(image)
-                    
-                    # Check if we should run detection (throttle based on interval)
-                    time_since_last = current_time - manager.last_detection_time.get(client_id, 0)
-                    from app.config import settings
-                    
-                    should_detect = time_since_last >= (settings.DETECTION_INTERVAL / 1000.0)
-                    
-                    if should_detect:
-                        # Run mood detection
-                        mood_result = mood_detector.detect_mood(img_array)
-                        manager.last_detection_time[client_id] = current_time
-                        
-                        if mood_result and mood_result.get("success"):
-                            mood = mood_result["dominant_emotion"]
-                            confidence = float(mood_result["confidence"])  # Convert to Python float
-                            
-                            # Get song recommendation
-                            song = music_service.get_song_for_mood(mood)
-                            
-                            # Convert all emotions to Python floats
-                            all_emotions = {
-                                k: float(v) for k, v in mood_result.get("emotions", {}).items()
-                            }
-                            
-                            # Send result back to client
-                            await websocket.send_json({
-                                "type": "mood_detected",
-                                "mood": mood,
-                                "confidence": confidence,
-                                "song": song,
-                                "timestamp": datetime.now().isoformat(),
-                                "all_emotions": all_emotions
-                            })
-                            
-                            print(f"🎭 Detected mood: {mood} ({confidence:.2%}) for client {client_id}")
-                            print(f"🎵 Recommended: {song}")
-                    
-                    # Send frame acknowledgment
-                    await websocket.send_json({
-                        "type": "frame_ack",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                except Exception as e:
-                    print(f"❌ Error processing frame: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": str(e)
-                    })
+                # Per-frame ack, or a cumulative one every few frames
+                ack = protocol.frame_received()
+                if ack:
+                    await protocol.send(websocket, ack)
             
-            elif "text" in data:
+            elif data.get("text") is not None:
                 # Handle text messages (ping/pong, control)
                 try:
                     msg = json.loads(data["text"])
-                    if msg.get("type") == "ping":
-                        await websocket.send_json({"type": "pong"})
                 except json.JSONDecodeError:
-                    pass
+                    continue
+                if not isinstance(msg, dict):
+                    continue
+                if msg.get("type") == "ping":
+                    await protocol.send(websocket, {"type": "pong"})
+                elif msg.get("type") == "negotiate":
+                    await protocol.send(websocket, protocol.negotiate(msg))
     
     except WebSocketDisconnect:
         manager.disconnect(client_id)
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
-        manager.disconnect(client_id)
\ No newline at end of file
+        manager.disconnect(client_id)
+    finally:
+        if detection_task:
+            detection_task.cancel()
+        if frame_archiver:
+            frame_archiver.close_client(client_id)
+        if mood_history:
+            mood_history.close_client(client_id)
@@ -1,5 +1,6 @@
 """FastAPI Mood Tracker Application"""
 import os
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -7,9 +8,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from app.websocket import router as ws_router
-from app.api import router as api_router
+from app.api import router as api_router, metrics_router
 from app.config import settings
 from app.models.mood_detector import MoodDetector
+from app.services.inference_pool import InferencePool
+from app.services.inference_scheduler import BatchScheduler
+from app.services.event_log import setup_logging, shutdown_logging
+from app.services.frame_archive import FrameArchiver
+from app.services.mood_history import MoodHistory
+from app.services.music_service import MusicService
+from app.services.remote_inference import RemoteInferenceClient
 
 # Load environment variables
 load_dotenv()
@@ -18,18 +26,58 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
+    start = time.perf_counter()
     print("🚀 Starting Mood Tracker Backend...")
-    print(f"📊 Loading {settings.MODEL_TYPE} model...")
+    # Per-frame events are logged from a background thread
+    setup_logging()
     
-    # Initialize model on startup
-    app.state.mood_detector = MoodDetector()
+    if settings.INFERENCE_MODE == "remote":
+        # Gateway only: no model here, frames go to inference servers
+        app.state.mood_detector = None
+        app.state.inference_pool = None
+        app.state.inference_scheduler = RemoteInferenceClient()
+    else:
+        print(f"📊 Loading {settings.MODEL_TYPE} model...")
+        
+        # Initialize model on startup (process workers load their own copies)
+        app.state.mood_detector = MoodDetector(
+            load_model=settings.INFERENCE_EXECUTOR == "thread"
+        )
+        
+        # Run inference on a dedicated pool so the event loop keeps serving I/O
+        app.state.inference_pool = InferencePool(app.state.mood_detector)
+        app.state.inference_pool.start()
+        
+        # Batch frames from all clients into shared forward passes
+        app.state.inference_scheduler = BatchScheduler(app.state.inference_pool)
+    await app.state.inference_scheduler.start()
     
-    print("✅ Server ready!")
+    app.state.music_service = MusicService()
+    
+    # Raw frames go to disk from a writer thread, off the stream path
+    app.state.frame_archiver = FrameArchiver() if settings.SAVE_FRAMES else None
+    if app.state.frame_archiver:
+        app.state.frame_archiver.start()
+    
+    # Every client's detections, queryable at raw/second/minute resolution
+    app.state.mood_history = MoodHistory() if settings.HISTORY_ENABLED else None
+    
+    app.state.time_to_ready = time.perf_counter() - start
+    print(f"✅ Server ready in {app.state.time_to_ready:.2f}s!")
     
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    await app.state.inference_scheduler.stop()
+    if app.state.inference_pool:
+        app.state.inference_pool.shutdown()
+    await app.state.music_service.aclose()
+    if app.state.frame_archiver:
+        app.state.frame_archiver.stop()
+    if app.state.mood_history:
+        app.state.mood_history.close()
+    shutdown_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -50,6 +98,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(api_router)
+app.include_router(metrics_router)
 app.include_router(ws_router)
 
 @app.get("/")
@@ -0,0 +1 @@
+"""Developer tools and benchmarks (run from server/ with python -m scripts.<name>)"""
@@ -0,0 +1,401 @@
+"""Score recorded sessions offline: video files and image folders in bulk
+
+Usage:
+    python -m scripts.analyze INPUT [INPUT ...] --output moods.jsonl
+                              [--format jsonl|parquet] [--stride 5 | --sample-fps 2]
+                              [--decoders 4] [--batch 16] [--resume]
+
+INPUT is a video file, an image file or a directory; directories are
+searched recursively, each video in them is one source and the images of
+each folder (in name order) another. Every ``--stride``-th frame (or
+``--sample-fps`` frames per second of video) is scored with the model
+selected by MODEL_TYPE, exactly as the server would score it.
+
+Sources are cut into units of a few hundred sampled frames. A pool of
+``--decoders`` processes decodes units in parallel (videos seek to the
+unit's first frame, so one long video keeps every decoder busy) while
+this process runs batched inference; at most two units per decoder are
+in flight, so memory stays flat however long the input is.
+
+Output rows: source, frame, time_s, success, mood, confidence, emotions
+(percent, in ``labels`` order) and faces. JSONL is appended to one file;
+Parquet (needs pyarrow) is written as part files in the ``--output``
+directory. Progress is checkpointed to ``<output>.checkpoint.json``
+whenever output is durable; ``--resume`` skips the units done and drops
+any rows written after the last checkpoint.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.frame_processor import decode_size
+
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# (source, kind, first, stop): frames first..stop-1 of a video, or
+# entries first..stop-1 of an image folder's sorted file list
+Unit = Tuple[str, str, int, int]
+# A unit, its stride and, for image folders, the unit's files
+Work = Tuple[Unit, int, Optional[List[str]]]
+
+
+def find_sources(inputs: List[str]) -> List[Tuple[str, str]]:
+    """(path, "video" | "images") for every input, directories expanded"""
+    sources = []
+    for name in inputs:
+        path = Path(name)
+        if path.is_file():
+            kind = "video" if path.suffix.lower() in VIDEO_SUFFIXES else "images"
+            sources.append((str(path), kind))
+            continue
+        
+        folders = set()
+        for file in sorted(path.rglob("*")):
+            suffix = file.suffix.lower()
+            if suffix in VIDEO_SUFFIXES:
+                sources.append((str(file), "video"))
+            elif suffix in IMAGE_SUFFIXES:
+                folders.add(file.parent)
+        sources.extend((str(folder), "images") for folder in sorted(folders))
+    return sources
+
+
+def list_images(source: str) -> List[str]:
+    """Image files of an image source, in name order"""
+    path = Path(source)
+    if path.is_file():
+        return [str(path)]
+    return sorted(
+        str(file) for file in path.iterdir() if file.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def video_info(source: str) -> Tuple[int, float]:
+    """Frame count (0 if the container doesn't say) and frame rate"""
+    import cv2
+    
+    capture = cv2.VideoCapture(source)
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), capture.get(cv2.CAP_PROP_FPS) or 0.0
+    finally:
+        capture.release()
+
+
+def plan_units(sources: List[Tuple[str, str]], stride: int, sample_fps: float, unit_frames: int) -> Iterator[Work]:
+    """Cut every source into units of about ``unit_frames`` sampled frames
+    
+    With ``sample_fps`` the stride follows each video's frame rate.
+    """
+    for source, kind in sources:
+        if kind == "video":
+            count, fps = video_info(source)
+            source_stride = max(1, round(fps / sample_fps)) if sample_fps and fps else stride
+            span = unit_frames * source_stride
+            if count <= 0:
+                # Unknown length: decode it in one piece
+                yield (source, kind, 0, sys.maxsize), source_stride, None
+                continue
+            for first in range(0, count, span):
+                yield (source, kind, first, min(first + span, count)), source_stride, None
+        else:
+            images = list_images(source)
+            span = unit_frames * stride
+            for first in range(0, len(images), span):
+                stop = min(first + span, len(images))
+                yield (source, kind, first, stop), stride, images[first:stop:stride]
+
+
+def _resize(image: np.ndarray, size: int) -> np.ndarray:
+    """Shrink so the smaller side is ``size`` (0 keeps full resolution)"""
+    import cv2
+    
+    height, width = image.shape[:2]
+    scale = size / min(height, width) if size > 0 else 1.0
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (round(width * scale), round(height * scale)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def decode_unit(unit: Unit, stride: int, paths: Optional[List[str]], size: int) -> List[Tuple[int, Optional[float], np.ndarray]]:
+    """Decode the sampled frames of one unit (runs in a decoder process)
+    
+    Returns (frame, time_s, RGB image) per sampled frame.
+    """
+    import cv2
+    from PIL import Image
+    
+    source, kind, first, stop = unit
+    frames = []
+    
+    if kind == "images":
+        for index, path in enumerate(paths):
+            image = Image.open(path)
+            if size > 0 and image.format == "JPEG":
+                # Decode at reduced size in the DCT domain, as the server does
+                image.draft("RGB", (size, size))
+            frames.append((first + index * stride, None, _resize(np.asarray(image.convert("RGB")), size)))
+        return frames
+    
+    capture = cv2.VideoCapture(source)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if first:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for frame in range(first, stop):
+            # Skipped frames are only grabbed, not converted
+            if not capture.grab():
+                break
+            if (frame - first) % stride:
+                continue
+            ok, image = capture.retrieve()
+            if not ok:
+                break
+            image = cv2.cvtColor(_resize(image, size), cv2.COLOR_BGR2RGB)
+            frames.append((frame, frame / fps if fps else None, image))
+    finally:
+        capture.release()
+    return frames
+
+
+def decoded_units(units: Iterator[Work], decoders: int, size: int) -> Iterator[Tuple[Unit, List]]:
+    """Decode units in a process pool, in order, with bounded read-ahead"""
+    if decoders <= 1:
+        for unit, stride, paths in units:
+            yield unit, decode_unit(unit, stride, paths, size)
+        return
+    
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(decoders) as pool:
+        inflight = deque()
+        for unit, stride, paths in units:
+            inflight.append((unit, pool.apply_async(decode_unit, (unit, stride, paths, size))))
+            if len(inflight) >= 2 * decoders:
+                unit, pending = inflight.popleft()
+                yield unit, pending.get()
+        while inflight:
+            unit, pending = inflight.popleft()
+            yield unit, pending.get()
+
+
+def unit_key(unit: Unit) -> str:
+    source, _, first, _ = unit
+    return f"{source}#{first}"
+
+
+def to_row(source: str, frame: int, time_s: Optional[float], result: Dict, labels: List[str]) -> Dict:
+    """One output row from a detection result"""
+    success = bool(result and result.get("success"))
+    emotions = result.get("emotions", {}) if success else {}
+    return {
+        "source": source,
+        "frame": frame,
+        "time_s": round(time_s, 3) if time_s is not None else None,
+        "success": success,
+        "mood": result.get("dominant_emotion") if success else None,
+        "confidence": float(result["confidence"]) if success else None,
+        "emotions": [float(emotions.get(label, 0.0)) for label in labels] if success else None,
+        "faces": len(result.get("faces") or ()) if success else 0,
+    }
+
+
+class JsonlOutput:
+    """Append rows to one JSONL file; every commit is durable"""
+    
+    def __init__(self, path: Path, offset: Optional[int] = None):
+        self.path = path
+        self.file = open(path, "ab")
+        if offset is not None:
+            # Drop rows written after the last checkpoint
+            self.file.truncate(offset)
+            self.file.seek(offset)
+    
+    def write(self, rows: List[Dict]):
+        self.file.write("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+    
+    def commit(self, final: bool = False) -> Optional[Dict]:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell()}
+    
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    """Write rows as numbered part files; a commit is durable once a part is written"""
+    
+    def __init__(self, directory: Path, parts: Optional[int] = None, rows_per_part: int = 100_000):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.parts = parts or 0
+        self.rows_per_part = rows_per_part
+        self.rows: List[Dict] = []
+        for stale in self.directory.glob("part-*.parquet"):
+            # Written after the last checkpoint
+            if int(stale.stem.split("-")[1]) >= self.parts:
+                stale.unlink()
+    
+    def write(self, rows: List[Dict]):
+        self.rows.extend(rows)
+    
+    def commit(self, final: bool = False) -> Optional[Dict]:
+        if len(self.rows) < self.rows_per_part and not (final and self.rows):
+            return None if self.rows else {"parts": self.parts}
+        
+        table = pyarrow.Table.from_pylist(self.rows)
+        path = self.directory / f"part-{self.parts:05d}.parquet"
+        pyarrow.parquet.write_table(table, path)
+        self.parts += 1
+        self.rows = []
+        return {"parts": self.parts}
+    
+    def close(self):
+        pass
+
+
+def load_checkpoint(path: Path) -> Dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {}
+
+
+def save_checkpoint(path: Path, checkpoint: Dict):
+    # Write-then-rename so a crash never leaves a torn checkpoint
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(checkpoint))
+    os.replace(temporary, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="video files, image files or directories")
+    parser.add_argument("--output", required=True, type=Path,
+                        help="JSONL file, or directory of part files for Parquet")
+    parser.add_argument("--format", default="jsonl", choices=("jsonl", "parquet"))
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument("--stride", type=int, default=1, help="score every Nth frame")
+    sampling.add_argument("--sample-fps", type=float, default=0,
+                          help="score this many frames per second of video")
+    parser.add_argument("--decoders", type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                        help="decoder processes (1 = decode in this process)")
+    parser.add_argument("--batch", type=int, default=settings.BATCH_MAX_SIZE)
+    parser.add_argument("--unit-frames", type=int, default=256,
+                        help="sampled frames per unit of work and checkpoint")
+    parser.add_argument("--decode-size", type=int, default=decode_size(),
+                        help="smallest side frames are decoded at (0 = full resolution)")
+    parser.add_argument("--rows-per-part", type=int, default=100_000, help="Parquet rows per part file")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    args = parser.parse_args()
+    
+    if args.format == "parquet" and pyarrow is None:
+        print("❌ Parquet output needs pyarrow. Run: uv sync --extra parquet")
+        return 1
+    
+    checkpoint_path = Path(f"{args.output}.checkpoint.json")
+    options = {
+        "inputs": args.inputs,
+        "format": args.format,
+        "stride": args.stride,
+        "sample_fps": args.sample_fps,
+        "unit_frames": args.unit_frames,
+        "model_type": settings.MODEL_TYPE,
+    }
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else {}
+    if checkpoint and checkpoint.get("options") != options:
+        print(f"❌ {checkpoint_path} was written with different options: {checkpoint.get('options')}")
+        return 1
+    if not args.resume and (args.output.exists() or checkpoint_path.exists()):
+        print(f"❌ {args.output} exists; pass --resume to continue it or remove it")
+        return 1
+    done = set(checkpoint.get("done", []))
+    
+    sources = find_sources(args.inputs)
+    if not sources:
+        print("❌ No videos or images found")
+        return 1
+    print(f"🎞️  {len(sources)} source(s), {len(done)} unit(s) already done")
+    
+    from app.models.mood_detector import MoodDetector
+    detector = MoodDetector()
+    labels = detector.emotion_labels
+    
+    state = checkpoint.get("output", {})
+    if args.format == "parquet":
+        output = ParquetOutput(args.output, state.get("parts"), args.rows_per_part)
+    else:
+        output = JsonlOutput(args.output, state.get("offset"))
+    
+    units = (
+        work
+        for work in plan_units(sources, args.stride, args.sample_fps, args.unit_frames)
+        if unit_key(work[0]) not in done
+    )
+    
+    start = time.perf_counter()
+    frames_scored = 0
+    uncommitted: List[str] = []
+    last_report = start
+    try:
+        for unit, frames in decoded_units(units, args.decoders, args.decode_size):
+            rows = []
+            for offset in range(0, len(frames), args.batch):
+                batch = frames[offset:offset + args.batch]
+                results = detector.detect_mood_batch([image for _, _, image in batch])
+                rows.extend(
+                    to_row(unit[0], frame, time_s, result, labels)
+                    for (frame, time_s, _), result in zip(batch, results)
+                )
+            output.write(rows)
+            frames_scored += len(rows)
+            uncommitted.append(unit_key(unit))
+            
+            state = output.commit()
+            if state is not None:
+                done.update(uncommitted)
+                uncommitted = []
+                save_checkpoint(checkpoint_path, {
+                    "options": options, "done": sorted(done), "output": state
+                })
+            
+            now = time.perf_counter()
+            if now - last_report >= 10:
+                last_report = now
+                print(f"⏱️  {frames_scored} frames, {frames_scored / (now - start):.1f} frames/s "
+                      f"({Path(unit[0]).name} @ {unit[2]})")
+        
+        state = output.commit(final=True)
+        done.update(uncommitted)
+        save_checkpoint(checkpoint_path, {"options": options, "done": sorted(done), "output": state})
+    
+    except KeyboardInterrupt:
+        print("⏸️  Interrupted; rerun with --resume to continue")
+        return 130
+    
+    finally:
+        output.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {frames_scored} frames in {elapsed:.1f}s "
+          f"({frames_scored / elapsed if elapsed else 0:.1f} frames/s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
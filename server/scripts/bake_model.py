@@ -0,0 +1,63 @@
+"""Bake best_model.pth into a single self-contained model artifact
+
+Usage:
+    python -m scripts.bake_model [--output best_model.safetensors]
+
+Loads the model the slow way once (HuggingFace base model + fine-tuned
+checkpoint + image processor) and writes weights, config and preprocessing
+constants to one memory-mappable safetensors file. With BAKED_MODEL_PATH
+pointing at it, the server starts without from_pretrained or network access.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from app.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.BAKED_MODEL_PATH,
+                        help="artifact to write (default: BAKED_MODEL_PATH)")
+    args = parser.parse_args()
+    
+    import torch
+    from app.models.baked import bake_model, load_baked_model
+    from app.models.mood_detector import MoodDetector
+    
+    detector = MoodDetector(load_model=False)
+    try:
+        model, processor = detector._load_pretrained_model()
+    except Exception as e:
+        print(f"❌ Failed to load model: {e}")
+        return 1
+    
+    output = Path(args.output)
+    bake_model(model.eval(), processor, output, source="best_model.pth")
+    size_mb = output.stat().st_size / 1e6
+    print(f"📦 Wrote {output} ({size_mb:.1f} MB)")
+    
+    # Round trip: the baked model must reproduce the original logits
+    start = time.perf_counter()
+    baked, _ = load_baked_model(output)
+    load_ms = (time.perf_counter() - start) * 1000
+    
+    example = torch.randn(2, 3, processor.size["height"], processor.size["width"])
+    with torch.inference_mode():
+        expected = model(pixel_values=example).logits
+        actual = baked.eval()(pixel_values=example).logits
+    max_diff = float((expected - actual).abs().max())
+    
+    print(f"⏱️  Baked model loads in {load_ms:.0f} ms")
+    print(f"🔬 Max logit difference: {max_diff:.2e}")
+    if max_diff > 1e-5:
+        print("❌ Baked model does not match the checkpoint")
+        return 1
+    
+    print("✅ Baked model verified")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Benchmark MusicIndex queries on a large synthetic catalog
+
+Usage:
+    python -m scripts.bench_music_index [--tracks 500000] [--queries 5000] [--k 5]
+
+Times indexed queries against a brute-force scan of the whole catalog and
+reports how often both agree on the best track.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.services.music_index import MOOD_LABELS, NUM_MOODS, MusicIndex
+
+TARGET_MS = 1.0
+
+
+def synthetic_catalog(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Tracks with a few dominant moods and mood-correlated valence/energy"""
+    affinities = rng.dirichlet(np.full(NUM_MOODS, 0.3), size=count).astype(np.float32)
+    profiles = np.array([[0.2, 0.9], [0.25, 0.55], [0.2, 0.6], [0.9, 0.8],
+                         [0.15, 0.25], [0.7, 0.85], [0.5, 0.4]], dtype=np.float32)
+    valence_energy = affinities @ profiles + rng.normal(0, 0.1, size=(count, 2))
+    return np.hstack([affinities, np.clip(valence_energy, 0, 1)]).astype(np.float32)
+
+
+def random_emotions(rng: np.random.Generator) -> dict:
+    """Detector-like distribution in percent, peaked on one emotion"""
+    probs = rng.dirichlet(np.full(NUM_MOODS, 0.5)) * 100
+    return dict(zip(MOOD_LABELS, probs.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--exclude", type=int, default=20,
+                        help="recently played tracks excluded per query")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    features = synthetic_catalog(args.tracks, rng)
+    names = [f"track {i}" for i in range(args.tracks)]
+    
+    start = time.perf_counter()
+    index = MusicIndex.build(features, names, names, names)
+    print(f"🏗️  Indexed {len(index)} tracks in {time.perf_counter() - start:.2f}s")
+    
+    queries = [random_emotions(rng) for _ in range(args.queries)]
+    recent = [rng.integers(0, args.tracks, size=args.exclude).tolist() for _ in queries]
+    
+    # Warm-up
+    for emotions in queries[:100]:
+        index.query(emotions, args.k)
+    
+    timings = np.empty(len(queries))
+    indexed_best = []
+    for i, (emotions, exclude) in enumerate(zip(queries, recent)):
+        start = time.perf_counter()
+        rows = index.query(emotions, args.k, exclude)
+        timings[i] = (time.perf_counter() - start) * 1000
+        indexed_best.append(rows[0])
+    
+    # Brute force: score every row
+    brute_timings = np.empty(min(len(queries), 500))
+    agree = 0
+    for i in range(len(brute_timings)):
+        start = time.perf_counter()
+        mix, target = index._mix_and_target(queries[i])
+        scores = index.matrix @ index.query_vector(mix, target)
+        scores[recent[i]] = -np.inf
+        best = int(np.argmax(scores))
+        brute_timings[i] = (time.perf_counter() - start) * 1000
+        agree += scores[indexed_best[i]] >= scores[best] - 1e-6
+    
+    p50, p99 = np.percentile(timings, [50, 99])
+    print(f"⏱️  Indexed query:  mean {timings.mean():.3f} ms, p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    print(f"⏱️  Full scan:      mean {brute_timings.mean():.3f} ms")
+    print(f"🎯 Same best track as full scan: {agree / len(brute_timings):.1%}")
+    
+    if timings.mean() > TARGET_MS:
+        print(f"❌ Mean query time above {TARGET_MS} ms")
+        return 1
+    
+    print(f"✅ Mean query time below {TARGET_MS} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
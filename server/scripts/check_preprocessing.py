@@ -0,0 +1,147 @@
+"""Compare BatchPreprocessor against ViTImageProcessor and time both
+
+Usage:
+    python -m scripts.check_preprocessing [--images DIR] [--frames 32] [--batch 16]
+
+Without --images, synthetic textured frames at 640x480 and 1280x720 are
+used. Every set is compared with CLAHE and sharpening off, and with each of
+them on against MoodDetector's full-resolution enhancement followed by the
+processor, the path BatchPreprocessor replaces.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.models.preprocessing import BatchPreprocessor
+
+# Normalized units; one uint8 level is 2/255 ~= 0.008 with mean/std of 0.5
+MEAN_ABS_TOLERANCE = 0.02
+
+SYNTHETIC_SIZES = [(640, 480), (1280, 720)]
+
+# (use_clahe, use_sharpening)
+ENHANCEMENTS = [(False, False), (True, False), (False, True), (True, True)]
+
+
+def load_processor():
+    """Load the processor the detector uses, or its defaults when offline"""
+    from transformers import ViTImageProcessor
+    try:
+        return ViTImageProcessor.from_pretrained('google/vit-base-patch16-224')
+    except Exception as e:
+        print(f"⚠️ Could not load pretrained processor ({e}); using defaults")
+        return ViTImageProcessor()
+
+
+def synthetic_frame(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    """A smooth color field plus fine gratings and sensor noise
+    
+    The gratings (2.5-8 px periods) stand in for hair, fabric and edges:
+    content that aliases when a large frame is shrunk without filtering.
+    """
+    small = rng.integers(0, 256, size=(12, 20, 3), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(small).resize((width, height), Image.BICUBIC))
+    
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    texture = np.zeros((height, width), dtype=np.float32)
+    for angle, period in zip(rng.uniform(0, np.pi, 4), rng.uniform(2.5, 8.0, 4)):
+        texture += 25 * np.sin(2 * np.pi * (x * np.cos(angle) + y * np.sin(angle)) / period)
+    
+    frame = base * 0.7 + texture[..., None] + rng.normal(0, 8, (height, width, 3)) + 30
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def load_frame_sets(images_dir: str, count: int) -> Dict[str, List[np.ndarray]]:
+    """Load RGB frames from a directory, or synthesize a set per frame size"""
+    if images_dir:
+        paths = sorted(
+            p for p in Path(images_dir).iterdir()
+            if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+        )[:count]
+        return {images_dir: [np.asarray(Image.open(p).convert("RGB")) for p in paths]}
+    
+    rng = np.random.default_rng(0)
+    return {
+        f"{width}x{height}": [synthetic_frame(rng, width, height) for _ in range(count)]
+        for width, height in SYNTHETIC_SIZES
+    }
+
+
+def time_per_frame(fn, frames: List[np.ndarray], batch: int, repeats: int = 3) -> float:
+    """Best-of-N milliseconds per frame"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch):
+            fn(frames[i:i + batch])
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", default="", help="directory of test images")
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+    
+    from app.models.mood_detector import MoodDetector
+    
+    processor = load_processor()
+    frame_sets = load_frame_sets(args.images, args.frames)
+    if not any(frame_sets.values()):
+        print("❌ No frames to compare")
+        return 1
+    
+    # Only the enhancement helpers are needed, not a model
+    settings.MODEL_TYPE = "mock"
+    detector = MoodDetector(load_model=False)
+    
+    failed = []
+    for name, frames in frame_sets.items():
+        print(f"🔬 {name}: {len(frames)} frames")
+        for use_clahe, use_sharpening in ENHANCEMENTS:
+            detector.use_clahe, detector.use_sharpening = use_clahe, use_sharpening
+            preprocessor = BatchPreprocessor.from_processor(
+                processor, use_clahe=use_clahe, use_sharpening=use_sharpening
+            )
+            
+            def reference(batch):
+                pil_images = [Image.fromarray(detector._enhance_image(frame)) for frame in batch]
+                return processor(images=pil_images, return_tensors="np")["pixel_values"]
+            
+            # Numerical equivalence
+            expected = reference(frames)
+            actual = np.concatenate([
+                preprocessor(frames[i:i + args.batch]).copy()
+                for i in range(0, len(frames), args.batch)
+            ])
+            diff = np.abs(expected - actual)
+            
+            # Speed
+            ref_ms = time_per_frame(reference, frames, args.batch)
+            fast_ms = time_per_frame(preprocessor, frames, args.batch)
+            
+            label = f"clahe={'on' if use_clahe else 'off'} sharpen={'on' if use_sharpening else 'off'}"
+            ok = diff.mean() <= MEAN_ABS_TOLERANCE
+            print(f"   {'✅' if ok else '❌'} {label:<22} mean {diff.mean():.4f}  max {diff.max():.4f}  "
+                  f"{ref_ms:7.3f} -> {fast_ms:6.3f} ms/frame ({ref_ms / fast_ms:.1f}x faster)")
+            if not ok:
+                failed.append(f"{name} {label}")
+    
+    if failed:
+        print(f"❌ Outputs differ more than {MEAN_ABS_TOLERANCE} on average: {', '.join(failed)}")
+        return 1
+    
+    print(f"✅ Outputs match within tolerance ({MEAN_ABS_TOLERANCE})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
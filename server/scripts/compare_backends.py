@@ -0,0 +1,138 @@
+"""Compare the custom ViT's inference backends against fp32
+
+Usage:
+    python -m scripts.compare_backends --images DIR [--backends int8,onnx] [--batch 16] [--json out.json]
+
+DIR either holds one subfolder per emotion label (angry/, happy/, ...), in
+which case accuracy is reported too, or just images, in which case only the
+agreement with fp32 is. Needs best_model.pth in the working directory.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def load_dataset(images_dir: str) -> Tuple[List[np.ndarray], List[Optional[str]]]:
+    """Load RGB images with their label (subfolder name) when there is one"""
+    root = Path(images_dir)
+    images, labels = [], []
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        images.append(np.asarray(Image.open(path).convert("RGB")))
+        labels.append(path.parent.name if path.parent != root else None)
+    return images, labels
+
+
+def run_backend(backend, pixel_batches: List[np.ndarray]) -> Tuple[np.ndarray, float]:
+    """Class probabilities for every image, plus best-of-3 ms per image"""
+    from app.models.mood_detector import MoodDetector
+    
+    # Warm-up (lazy init, allocator growth, compiled graphs)
+    backend(pixel_batches[0])
+    
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        logits = [backend(batch) for batch in pixel_batches]
+        best = min(best, time.perf_counter() - start)
+    
+    probs = MoodDetector._softmax(np.concatenate(logits))
+    count = sum(len(batch) for batch in pixel_batches)
+    return probs, best / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="directory of test images")
+    parser.add_argument("--backends", default="int8,torchscript,compile,onnx",
+                        help="comma-separated backends to compare with fp32")
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--json", default="", help="also write the report here")
+    args = parser.parse_args()
+    
+    import torch
+    from app.models.backends import BACKENDS, build_backend
+    from app.models.mood_detector import MoodDetector
+    
+    images, labels = load_dataset(args.images)
+    if not images:
+        print("❌ No images found")
+        return 1
+    
+    settings.MODEL_TYPE = "custom"
+    detector = MoodDetector()
+    if detector.model is None:
+        print("❌ Could not load the custom model")
+        return 1
+    
+    # fp32 backend -> _LogitsOnly -> ViTForImageClassification
+    vit = detector.model.module.model
+    size = detector.processor.size["height"]
+    label_index = {label: i for i, label in enumerate(detector.emotion_labels)}
+    targets = np.array([label_index.get(label, -1) for label in labels])
+    labelled = targets >= 0
+    
+    # Preprocess once; every backend sees identical inputs
+    pixel_batches = [
+        detector._preprocess_batch(images[i:i + args.batch]).copy()
+        for i in range(0, len(images), args.batch)
+    ]
+    print(f"🔬 {len(images)} images, {int(labelled.sum())} labelled, batch {args.batch}")
+    
+    baseline, baseline_ms = run_backend(detector.model, pixel_batches)
+    baseline_top1 = baseline.argmax(axis=1)
+    
+    def summarize(name, probs, ms):
+        top1 = probs.argmax(axis=1)
+        delta = np.abs(probs - baseline)
+        row = {
+            "backend": name,
+            "ms_per_image": round(ms, 3),
+            "speedup": round(baseline_ms / ms, 2),
+            "top1_agreement": float((top1 == baseline_top1).mean()),
+            "mean_prob_delta": float(delta.mean()),
+            "max_prob_delta": float(delta.max()),
+            "accuracy": float((top1[labelled] == targets[labelled]).mean()) if labelled.any() else None
+        }
+        accuracy = f"{row['accuracy']:.2%}" if row["accuracy"] is not None else "n/a"
+        print(f"   {name:<12} {ms:8.2f} ms/img  {row['speedup']:5.2f}x  "
+              f"agree {row['top1_agreement']:.2%}  acc {accuracy}  "
+              f"Δp mean {row['mean_prob_delta']:.4f} max {row['max_prob_delta']:.4f}")
+        return row
+    
+    report = [summarize("fp32", baseline, baseline_ms)]
+    
+    for kind in filter(None, args.backends.split(",")):
+        if kind not in BACKENDS or kind == "fp32":
+            print(f"⚠️ Skipping unknown backend '{kind}'")
+            continue
+        device = torch.device("cpu") if kind in ("int8", "onnx") else detector.device
+        try:
+            backend = build_backend(vit, kind, device, size=size,
+                                    onnx_path=Path(settings.ONNX_MODEL_PATH),
+                                    num_threads=torch.get_num_threads())
+        except Exception as e:
+            print(f"❌ {kind}: {e}")
+            continue
+        report.append(summarize(kind, *run_backend(backend, pixel_batches)))
+    
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"📝 Report written to {args.json}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Compare the student/ViT cascade against the ViT alone at several thresholds
+
+Usage:
+    python -m scripts.compare_cascade --images DIR [--thresholds 0.5,0.6,0.7,0.8,0.9]
+                                      [--batch 16] [--json out.json]
+
+Every image is cropped to its largest face and classified once by the
+student and once by the ViT. A threshold then decides per crop which of
+the two answers the cascade would return, so the sweep costs no extra
+inference. For each threshold the report has the escalation rate, the
+agreement with ViT-only, the accuracy when DIR has one subfolder per
+emotion label, and the estimated cost: student ms + escalation rate x ViT
+ms per image. Needs best_model.pth and CASCADE_STUDENT_PATH.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+from scripts.compare_backends import load_dataset, run_backend
+from scripts.train_student import face_crop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="directory of test images")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9",
+                        help="comma-separated student confidences to escalate below")
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--json", default="", help="also write the report here")
+    args = parser.parse_args()
+    
+    from app.models.mood_detector import MoodDetector
+    
+    images, labels = load_dataset(args.images)
+    if not images:
+        print("❌ No images found")
+        return 1
+    
+    settings.MODEL_TYPE = "custom"
+    settings.CASCADE = True
+    detector = MoodDetector()
+    if detector.model is None or detector.student is None:
+        print("❌ Could not load the custom model and its student")
+        return 1
+    
+    label_index = {label: i for i, label in enumerate(detector.emotion_labels)}
+    targets = np.array([label_index.get(label, -1) for label in labels])
+    labelled = targets >= 0
+    
+    # Crop and preprocess once; both models see the same faces
+    crops = [face_crop(detector, image) for image in images]
+    chunks = [crops[i:i + args.batch] for i in range(0, len(crops), args.batch)]
+    student_batches = [detector.student_preprocessor(chunk).copy() for chunk in chunks]
+    vit_batches = [detector._preprocess_batch(chunk).copy() for chunk in chunks]
+    print(f"🔬 {len(images)} images, {int(labelled.sum())} labelled, batch {args.batch}")
+    
+    vit, vit_ms = run_backend(detector.model, vit_batches)
+    student, student_ms = run_backend(
+        lambda batch: detector.student(batch) / detector.student_temperature, student_batches
+    )
+    vit_top1 = vit.argmax(axis=1)
+    student_top1 = student.argmax(axis=1)
+    confidence = student.max(axis=1)
+    
+    def summarize(name, top1, escalation_rate, ms):
+        row = {
+            "threshold": name,
+            "escalation_rate": float(escalation_rate),
+            "ms_per_image": round(ms, 3),
+            "speedup": round(vit_ms / ms, 2),
+            "top1_agreement": float((top1 == vit_top1).mean()),
+            "accuracy": float((top1[labelled] == targets[labelled]).mean()) if labelled.any() else None
+        }
+        accuracy = f"{row['accuracy']:.2%}" if row["accuracy"] is not None else "n/a"
+        print(f"   {str(name):<10} escalate {escalation_rate:6.1%}  {ms:8.2f} ms/img  "
+              f"{row['speedup']:5.2f}x  agree {row['top1_agreement']:.2%}  acc {accuracy}")
+        return row
+    
+    report = [
+        summarize("vit", vit_top1, 1.0, vit_ms),
+        summarize("student", student_top1, 0.0, student_ms),
+    ]
+    
+    for value in filter(None, args.thresholds.split(",")):
+        threshold = float(value)
+        escalated = confidence < threshold
+        top1 = np.where(escalated, vit_top1, student_top1)
+        rate = escalated.mean()
+        report.append(summarize(threshold, top1, rate, student_ms + rate * vit_ms))
+    
+    print(f"💡 Set CASCADE_THRESHOLD (now {settings.CASCADE_THRESHOLD:.2f}) to the lowest "
+          f"threshold whose agreement you can accept")
+    
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"📝 Report written to {args.json}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Convert JSON or CSV tracks into a binary, memory-mappable music catalog
+
+Usage:
+    python -m scripts.convert_catalog tracks.json|tracks.csv [-o data/catalog.bin]
+
+Point MUSIC_CATALOG_PATH at the output. Running servers pick up a rewritten
+catalog within MUSIC_CATALOG_RELOAD_S seconds; the file is replaced
+atomically, so it is safe to convert straight onto the live path.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.services.music_catalog import load_tracks, open_catalog, write_catalog
+from app.services.music_index import MusicIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="JSON (list or {mood: [...]}) or CSV tracks")
+    parser.add_argument("-o", "--output", default=str(settings.DATA_DIR / "catalog.bin"))
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    tracks = load_tracks(Path(args.source))
+    if not tracks:
+        print("❌ No tracks found")
+        return 1
+    index = MusicIndex.from_tracks(tracks)
+    print(f"🏗️  Indexed {len(index)} tracks in {time.perf_counter() - start:.2f}s")
+    
+    output = Path(args.output)
+    write_catalog(index, output)
+    print(f"📦 Wrote {output} ({output.stat().st_size / 1e6:.1f} MB)")
+    
+    # Round trip a few rows
+    start = time.perf_counter()
+    catalog = open_catalog(output)
+    open_ms = (time.perf_counter() - start) * 1000
+    for row in (0, len(index) // 2, len(index) - 1):
+        if catalog.track(row) != index.track(row):
+            print(f"❌ Row {row} differs after conversion")
+            return 1
+    
+    print(f"✅ Catalog verified (opens in {open_ms:.2f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Local stand-in for the Spotify token and search endpoints
+
+Usage:
+    python -m scripts.fake_spotify [--port 8765] [--latency-ms 50] [--rate-limit 0]
+    python -m scripts.fake_spotify --bench [--lookups 2000] [--distinct 200] [--client-rate 10]
+
+Serve mode answers ``POST /api/token`` and ``GET /v1/search`` with
+deterministic fake tracks. Point the server at it with::
+
+    SPOTIFY_API_URL=http://127.0.0.1:8765/v1
+    SPOTIFY_AUTH_URL=http://127.0.0.1:8765/api/token
+
+Bench mode starts the fake server in a background thread and fires
+concurrent lookups (many of them duplicates) through AsyncSpotifyClient,
+then reports latency, cache hits, coalesced lookups and upstream requests.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency_ms: float = 50, rate_limit: int = 0) -> FastAPI:
+    """Fake Spotify API; ``rate_limit`` > 0 answers 429 above that many searches/s"""
+    app = FastAPI(title="Fake Spotify")
+    app.state.searches = 0
+    app.state.tokens = 0
+    app.state.throttled = 0
+    window = {"second": 0, "count": 0}
+    
+    @app.post("/api/token")
+    async def token():
+        app.state.tokens += 1
+        return {"access_token": f"fake-token-{app.state.tokens}", "token_type": "Bearer", "expires_in": 3600}
+    
+    @app.get("/v1/search")
+    async def search(q: str = Query(...), type: str = "track", limit: int = 1):
+        if type != "track":
+            raise HTTPException(status_code=400, detail="Only track search is supported")
+        
+        second = int(time.monotonic())
+        if window["second"] != second:
+            window["second"], window["count"] = second, 0
+        window["count"] += 1
+        if rate_limit > 0 and window["count"] > rate_limit:
+            app.state.throttled += 1
+            return JSONResponse(status_code=429, content={"error": "rate limited"},
+                                headers={"Retry-After": "1"})
+        
+        app.state.searches += 1
+        await asyncio.sleep(latency_ms / 1000)
+        
+        track_id = hashlib.sha1(q.encode("utf-8")).hexdigest()[:22]
+        title, _, artist = q.partition(" by ")
+        items = [{
+            "name": title or q,
+            "artists": [{"name": artist or "Fake Artist"}],
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+            "uri": f"spotify:track:{track_id}",
+        }]
+        return {"tracks": {"items": items[:limit]}}
+    
+    return app
+
+
+def start_server(app: FastAPI, port: int) -> uvicorn.Server:
+    """Run uvicorn in a daemon thread and wait until it accepts requests"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def run_bench(args, app: FastAPI) -> int:
+    from app.config import settings
+    from app.services.spotify_client import AsyncSpotifyClient
+    
+    if args.client_rate is not None:
+        settings.SPOTIFY_RATE_LIMIT = args.client_rate
+    base = f"http://127.0.0.1:{args.port}"
+    client = AsyncSpotifyClient("fake-id", "fake-secret", api_url=f"{base}/v1", auth_url=f"{base}/api/token")
+    
+    rng = random.Random(0)
+    moods = ["happy", "sad", "neutral", "angry"]
+    # Skewed popularity: most detections map to a few songs
+    weights = [1 / (i + 1) for i in range(args.distinct)]
+    keys = rng.choices(range(args.distinct), weights=weights, k=args.lookups)
+    lookups = [(f"Song {k} by Artist {k % 17}", moods[k % len(moods)]) for k in keys]
+    
+    semaphore = asyncio.Semaphore(args.concurrency)
+    timings = np.empty(len(lookups))
+    results = []
+    
+    async def lookup(i: int, query: str, mood: str):
+        async with semaphore:
+            start = time.perf_counter()
+            results.append(await client.search_track(query, mood))
+            timings[i] = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(i, q, m) for i, (q, m) in enumerate(lookups)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    
+    stats = client.get_stats()
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(f"🔎 {len(lookups)} lookups ({args.distinct} distinct) in {elapsed:.2f}s "
+          f"({len(lookups) / elapsed:.0f}/s, concurrency {args.concurrency})")
+    print(f"⏱️  Latency: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms")
+    print(f"💾 Cache hits {stats['cache_hits']}, misses {stats['cache_misses']}, "
+          f"coalesced {stats['coalesced']}")
+    print(f"🌐 Upstream searches {stats['upstream_requests']} (server saw {app.state.searches}, "
+          f"throttled {app.state.throttled}), tokens {app.state.tokens}, errors {stats['errors']}")
+    
+    missing = sum(r is None for r in results)
+    if missing:
+        print(f"❌ {missing} lookups returned no track")
+        return 1
+    if stats["upstream_requests"] > args.distinct:
+        print("❌ Duplicate lookups reached the upstream API")
+        return 1
+    
+    print("✅ Every distinct query hit the upstream API at most once")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="answer 429 above this many searches per second (0 = off)")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--client-rate", type=float, default=None,
+                        help="override SPOTIFY_RATE_LIMIT for the bench (0 = unlimited)")
+    args = parser.parse_args()
+    
+    app = create_app(args.latency_ms, args.rate_limit)
+    if not args.bench:
+        print(f"🎧 Fake Spotify on http://127.0.0.1:{args.port} (latency {args.latency_ms:.0f} ms)")
+        uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+        return 0
+    
+    server = start_server(app, args.port)
+    try:
+        return asyncio.run(run_bench(args, app))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+"""Load generator and latency benchmark for the /stream endpoint
+
+Usage:
+    python -m scripts.loadgen [--model mock|custom|deepface | --url ws://host:port/stream]
+                              [--clients 10] [--fps 10] [--duration 30] [--warmup 3]
+                              [--frames DIR] [--encoding json|msgpack|binary]
+                              [--report report.json] [--baseline old.json --tolerance 0.2]
+
+With ``--model`` the script starts its own server (uvicorn, MODEL_TYPE set,
+reload off) and samples its CPU and RSS, children included, from /proc.
+With ``--url`` it drives a running server (pass ``--server-pid`` to still
+get CPU/RSS).
+
+Every client opens /stream, negotiates protocol version 2 with
+``report_all`` so the server reports a result for each detected frame
+(tagged with the frame number), and replays a JPEG sequence at ``--fps``:
+the sorted *.jpg files of ``--frames`` or a synthetic moving face. Frames
+replaced by a newer one before detection count as dropped.
+
+The report holds frame-to-result latency percentiles, throughput, drops,
+server CPU/RSS and the server's /api/stats. Given ``--baseline``, exits
+non-zero if p95/p99 latency or throughput regressed by more than
+``--tolerance``.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import websockets
+from PIL import Image, ImageDraw
+
+from app.services.protocol import available_encodings, decode_message
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def load_frames(directory: Path) -> List[bytes]:
+    """Recorded JPEG sequence, in file name order"""
+    paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in (".jpg", ".jpeg"))
+    if not paths:
+        raise ValueError(f"No JPEG frames in {directory}")
+    return [p.read_bytes() for p in paths]
+
+
+def synthetic_frames(count: int = 60, size=(640, 480), quality: int = 80) -> List[bytes]:
+    """A face-like blob drifting over a noisy background, JPEG encoded"""
+    rng = np.random.default_rng(0)
+    width, height = size
+    frames = []
+    for i in range(count):
+        background = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+        image = Image.fromarray(background)
+        draw = ImageDraw.Draw(image)
+        cx = width // 2 + int(width * 0.15 * np.sin(2 * np.pi * i / count))
+        cy = height // 2 + int(height * 0.05 * np.cos(2 * np.pi * i / count))
+        r = height // 4
+        draw.ellipse((cx - r, cy - int(r * 1.25), cx + r, cy + int(r * 1.25)), fill=(224, 172, 140))
+        for ex in (cx - r // 2, cx + r // 2):
+            draw.ellipse((ex - r // 8, cy - r // 3, ex + r // 8, cy - r // 6), fill=(40, 30, 30))
+        mouth = r // 6 + int(r // 8 * np.sin(2 * np.pi * i / 15))
+        draw.arc((cx - r // 2, cy + r // 4 - mouth, cx + r // 2, cy + r // 4 + mouth), 0, 180, fill=(120, 40, 40), width=6)
+        
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def _process_tree(root: int) -> List[int]:
+    """``root`` and all its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _cpu_and_rss(pids: List[int]):
+    """Total CPU seconds and RSS bytes of a set of processes"""
+    cpu, rss = 0.0, 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1]) * 1024
+                        break
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss
+
+
+async def sample_process(pid: int, samples: List[Dict], interval: float = 0.5):
+    """Append {cpu_percent, rss_mb} samples for a process tree until cancelled"""
+    last_cpu, _ = _cpu_and_rss(_process_tree(pid))
+    last_time = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        cpu, rss = _cpu_and_rss(_process_tree(pid))
+        now = time.monotonic()
+        samples.append({
+            "cpu_percent": (cpu - last_cpu) / (now - last_time) * 100,
+            "rss_mb": rss / 1e6,
+        })
+        last_cpu, last_time = cpu, now
+
+
+def start_server(model: str, port: int) -> subprocess.Popen:
+    """Start uvicorn with the given MODEL_TYPE and wait until it answers"""
+    env = dict(os.environ, MODEL_TYPE=model, RELOAD="false", PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup ({process.returncode})")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not start in time")
+
+
+def fetch_stats(base_url: str) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(f"{base_url}/api/stats", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+async def run_client(index: int, args, frames: List[bytes], start_at: float) -> Dict:
+    """Stream frames at a fixed rate and time every reported result"""
+    loop = asyncio.get_running_loop()
+    sent_at: Dict[int, float] = {}
+    latencies: List[float] = []
+    measure_from = start_at + args.warmup
+    counts = {"sent": 0, "results": 0, "mood_changes": 0, "superseded": 0, "errors": 0}
+    
+    async with websockets.connect(args.url, max_size=None) as ws:
+        json.loads(await ws.recv())
+        await ws.send(json.dumps({
+            "type": "negotiate",
+            "version": 2,
+            "encoding": args.encoding,
+            "ack_every": args.ack_every,
+            "report_all": True,
+        }))
+        reply = json.loads(await ws.recv())
+        if reply.get("type") != "negotiated":
+            raise RuntimeError(f"Negotiation failed: {reply}")
+        
+        async def receive():
+            async for data in ws:
+                message = decode_message(data, args.encoding)
+                kind = message["type"]
+                if kind == "error":
+                    counts["errors"] += 1
+                if kind != "mood_detected":
+                    continue
+                
+                now = loop.time()
+                frame = message["frame"]
+                sent = sent_at.pop(frame, None)
+                # Older frames still waiting were replaced before detection
+                for older in [f for f in sent_at if f < frame]:
+                    del sent_at[older]
+                    counts["superseded"] += 1
+                if sent is None or sent < measure_from:
+                    continue
+                counts["results"] += 1
+                counts["mood_changes"] += message.get("changed", False)
+                latencies.append((now - sent) * 1000)
+        
+        receiver = asyncio.create_task(receive())
+        
+        # Stagger clients over one frame interval
+        interval = 1.0 / args.fps
+        first = start_at + interval * index / args.clients
+        total = int(args.duration * args.fps)
+        offset = index * 7
+        for i in range(total):
+            delay = first + i * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await ws.send(frames[(offset + i) % len(frames)])
+            sent_at[i + 1] = loop.time()
+            if sent_at[i + 1] >= measure_from:
+                counts["sent"] += 1
+        
+        # Let outstanding results arrive
+        deadline = loop.time() + args.drain
+        while sent_at and loop.time() < deadline and not receiver.done():
+            await asyncio.sleep(0.05)
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+    
+    return {"latencies": latencies, **counts}
+
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    array = np.asarray(values)
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {
+        "count": len(array),
+        "mean": round(float(array.mean()), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(array.max()), 2),
+    }
+
+
+async def run(args, frames: List[bytes], server_pid: Optional[int]) -> Dict:
+    samples: List[Dict] = []
+    sampler = asyncio.create_task(sample_process(server_pid, samples)) if server_pid else None
+    
+    loop = asyncio.get_running_loop()
+    start_at = loop.time() + 0.5
+    results = await asyncio.gather(
+        *(run_client(i, args, frames, start_at) for i in range(args.clients)),
+        return_exceptions=True
+    )
+    elapsed = args.duration - args.warmup
+    
+    if sampler:
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+    
+    failed = [r for r in results if isinstance(r, BaseException)]
+    results = [r for r in results if not isinstance(r, BaseException)]
+    latencies = [latency for r in results for latency in r["latencies"]]
+    sent = sum(r["sent"] for r in results)
+    received = sum(r["results"] for r in results)
+    
+    # Skip the first CPU samples, they cover connection setup
+    steady = samples[int(args.warmup / 0.5):] or samples
+    return {
+        "latency_ms": percentiles(latencies),
+        "frames": {
+            "sent": sent,
+            "results": received,
+            "dropped": max(0, sent - received),
+            "drop_rate": round(1 - received / sent, 4) if sent else 0.0,
+            "mood_changes": sum(r["mood_changes"] for r in results),
+            "errors": sum(r["errors"] for r in results),
+        },
+        "throughput": {
+            "sent_fps": round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+            "results_per_s": round(received / elapsed, 2) if elapsed > 0 else 0.0,
+        },
+        "server": {
+            "cpu_percent_mean": round(float(np.mean([s["cpu_percent"] for s in steady])), 1) if steady else None,
+            "cpu_percent_max": round(max(s["cpu_percent"] for s in steady), 1) if steady else None,
+            "rss_mb_max": round(max(s["rss_mb"] for s in samples), 1) if samples else None,
+        },
+        "failed_clients": [repr(e) for e in failed],
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline``"""
+    problems = []
+    for key in ("p95", "p99"):
+        old, new = baseline["latency_ms"].get(key), report["latency_ms"].get(key)
+        if old and new and new > old * (1 + tolerance):
+            problems.append(f"{key} latency {new:.1f} ms vs {old:.1f} ms")
+    old = baseline["throughput"]["results_per_s"]
+    new = report["throughput"]["results_per_s"]
+    if old and new < old * (1 - tolerance):
+        problems.append(f"throughput {new:.1f}/s vs {old:.1f}/s")
+    return problems
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--model", choices=("mock", "custom", "deepface"),
+                        help="start a server with this MODEL_TYPE")
+    target.add_argument("--url", help="drive a running server, e.g. ws://127.0.0.1:8000/stream")
+    parser.add_argument("--port", type=int, default=8765, help="port for --model")
+    parser.add_argument("--server-pid", type=int, help="sample CPU/RSS of a running server")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of streaming per client")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds excluded from the results")
+    parser.add_argument("--drain", type=float, default=5, help="seconds to wait for late results")
+    parser.add_argument("--frames", type=Path, help="directory of recorded JPEG frames")
+    parser.add_argument("--encoding", default="json", choices=("json", "msgpack", "binary"))
+    parser.add_argument("--ack-every", type=int, default=10)
+    parser.add_argument("--report", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    
+    if args.encoding not in available_encodings():
+        print(f"❌ Encoding {args.encoding} not available (install msgpack)")
+        return 1
+    if not args.model and not args.url:
+        args.model = "mock"
+    
+    frames = load_frames(args.frames) if args.frames else synthetic_frames()
+    print(f"🎞️  {len(frames)} frames ({np.mean([len(f) for f in frames]) / 1000:.1f} KB avg)")
+    
+    server = None
+    server_pid = args.server_pid
+    if args.model:
+        print(f"🚀 Starting server with MODEL_TYPE={args.model}...")
+        server = start_server(args.model, args.port)
+        server_pid = server.pid
+        args.url = f"ws://127.0.0.1:{args.port}/stream"
+    base_url = args.url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/", 1)[0]
+    
+    try:
+        print(f"📡 {args.clients} clients x {args.fps:g} fps for {args.duration:g}s ({args.encoding})")
+        report = asyncio.run(run(args, frames, server_pid))
+        report["server"]["stats"] = fetch_stats(base_url)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+    
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {
+            "model": args.model or (report["server"]["stats"] or {}).get("model_type"),
+            "url": args.url,
+            "clients": args.clients,
+            "fps": args.fps,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "encoding": args.encoding,
+            "frames": str(args.frames) if args.frames else "synthetic",
+        },
+        **report,
+    }
+    
+    latency = report["latency_ms"]
+    frames_info = report["frames"]
+    if latency["count"]:
+        print(f"⏱️  Latency: p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+              f"p99 {latency['p99']} ms (max {latency['max']} ms)")
+    print(f"📦 Sent {frames_info['sent']}, results {frames_info['results']}, "
+          f"dropped {frames_info['dropped']} ({frames_info['drop_rate']:.1%})")
+    print(f"🚄 Throughput: {report['throughput']['results_per_s']} results/s "
+          f"({report['throughput']['sent_fps']} frames/s sent)")
+    if report["server"]["cpu_percent_mean"] is not None:
+        print(f"🖥️  Server CPU {report['server']['cpu_percent_mean']}% mean, "
+              f"{report['server']['cpu_percent_max']}% max, RSS {report['server']['rss_mb_max']} MB")
+    
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2))
+        print(f"📝 Report written to {args.report}")
+    
+    if report["failed_clients"]:
+        print(f"❌ {len(report['failed_clients'])} client(s) failed: {report['failed_clients'][0]}")
+        return 1
+    
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for key in ("model", "clients", "fps", "encoding", "frames"):
+            if baseline["config"].get(key) != report["config"][key]:
+                print(f"⚠️  Baseline was run with {key}={baseline['config'].get(key)}, "
+                      f"this run with {report['config'][key]}")
+        problems = compare(report, baseline, args.tolerance)
+        if problems:
+            for problem in problems:
+                print(f"❌ Regression: {problem}")
+            return 1
+        print(f"✅ Within {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
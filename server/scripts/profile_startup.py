@@ -0,0 +1,155 @@
+"""Profile server startup per model backend against a time budget
+
+Usage:
+    python -m scripts.profile_startup [--backends mock,deepface,custom] [--budget mock=1000] [--top 10] [--json out.json]
+
+Each backend is started in a fresh interpreter under ``-X importtime``: the
+script imports main, runs the app's lifespan startup and shutdown, and
+reports import time, time-to-ready and the heaviest packages.
+Exits non-zero when a backend goes over its budget.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+# Milliseconds from interpreter start to "Server ready"
+DEFAULT_BUDGETS_MS = {
+    "mock": 1000,
+    "deepface": 15000,
+    "custom": 10000,
+}
+
+# Modules that must not be imported by a backend
+FORBIDDEN_IMPORTS = {
+    "mock": ("torch", "transformers", "deepface", "tensorflow"),
+    "deepface": ("torch", "transformers"),
+}
+
+MARKER = "__STARTUP__"
+
+CHILD_CODE = f"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        print("{MARKER}" + json.dumps({{
+            "import_ms": (imported - start) * 1000,
+            "ready_ms": (ready - start) * 1000,
+            "modules": sorted(sys.modules),
+        }}), flush=True)
+
+asyncio.run(run())
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float]]:
+    """Import time per top-level package in ms, slowest first
+    
+    Sums the *self* time of every module of a package, so nested imports
+    are charged to the package they belong to rather than to whoever
+    happened to import them first.
+    """
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indent><module>"
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_backend(model_type: str) -> Dict:
+    """Start the server in a subprocess with the given MODEL_TYPE"""
+    env = dict(os.environ, MODEL_TYPE=model_type, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    
+    report = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            report = json.loads(line[len(MARKER):])
+    if report is None:
+        tail = (proc.stdout + proc.stderr).strip().splitlines()[-5:]
+        return {"backend": model_type, "error": "\n".join(tail)}
+    
+    modules = set(report.pop("modules"))
+    report.update(
+        backend=model_type,
+        wall_ms=wall_ms,
+        top_imports=parse_importtime(proc.stderr),
+        forbidden=[m for m in FORBIDDEN_IMPORTS.get(model_type, ()) if m in modules],
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default=",".join(DEFAULT_BUDGETS_MS))
+    parser.add_argument("--budget", action="append", default=[],
+                        help="override a budget in ms, e.g. --budget mock=800")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to show")
+    parser.add_argument("--json", default="", help="also write the report here")
+    args = parser.parse_args()
+    
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for override in args.budget:
+        name, _, value = override.partition("=")
+        budgets[name] = float(value)
+    
+    results = []
+    failed = False
+    for model_type in filter(None, args.backends.split(",")):
+        result = profile_backend(model_type)
+        results.append(result)
+        
+        print(f"\n🔬 MODEL_TYPE={model_type}")
+        if "error" in result:
+            print(f"❌ Startup failed:\n{result['error']}")
+            failed = True
+            continue
+        
+        budget = budgets.get(model_type)
+        result["budget_ms"] = budget
+        print(f"   imports:       {result['import_ms']:8.0f} ms")
+        print(f"   ready:         {result['ready_ms']:8.0f} ms"
+              + (f" (budget {budget:.0f} ms)" if budget else ""))
+        print(f"   process wall:  {result['wall_ms']:8.0f} ms")
+        for name, ms in result["top_imports"][:args.top]:
+            print(f"     {ms:8.1f} ms  {name}")
+        
+        if result["forbidden"]:
+            print(f"❌ Imported {', '.join(result['forbidden'])}")
+            failed = True
+        if budget and result["ready_ms"] > budget:
+            print("❌ Over budget")
+            failed = True
+    
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n📝 Report written to {args.json}")
+    
+    if failed:
+        return 1
+    print("\n✅ All backends within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
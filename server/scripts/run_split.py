@@ -0,0 +1,128 @@
+"""Run a split deployment on one machine: inference replicas + gateway workers
+
+Usage:
+    python -m scripts.run_split [--replicas 2] [--gateways 2] [--port 8000]
+                                [--replica-port 9001] [--unix]
+
+Starts ``--replicas`` inference servers (python -m app.inference_server),
+waits until each answers a health check, then runs uvicorn with
+``--gateways`` worker processes in INFERENCE_MODE=remote, all pointed at
+every replica. Clients connect to ws://localhost:PORT/stream as usual.
+Ctrl-C stops everything.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.rpc import open_connection, read_message, write_message
+
+
+async def _ping(address: str) -> bool:
+    try:
+        reader, writer = await asyncio.wait_for(open_connection(address), 1)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        write_message(writer, {"id": 0, "op": "health"})
+        header, _ = await asyncio.wait_for(read_message(reader), 5)
+        return header.get("result", {}).get("status") == "ok"
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return False
+    finally:
+        writer.close()
+
+
+def wait_until_healthy(address: str, process: subprocess.Popen, timeout: float) -> bool:
+    """Poll a replica until it answers or its process dies"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        if asyncio.run(_ping(address)):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--gateways", type=int, default=2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--replica-port", type=int, default=9001,
+                        help="first replica port; the rest count up from it")
+    parser.add_argument("--unix", action="store_true", help="use unix sockets between processes")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    args = parser.parse_args()
+    
+    # Treat SIGTERM like Ctrl-C so the child processes get stopped too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    
+    socket_dir = tempfile.mkdtemp(prefix="mood-inference-") if args.unix else None
+    processes = []
+    addresses = []
+    
+    try:
+        for i in range(args.replicas):
+            if socket_dir:
+                path = os.path.join(socket_dir, f"replica-{i}.sock")
+                command = ["--unix", path]
+                address = f"unix:{path}"
+            else:
+                port = args.replica_port + i
+                command = ["--port", str(port)]
+                address = f"127.0.0.1:{port}"
+            
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "app.inference_server", *command]
+            ))
+            addresses.append(address)
+        
+        for address, process in zip(addresses, processes):
+            if not wait_until_healthy(address, process, args.startup_timeout):
+                print(f"❌ Inference replica {address} did not come up")
+                return 1
+        print(f"✅ {len(addresses)} inference replica(s) healthy: {', '.join(addresses)}")
+        
+        env = dict(
+            os.environ,
+            INFERENCE_MODE="remote",
+            INFERENCE_REPLICAS=",".join(addresses),
+            RELOAD="false",
+        )
+        gateway = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app",
+             "--host", args.host, "--port", str(args.port),
+             "--workers", str(args.gateways)],
+            env=env
+        )
+        processes.append(gateway)
+        print(f"🌐 {args.gateways} gateway worker(s) on port {args.port}")
+        return gateway.wait()
+    
+    except KeyboardInterrupt:
+        return 0
+    
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if socket_dir:
+            for name in os.listdir(socket_dir):
+                os.unlink(os.path.join(socket_dir, name))
+            os.rmdir(socket_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Distill the cascade's small student classifier from the custom ViT
+
+Usage:
+    python -m scripts.train_student --images DIR [--output student_model.pt]
+                                    [--size 64] [--width 32] [--epochs 30] [--batch 128]
+
+DIR holds face images (frames are fine too), optionally in one subfolder
+per emotion label (angry/, happy/, ...). Each image is cropped to its
+largest face the way the server crops it and labelled by the ViT. The
+student learns from the ViT's temperature-softened probabilities and,
+where a folder label exists, from that label too.
+
+A held-out split is used to fit the student's softmax temperature. The
+fit maximizes the likelihood of the ViT's decision, so the student's
+confidence reads as "chance the ViT agrees" and CASCADE_THRESHOLD can be
+compared with it directly. The split also reports agreement and the
+escalation rate at CASCADE_THRESHOLD. Needs best_model.pth or the baked
+model in the working directory.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def face_crop(detector, image: np.ndarray) -> np.ndarray:
+    """The crop the server would classify: largest face, or the whole frame"""
+    if detector.face_detector is None:
+        return image
+    faces = detector.face_detector.locate_all(image)
+    return detector.face_detector.crop(image, faces[0]) if faces else image
+
+
+def build_dataset(detector, root: Path, size: int, batch: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Student-size crops, ViT probabilities and folder labels (-1: none)
+    
+    Images are processed a batch at a time, so only the small crops stay in memory.
+    """
+    import cv2
+    
+    label_index = {label: i for i, label in enumerate(detector.emotion_labels)}
+    paths = [path for path in sorted(root.rglob("*")) if path.suffix.lower() in IMAGE_SUFFIXES]
+    
+    crops, teacher, labels = [], [], []
+    for start in range(0, len(paths), batch):
+        chunk = paths[start:start + batch]
+        face_crops: List[np.ndarray] = []
+        for path in chunk:
+            face = face_crop(detector, np.asarray(Image.open(path).convert("RGB")))
+            face_crops.append(face)
+            # Same interpolation as the BatchPreprocessor the server runs it through
+            crops.append(cv2.resize(face, (size, size), interpolation=cv2.INTER_LINEAR))
+            labels.append(label_index.get(path.parent.name, -1) if path.parent != root else -1)
+        
+        teacher.append(detector._softmax(detector.model(detector._preprocess_batch(face_crops))))
+        print(f"\r🏷️  Labelled {min(start + batch, len(paths))}/{len(paths)} images with the ViT",
+              end="", flush=True)
+    print()
+    
+    if not crops:
+        return np.empty((0, size, size, 3), np.uint8), np.empty((0, 7), np.float32), np.empty(0, int)
+    return np.stack(crops), np.concatenate(teacher).astype(np.float32), np.array(labels)
+
+
+def fit_temperature(logits: np.ndarray, targets: np.ndarray) -> float:
+    """Temperature minimizing the negative log-likelihood of ``targets``"""
+    best, best_nll = 1.0, float("inf")
+    for temperature in np.linspace(0.5, 5.0, 91):
+        scaled = logits / temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        log_probs = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+        nll = -log_probs[np.arange(len(targets)), targets].mean()
+        if nll < best_nll:
+            best, best_nll = float(temperature), nll
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="directory of training images")
+    parser.add_argument("--output", default=settings.CASCADE_STUDENT_PATH,
+                        help="checkpoint to write (default: CASCADE_STUDENT_PATH)")
+    parser.add_argument("--size", type=int, default=64, help="student input side in pixels")
+    parser.add_argument("--width", type=int, default=32, help="channels of the first conv block")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=3e-3)
+    parser.add_argument("--kd-temperature", type=float, default=4.0,
+                        help="softening of the ViT's probabilities")
+    parser.add_argument("--label-weight", type=float, default=0.3,
+                        help="weight of folder labels vs. the ViT's soft targets")
+    parser.add_argument("--holdout", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    import torch
+    import torch.nn.functional as F
+    from app.models.mood_detector import MoodDetector
+    from app.models.student import StudentCNN, save_student
+    
+    torch.manual_seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    
+    settings.MODEL_TYPE = "custom"
+    settings.CASCADE = False
+    detector = MoodDetector()
+    if detector.model is None:
+        print("❌ Could not load the custom model")
+        return 1
+    
+    crops, teacher, labels = build_dataset(detector, Path(args.images), args.size, 32)
+    if len(crops) < 10:
+        print("❌ Need at least 10 images")
+        return 1
+    
+    order = rng.permutation(len(crops))
+    holdout = order[:max(1, int(len(order) * args.holdout))]
+    train = order[len(holdout):]
+    print(f"🔬 {len(train)} training / {len(holdout)} held-out images, "
+          f"{int((labels >= 0).sum())} with folder labels")
+    
+    mean = np.asarray(detector.processor.image_mean, dtype=np.float32).reshape(1, 3, 1, 1)
+    std = np.asarray(detector.processor.image_std, dtype=np.float32).reshape(1, 3, 1, 1)
+    
+    def to_tensor(indices: np.ndarray) -> torch.Tensor:
+        pixels = crops[indices].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        return torch.from_numpy((pixels - mean) / std)
+    
+    device = detector.device
+    model = StudentCNN(len(detector.emotion_labels), args.width).to(device)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
+    batch_size = min(args.batch, len(train))
+    steps_per_epoch = max(1, len(train) // batch_size)
+    steps = args.epochs * steps_per_epoch
+    scheduler = torch.optim.lr_scheduler.OneCycleLR(optimizer, args.lr, total_steps=steps)
+    
+    # Softened teacher distribution: p^(1/T), renormalized
+    soft = teacher ** (1.0 / args.kd_temperature)
+    soft /= soft.sum(axis=1, keepdims=True)
+    
+    for epoch in range(args.epochs):
+        model.train()
+        start = time.perf_counter()
+        epoch_loss = 0.0
+        shuffled = rng.permutation(train)
+        # Full batches only (BatchNorm), a fresh shuffle every epoch
+        for first in range(0, steps_per_epoch * batch_size, batch_size):
+            indices = shuffled[first:first + batch_size]
+            inputs = to_tensor(indices).to(device)
+            
+            # Augment: mirror half the batch, shift by up to 1/16 of the side
+            flip = torch.from_numpy(rng.random(len(indices)) < 0.5).to(device)
+            inputs = torch.where(flip[:, None, None, None], inputs.flip(3), inputs)
+            shift = args.size // 16
+            dx, dy = (int(v) for v in rng.integers(-shift, shift + 1, 2))
+            inputs = torch.roll(inputs, shifts=(dy, dx), dims=(2, 3))
+            
+            logits = model(inputs)
+            targets = torch.from_numpy(soft[indices]).to(device)
+            loss = F.kl_div(
+                F.log_softmax(logits / args.kd_temperature, dim=1), targets, reduction="batchmean"
+            ) * args.kd_temperature ** 2 * (1 - args.label_weight)
+            
+            hard = torch.from_numpy(labels[indices]).to(device)
+            has_label = hard >= 0
+            if has_label.any():
+                loss = loss + args.label_weight * F.cross_entropy(logits[has_label], hard[has_label])
+            
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            epoch_loss += loss.item() * len(indices)
+        
+        print(f"   epoch {epoch + 1:>3}/{args.epochs}  loss {epoch_loss / (steps_per_epoch * batch_size):.4f}  "
+              f"({time.perf_counter() - start:.1f}s)")
+    
+    # Calibrate on held-out images against the ViT's decision
+    model.eval()
+    with torch.inference_mode():
+        holdout_logits = np.concatenate([
+            model(to_tensor(holdout[i:i + args.batch]).to(device)).float().cpu().numpy()
+            for i in range(0, len(holdout), args.batch)
+        ])
+    vit_top1 = teacher[holdout].argmax(axis=1)
+    temperature = fit_temperature(holdout_logits, vit_top1)
+    
+    probs = detector._softmax(holdout_logits / temperature)
+    agree = probs.argmax(axis=1) == vit_top1
+    escalated = probs.max(axis=1) < settings.CASCADE_THRESHOLD
+    cascade_agree = np.where(escalated, True, agree)
+    print(f"📊 Held out: student agrees with ViT on {agree.mean():.2%}; at threshold "
+          f"{settings.CASCADE_THRESHOLD:.2f}, {escalated.mean():.1%} escalate and the "
+          f"cascade agrees on {cascade_agree.mean():.2%} (temperature {temperature:.2f})")
+    
+    output = Path(args.output)
+    save_student(
+        model, output, args.size, detector.processor.image_mean, detector.processor.image_std,
+        detector.emotion_labels, temperature, args.width
+    )
+    print(f"📦 Wrote {output} ({output.stat().st_size / 1e6:.1f} MB); "
+          f"check thresholds with `python -m scripts.compare_cascade`")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
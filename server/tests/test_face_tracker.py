@@ -0,0 +1,39 @@
+from app.services.face_tracker import FaceTracker, iou
+
+
+def test_iou():
+    assert iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert iou([0, 0, 10, 10], [5, 0, 10, 10]) == 50 / 150
+    assert iou([0, 0, 10, 10], [10, 0, 10, 10]) == 0.0
+
+
+def test_ids_follow_moving_faces():
+    tracker = FaceTracker(iou_threshold=0.3, max_missed=2)
+    assert tracker.update([[0, 0, 50, 50], [200, 0, 50, 50]]) == [1, 2]
+    # Same people, moved a little and listed in the other order
+    assert tracker.update([[205, 5, 50, 50], [5, 3, 50, 50]]) == [2, 1]
+
+
+def test_new_faces_get_new_ids():
+    tracker = FaceTracker(iou_threshold=0.3, max_missed=2)
+    tracker.update([[0, 0, 50, 50]])
+    assert tracker.update([[0, 0, 50, 50], [300, 300, 40, 40]]) == [1, 2]
+
+
+def test_best_overlap_wins():
+    tracker = FaceTracker(iou_threshold=0.1, max_missed=2)
+    tracker.update([[0, 0, 100, 100]])
+    # Both boxes overlap track 1; only the better match keeps its ID
+    assert tracker.update([[60, 0, 100, 100], [5, 0, 100, 100]]) == [2, 1]
+
+
+def test_missed_faces_keep_their_id_for_a_while():
+    tracker = FaceTracker(iou_threshold=0.3, max_missed=2)
+    tracker.update([[0, 0, 50, 50]])
+    tracker.update([])
+    tracker.update([])
+    assert tracker.update([[2, 2, 50, 50]]) == [1]
+    
+    for _ in range(3):
+        tracker.update([])
+    assert tracker.update([[2, 2, 50, 50]]) == [2]
@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.services.frame_processor import FrameProcessor, decode_size
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((height, width, 3), np.uint8)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def decode_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DECODE_TARGET_SIZE", 224)
+    monkeypatch.setattr(settings, "DECODE_FACE_FRACTION", 0.4)
+    monkeypatch.setattr(settings, "USE_FACE_DETECTION", True)
+    monkeypatch.setattr(settings, "DEEPFACE_DETECTOR", "server")
+    return monkeypatch
+
+
+@pytest.mark.parametrize("model_type, face_detection, expected", [
+    ("mock", True, 224),
+    ("custom", True, 560),
+    ("custom-int8", True, 560),
+    ("custom", False, 224),
+    ("deepface", True, 560),
+])
+def test_decode_size_follows_face_cropping(decode_settings, model_type, face_detection, expected):
+    decode_settings.setattr(settings, "MODEL_TYPE", model_type)
+    decode_settings.setattr(settings, "USE_FACE_DETECTION", face_detection)
+    assert decode_size() == expected
+
+
+def test_decode_size_options(decode_settings):
+    decode_settings.setattr(settings, "MODEL_TYPE", "deepface")
+    decode_settings.setattr(settings, "DEEPFACE_DETECTOR", "skip")
+    assert decode_size() == 224
+    decode_settings.setattr(settings, "DEEPFACE_DETECTOR", "retinaface")
+    decode_settings.setattr(settings, "DECODE_FACE_FRACTION", 0)
+    assert decode_size() == 224
+    decode_settings.setattr(settings, "DECODE_TARGET_SIZE", 0)
+    assert decode_size() == 0
+
+
+@pytest.mark.parametrize("model_type, shape", [("mock", (360, 640, 3)), ("custom", (720, 1280, 3))])
+def test_face_crops_get_a_larger_decode(decode_settings, model_type, shape):
+    decode_settings.setattr(settings, "MODEL_TYPE", model_type)
+    assert FrameProcessor("c").decode_frame(jpeg(1280, 720)).shape == shape
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.mood_history import ClientHistory, MoodHistory, read_spill
+from app.services.mood_smoother import EMOTION_LABELS
+
+T0 = 1_700_000_040.0  # a minute boundary
+
+
+def detection(mood, confidence=0.8):
+    emotions = {label: 0.0 for label in EMOTION_LABELS}
+    emotions[mood] = 100.0
+    return {"success": True, "confidence": confidence, "emotions": emotions}
+
+
+def emotions(mood):
+    vector = np.zeros(len(EMOTION_LABELS))
+    vector[EMOTION_LABELS.index(mood)] = 100.0
+    return vector
+
+
+@pytest.fixture
+def small_rings(monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_RAW_SIZE", 50)
+    monkeypatch.setattr(settings, "HISTORY_SECONDS", 30)
+    monkeypatch.setattr(settings, "HISTORY_MINUTES", 10)
+
+
+def test_rollups_count_every_detection(small_rings):
+    history = ClientHistory("c")
+    # 2 detections a second for 150 s: happy for the first 90 s, then sad
+    for i in range(300):
+        t = T0 + i / 2
+        history.add(t, emotions("happy" if t < T0 + 90 else "sad"), 0.8)
+    history.close()
+    
+    seconds = history.query("second", T0, T0 + 150)
+    minutes = history.query("minute", T0, T0 + 150)
+    # The second ring only holds the last 30 buckets
+    assert len(seconds) == 30
+    assert set(seconds["count"]) == {2}
+    assert list(minutes["t"]) == [T0, T0 + 60, T0 + 120]
+    assert list(minutes["count"]) == [120, 120, 60]
+    
+    happy, sad = EMOTION_LABELS.index("happy"), EMOTION_LABELS.index("sad")
+    assert list(minutes["dominant"][:, happy]) == [120, 60, 0]
+    assert list(minutes["dominant"][:, sad]) == [0, 60, 60]
+    assert minutes["emotions"][1, happy] == pytest.approx(50.0)
+    assert len(history.query("raw", T0, T0 + 150)) == 50
+
+
+def test_open_buckets_are_queryable(small_rings):
+    history = ClientHistory("c")
+    for i in range(5):
+        history.add(T0 + i * 0.1, emotions("fear"), 0.7)
+    
+    assert list(history.query("second", T0, T0 + 1)["count"]) == [5]
+    assert list(history.query("minute", T0, T0 + 1)["count"]) == [5]
+
+
+def test_query_start_inside_a_bucket(small_rings):
+    history = ClientHistory("c")
+    for i in range(120):
+        history.add(T0 + i, emotions("neutral"), 0.9)
+    
+    # The first minute overlaps the range, so it is included
+    minutes = history.query("minute", T0 + 30, T0 + 119)
+    assert list(minutes["count"]) == [60, 60]
+
+
+def test_auto_resolution_and_aggregate(small_rings, monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_SPILL", False)
+    monkeypatch.setattr(settings, "HISTORY_RAW_SIZE", 20)
+    mood_history = MoodHistory()
+    for i in range(20):
+        mood_history.record("c", detection("happy" if i < 15 else "sad"), t=T0 + i)
+    
+    response = mood_history.query("c", start=T0, end=T0 + 20, aggregate=True)
+    assert response["resolution"] == "raw"
+    aggregate = response["aggregate"]
+    assert aggregate["detections"] == 20
+    assert aggregate["dominant_emotion"] == "happy"
+    assert aggregate["dominant_share"]["sad"] == pytest.approx(0.25)
+    
+    # Once the raw ring has dropped the start of the range: seconds, then minutes
+    for i in range(20, 30):
+        mood_history.record("c", detection("happy"), t=T0 + i)
+    response = mood_history.query("c", start=T0, end=T0 + 30)
+    assert response["resolution"] == "second"
+    assert sum(response["points"]["count"]) == 30
+    for i in range(30, 60):
+        mood_history.record("c", detection("happy"), t=T0 + i)
+    response = mood_history.query("c", start=T0, end=T0 + 60)
+    assert response["resolution"] == "minute"
+    assert sum(response["points"]["count"]) == 60
+    
+    assert mood_history.query("unknown") is None
+
+
+def test_spill_reaches_past_the_ring(small_rings, tmp_path):
+    history = ClientHistory("c", spill_dir=tmp_path)
+    for i in range(100):
+        history.add(T0 + i, emotions("angry"), 0.8)
+    history.close()
+    
+    assert len(read_spill(history.spill_paths["second"])) == 100
+    seconds = history.query("second", T0, T0 + 100)
+    assert len(seconds) == 100
+    assert list(seconds["t"]) == [T0 + i for i in range(100)]
+
+
+def test_reused_client_id_starts_a_fresh_history(small_rings, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_SPILL", True)
+    monkeypatch.setattr(settings, "HISTORY_DIR", str(tmp_path))
+    mood_history = MoodHistory()
+    
+    for i in range(20):
+        mood_history.record("c", detection("angry"), t=T0 + i)
+    mood_history.close_client("c")
+    for i in range(20):
+        mood_history.record("c", detection("happy"), t=T0 + 100 + i)
+    
+    aggregate = mood_history.query("c", start=T0, end=T0 + 200,
+                                   resolution="second", aggregate=True)["aggregate"]
+    assert aggregate["detections"] == 20
+    assert aggregate["dominant_share"]["happy"] == 1.0
+    mood_history.close()
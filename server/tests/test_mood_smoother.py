@@ -0,0 +1,74 @@
+from app.models.mood_detector import MoodDetector
+from app.services.mood_smoother import EMOTION_LABELS, MoodSmoother
+
+
+def result(mood, confidence=0.85):
+    """A detection peaked on ``mood``, the rest spread evenly"""
+    rest = (1 - confidence) * 100 / (len(EMOTION_LABELS) - 1)
+    emotions = {label: rest for label in EMOTION_LABELS}
+    emotions[mood] = confidence * 100
+    return {"success": True, "confidence": confidence, "emotions": emotions}
+
+
+def smoother(**kwargs):
+    params = dict(history=8, alpha=0.3, hysteresis=0.1, min_dwell=2, confidence_threshold=0.6)
+    params.update(kwargs)
+    return MoodSmoother(**params)
+
+
+def test_steady_confident_mood_is_reported():
+    s = smoother()
+    changes = [s.update(result("happy")) for _ in range(5)]
+    
+    reported = [change for change in changes if change]
+    assert len(reported) == 1
+    assert reported[0]["mood"] == "happy"
+    assert reported[0]["previous_mood"] is None
+    assert reported[0]["confidence"] >= 0.6
+    assert s.mood == "happy"
+
+
+def test_mood_waits_for_min_dwell():
+    s = smoother(min_dwell=3)
+    assert s.update(result("sad")) is None
+    assert s.update(result("sad")) is None
+    assert s.update(result("sad"))["mood"] == "sad"
+
+
+def test_switch_needs_a_lasting_lead():
+    s = smoother()
+    for _ in range(5):
+        s.update(result("happy"))
+    
+    # A single contrary frame doesn't flip the mood
+    assert s.update(result("angry")) is None
+    assert s.mood == "happy"
+    
+    changes = [s.update(result("angry")) for _ in range(10)]
+    reported = [change for change in changes if change]
+    assert [change["mood"] for change in reported] == ["angry"]
+    assert reported[0]["previous_mood"] == "happy"
+
+
+def test_unconfident_frames_are_ignored():
+    s = smoother()
+    for _ in range(10):
+        assert s.update(result("fear", confidence=0.4)) is None
+    assert s.mood is None
+    assert s.smoothed is None
+
+
+def test_flat_average_is_not_a_mood():
+    s = smoother()
+    # Confident frames, but the leader alternates, so no smoothed score gets there
+    for i in range(20):
+        s.update(result(("happy", "sad", "angry")[i % 3], confidence=0.62)
+                 | {"meets_threshold": True})
+    assert s.mood is None
+
+
+def test_mock_detector_drives_mood_changes():
+    detector = MoodDetector(load_model=False)
+    s = smoother()
+    changes = [s.update(detector.detect_mood(None)) for _ in range(60)]
+    assert any(changes)
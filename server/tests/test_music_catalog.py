@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+
+from app.services.music_catalog import is_catalog, load_tracks, open_catalog, write_catalog
+from app.services.music_index import MOOD_LABELS, MusicIndex
+
+TRACKS = [
+    {"title": "Señorita", "artist": "Ünïcode ♪", "url": "https://example.com/1", "mood": "happy"},
+    {"title": "", "artist": "Nobody", "url": "", "moods": {"sad": 0.7, "fear": 0.3}},
+    {"title": "Loud", "artist": "Band", "url": "https://example.com/3", "mood": "angry",
+     "valence": 0.1, "energy": 1.0},
+] + [
+    {"title": f"filler {i}", "artist": "a", "url": f"u{i}", "mood": MOOD_LABELS[i % 7]}
+    for i in range(200)
+]
+
+
+def test_catalog_round_trip(tmp_path):
+    index = MusicIndex.from_tracks(TRACKS)
+    path = tmp_path / "catalog.bin"
+    write_catalog(index, path)
+    
+    assert is_catalog(path)
+    assert not (tmp_path / "catalog.bin.tmp").exists()
+    opened = open_catalog(path)
+    
+    assert len(opened) == len(index)
+    assert opened.grid == index.grid
+    np.testing.assert_array_equal(opened.matrix, index.matrix)
+    np.testing.assert_array_equal(opened.cell_start, index.cell_start)
+    for row in range(len(index)):
+        assert opened.track(row) == index.track(row)
+    
+    emotions = {"sad": 60, "fear": 40}
+    assert list(opened.query(emotions, k=10)) == list(index.query(emotions, k=10))
+
+
+def test_catalog_replaces_an_existing_file(tmp_path):
+    path = tmp_path / "catalog.bin"
+    write_catalog(MusicIndex.from_tracks(TRACKS), path)
+    write_catalog(MusicIndex.from_tracks(TRACKS[:2]), path)
+    assert len(open_catalog(path)) == 2
+
+
+def test_load_tracks_json_and_csv(tmp_path):
+    mood_lists = tmp_path / "songs.json"
+    mood_lists.write_text(json.dumps({"happy": [{"title": "a"}], "sad": [{"title": "b", "mood": "fear"}]}))
+    assert [(t["title"], t["mood"]) for t in load_tracks(mood_lists)] == [("a", "happy"), ("b", "fear")]
+    
+    csv_path = tmp_path / "tracks.csv"
+    csv_path.write_text(
+        "title,artist,url,mood,happy,sad,valence\n"
+        "x,y,z,,0.5,0.5,0.3\n"
+        "p,q,r,angry,,,\n",
+        encoding="utf-8"
+    )
+    first, second = load_tracks(csv_path)
+    assert first["moods"] == {"happy": 0.5, "sad": 0.5}
+    assert first["valence"] == 0.3
+    assert second["mood"] == "angry" and "valence" not in second
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.music_index import (
+    FULL_SCAN_MAX, MOOD_LABELS, NUM_FEATURES, NUM_MOODS, ENERGY, VALENCE, MusicIndex, track_features
+)
+
+
+def random_features(count, seed=0):
+    rng = np.random.default_rng(seed)
+    features = np.zeros((count, NUM_FEATURES), dtype=np.float32)
+    moods = rng.dirichlet(np.full(NUM_MOODS, 0.3), size=count)
+    features[:, :NUM_MOODS] = moods
+    features[:, VALENCE:ENERGY + 1] = rng.random((count, 2))
+    return features
+
+
+def build(features):
+    names = [f"track {i}" for i in range(len(features))]
+    return MusicIndex.build(features, names, names, names)
+
+
+def full_scan_scores(index, emotions):
+    """Score every row the slow way, straight from the formula"""
+    mix, target = index._mix_and_target(emotions)
+    features = index.matrix[:, :NUM_FEATURES]
+    distance = ((features[:, VALENCE:ENERGY + 1] - target) ** 2).sum(axis=1)
+    return index.mood_weight * features[:, :NUM_MOODS] @ mix - index.ve_weight * distance
+
+
+def emotion_queries(count, seed=1):
+    rng = np.random.default_rng(seed)
+    for mix in rng.dirichlet(np.full(NUM_MOODS, 0.5), size=count):
+        yield {label: float(value * 100) for label, value in zip(MOOD_LABELS, mix)}
+
+
+def test_query_matches_a_full_scan_on_small_catalogs():
+    index = build(random_features(500))
+    for emotions in emotion_queries(20):
+        scores = full_scan_scores(index, emotions)
+        expected = np.argsort(-scores)[:5]
+        assert list(index.query(emotions, k=5)) == list(expected)
+
+
+def test_probed_recommendations_are_as_good_as_a_full_scan():
+    index = build(random_features(FULL_SCAN_MAX * 4))
+    random.seed(0)
+    for emotions in emotion_queries(50):
+        scores = full_scan_scores(index, emotions)
+        row = index.recommend(emotions, k=5, margin=0.1)
+        assert scores[row] >= scores.max() - 0.1 - 1e-5
+
+
+def test_query_excludes_rows():
+    index = build(random_features(300))
+    emotions = {"happy": 80, "surprise": 20}
+    best = index.query(emotions, k=3)
+    rest = index.query(emotions, k=3, exclude=best[:2])
+    assert best[2] == rest[0]
+    assert not set(best[:2]) & set(rest)
+
+
+def test_recommend_prefers_fresh_tracks_then_the_least_recent():
+    tracks = [{"title": f"t{i}", "mood": "happy", "valence": 0.9, "energy": 0.8} for i in range(3)]
+    index = MusicIndex.from_tracks(tracks + [{"title": "slow", "mood": "sad"}])
+    emotions = {"happy": 100}
+    
+    random.seed(0)
+    assert index.recommend(emotions, k=3, exclude=[0, 1]) == 2
+    # All good matches were played: repeat the oldest rather than a poor match
+    assert index.recommend(emotions, k=3, exclude=[1, 0, 2]) == 1
+
+
+def test_empty_index():
+    index = MusicIndex.from_tracks([])
+    assert len(index) == 0
+    assert index.recommend({"happy": 1.0}) is None
+
+
+def test_track_features_defaults_to_the_mood_profile():
+    features = track_features({"title": "x"}, mood="sad")
+    assert features[MOOD_LABELS.index("sad")] == 1.0
+    assert features[VALENCE] == pytest.approx(0.15)
+    assert features[ENERGY] == pytest.approx(0.25)
+    
+    mixed = track_features({"moods": {"happy": 3, "angry": 1}, "valence": 0.4})
+    assert mixed[MOOD_LABELS.index("happy")] == pytest.approx(0.75)
+    assert mixed[VALENCE] == pytest.approx(0.4)
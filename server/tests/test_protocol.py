@@ -0,0 +1,137 @@
+import pytest
+
+from app.services.protocol import (
+    MAX_ACK_EVERY, MOOD_LABELS, ProtocolSession, available_encodings, decode_message
+)
+
+EMOTIONS = {label: float(i * 10 + 1) for i, label in enumerate(MOOD_LABELS)}
+SONG = {"title": "Señorita", "artist": "Ünïcode", "url": "https://example.com/x"}
+FACES = [
+    {"id": 3, "box": [10, 20, 64, 80], "dominant_emotion": "happy",
+     "confidence": 0.875, "emotions": EMOTIONS},
+    {"id": 70000, "box": [-5, 0, 70000, 1], "dominant_emotion": "sad",
+     "confidence": 0.5, "emotions": {"sad": 100.0}},
+]
+
+
+def session(encoding="binary", **request):
+    s = ProtocolSession()
+    reply = s.negotiate({"type": "negotiate", "version": 2, "encoding": encoding, **request})
+    assert reply["type"] == "negotiated"
+    return s
+
+
+def round_trip(s, message):
+    return decode_message(s.encode(message), s.encoding)
+
+
+def test_binary_mood_round_trip():
+    s = session()
+    s.frames_received = 42
+    message = s.mood_message("happy", 0.75, EMOTIONS, SONG, frame=41)
+    decoded = round_trip(s, message)
+    
+    assert decoded["type"] == "mood_detected"
+    assert decoded["mood"] == "happy"
+    assert decoded["confidence"] == pytest.approx(0.75)
+    assert decoded["emotions"] == pytest.approx(message["emotions"])
+    assert decoded["timestamp"] == message["timestamp"]
+    assert (decoded["ack"], decoded["frame"], decoded["changed"]) == (42, 41, True)
+    assert decoded["song"] == SONG
+    assert "faces" not in decoded
+
+
+def test_binary_song_only_when_it_changed():
+    s = session()
+    first = round_trip(s, s.mood_message("sad", 0.9, EMOTIONS, SONG))
+    again = round_trip(s, s.mood_message("sad", 0.9, EMOTIONS, SONG))
+    unchanged = round_trip(s, s.mood_message("sad", 0.9, EMOTIONS, {"title": "x"}, changed=False))
+    
+    assert first["song"] == SONG
+    assert "song" not in again
+    assert "song" not in unchanged and unchanged["changed"] is False
+
+
+def test_binary_faces_round_trip():
+    s = session()
+    decoded = round_trip(s, s.mood_message("happy", 0.8, EMOTIONS, None, faces=FACES))
+    
+    assert "song" not in decoded
+    first, second = decoded["faces"]
+    assert first["id"] == 3
+    assert first["box"] == [10, 20, 64, 80]
+    assert first["mood"] == "happy"
+    assert first["confidence"] == pytest.approx(0.875)
+    assert first["emotions"] == pytest.approx([EMOTIONS[label] for label in MOOD_LABELS])
+    # Boxes are clamped to the uint16 fields
+    assert second["id"] == 70000
+    assert second["box"] == [0, 0, 0xFFFF, 1]
+    assert second["emotions"][MOOD_LABELS.index("sad")] == 100.0
+
+
+def test_binary_ack_and_rate_hint():
+    s = session(ack_every=3)
+    acks = [s.frame_received() for _ in range(7)]
+    assert [ack["ack"] for ack in acks if ack] == [3, 6]
+    assert round_trip(s, acks[2]) == {"type": "ack", "ack": 3}
+    
+    decoded = round_trip(s, {"type": "rate_hint", "fps": 7.5})
+    assert decoded == {"type": "rate_hint", "fps": 7.5}
+
+
+def test_control_messages_stay_json():
+    s = session()
+    assert isinstance(s.encode({"type": "pong"}), str)
+
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_every_encoding_round_trips_a_result(encoding):
+    s = session(encoding)
+    decoded = round_trip(s, s.mood_message("angry", 0.7, EMOTIONS, SONG, frame=1, faces=FACES[:1]))
+    assert decoded["mood"] == "angry"
+    assert decoded["song"] == SONG
+    assert decoded["faces"][0]["id"] == 3
+
+
+def test_unknown_binary_type():
+    with pytest.raises(ValueError):
+        decode_message(b"\x09\x00\x00\x00")
+
+
+def test_version_1_is_json_per_frame():
+    s = ProtocolSession()
+    assert s.frame_received()["type"] == "frame_ack"
+    message = s.mood_message("happy", 0.8, EMOTIONS, SONG)
+    assert message["all_emotions"] == EMOTIONS
+    assert isinstance(s.encode(message), str)
+
+
+@pytest.mark.parametrize("request_fields, error", [
+    ({"version": 3}, "version"),
+    ({"version": True}, "version"),
+    ({"version": "2"}, "version"),
+    ({"version": 2, "encoding": "xml"}, "encoding"),
+    ({"version": 2, "encoding": ["json"]}, "encoding"),
+    ({"version": 2, "ack_every": "ten"}, "ack_every"),
+    ({"version": 2, "ack_every": None}, "ack_every"),
+    ({"version": 2, "ack_every": 0}, "ack_every"),
+    ({"version": 2, "ack_every": 2.5}, "ack_every"),
+    ({"version": 2, "ack_every": True}, "ack_every"),
+    ({"version": 2, "ack_every": MAX_ACK_EVERY + 1}, "ack_every"),
+])
+def test_bad_negotiate_leaves_the_session_alone(request_fields, error):
+    s = ProtocolSession()
+    reply = s.negotiate({"type": "negotiate", **request_fields})
+    
+    assert reply["type"] == "error"
+    assert error in reply["message"]
+    assert (s.version, s.encoding, s.ack_every, s.report_all) == (1, "json", 1, False)
+
+
+def test_negotiate_accepts_the_limits():
+    s = session("json", ack_every=MAX_ACK_EVERY, report_all=True)
+    assert (s.version, s.ack_every, s.report_all) == (2, MAX_ACK_EVERY, True)
+    
+    reply = s.negotiate({"type": "negotiate", "version": 1})
+    assert reply["version"] == 1
+    assert (s.encoding, s.ack_every, s.report_all) == ("json", 1, False)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import spotify_client
+from app.services.spotify_client import TTLCache, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(spotify_client.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_cache_hits_and_expiry(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    assert cache.get("a") == (False, None)
+    cache.put("a", None)
+    # A cached None (no track found) is a hit, not a miss
+    assert cache.get("a") == (True, None)
+    
+    clock.now += 61
+    assert cache.get("a") == (False, None)
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_cache_put_refreshes_the_ttl(clock):
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    clock.now += 50
+    cache.put("a", 2)
+    clock.now += 50
+    assert cache.get("a") == (True, 2)
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - start
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - start
+    
+    burst, total = asyncio.run(run())
+    assert burst < 0.05
+    # 5 more tokens at 50/s take about 100 ms
+    assert 0.09 <= total < 0.3
+
+
+def test_token_bucket_serves_waiters_in_order():
+    async def run():
+        bucket = TokenBucket(rate=100, burst=1)
+        order = []
+        
+        async def request(i):
+            await bucket.acquire()
+            order.append(i)
+        
+        await asyncio.gather(*(request(i) for i in range(5)))
+        return order
+    
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+
+
+def test_token_bucket_without_a_limit():
+    async def run():
+        bucket = TokenBucket(rate=0, burst=0)
+        for _ in range(1000):
+            await bucket.acquire()
+    
+    asyncio.run(run())